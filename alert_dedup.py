@@ -0,0 +1,80 @@
+# alert_dedup.py — deduplicação e agrupamento de avisos
+# A mesma rota em vários tamanhos de AMOUNTS_USDC, achada de novo ciclo após ciclo, vira uma
+# enxurrada de avisos quase iguais. Aqui cada (tipo, chain, rota) só é avisado de novo depois
+# de `janela` segundos, a não ser que o net melhore mais que `melhora` pontos percentuais; e o
+# que chega junto (dentro de `agrupar` segundos) sai numa mensagem só. Cada destino (canal
+# principal, assinaturas) tem janelas próprias: o que um recebeu não segura o aviso de outro.
+import asyncio
+import time
+
+def chave_aviso(item, msg, chave=None):
+    """(chain, rota) do item, ou a chave estável dada pelo chamador (cross-chain: (sym, compra,
+    venda)); sem nenhum dos dois, o início da mensagem.
+    """
+    if chave is not None:
+        return chave
+    if item:
+        return (item[0], tuple(t.lower() for t in item[1]))
+    return msg.split(" gross")[0]
+
+def texto_digest(avisos):
+    """Mensagem de um grupo de avisos [(net, msg, item, n)]: o próprio msg se for um só."""
+    if len(avisos) == 1:
+        return avisos[0][1]
+    avisos = sorted(avisos, key=lambda a: a[0] if a[0] is not None else float("-inf"), reverse=True)
+    linhas = [f"• {msg}" + (f" ({n} ocorrências)" if n > 1 else "") for _, msg, _, n in avisos]
+    return f"{len(avisos)} rotas:\n" + "\n".join(linhas)
+
+class AlertDeduplicator:
+
+    def __init__(self, emitir, janela=300.0, melhora=0.1, agrupar=2.0):
+        # emitir(kind, texto, avisos, destino) recebe cada mensagem final; avisos = [(net, msg, item, n)]
+        self.emitir = emitir
+        self.janela = janela
+        self.melhora = melhora
+        self.agrupar = agrupar
+        self._enviado = {}    # (destino, kind, chave) -> (time.monotonic(), net)
+        self._pendentes = {}  # (destino, kind) -> {chave: (net, msg, item, n)}
+        self.stats = {"recebidos": 0, "suprimidos": 0, "mensagens": 0}
+
+    def oferecer(self, kind, msg, item=None, net=None, destino=None, chave=None) -> bool:
+        """False se o aviso foi suprimido; True se vai sair no próximo agrupamento.
+        destino: None = canal principal; senão, o destino a que o aviso se destina.
+        chave: identidade do aviso quando não há item (ver chave_aviso).
+        """
+        self.stats["recebidos"] += 1
+        chave = chave_aviso(item, msg, chave)
+        ult = self._enviado.get((destino, kind, chave))
+        if ult and time.monotonic() - ult[0] < self.janela:
+            if net is None or ult[1] is None or net < ult[1] + self.melhora:
+                self.stats["suprimidos"] += 1
+                return False
+        pend = self._pendentes.setdefault((destino, kind), {})
+        atual = pend.get(chave)
+        n = atual[3] + 1 if atual else 1
+        if atual is None or (net is not None and (atual[0] is None or net > atual[0])):
+            pend[chave] = (net, msg, item, n)
+        else:
+            pend[chave] = atual[:3] + (n,)
+        return True
+
+    def descarregar(self):
+        """Emite o que está pendente: uma mensagem por destino e tipo (resumida se houver várias rotas)."""
+        agora = time.monotonic()
+        pendentes, self._pendentes = self._pendentes, {}
+        for (destino, kind), pend in pendentes.items():
+            if not pend:
+                continue
+            for chave, (net, *_rest) in pend.items():
+                self._enviado[(destino, kind, chave)] = (agora, net)
+            avisos = sorted(pend.values(), key=lambda a: a[0] if a[0] is not None else float("-inf"), reverse=True)
+            self.stats["mensagens"] += 1
+            self.emitir(kind, texto_digest(avisos), avisos, destino)
+        # esquece o que já saiu da janela
+        for k in [k for k, (t, _) in self._enviado.items() if agora - t >= self.janela]:
+            del self._enviado[k]
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.agrupar)
+            self.descarregar()
@@ -1,22 +1,61 @@
 
 import os
 import asyncio
+import itertools
+import socket
 import time
 import aiohttp
 
 from tokens_config import (
     get_default_tokens_for_chain,
     get_base_token_for_chain,
+    get_base_tokens_for_chain,
     get_token_decimals,
     token_symbol,
+    chain_name,
 )
-from get_best_quote_async import get_best_quote_async
-from arbitrage_rotas_3_swaps_async import buscar_arbitragem_triangulo_base_async
-from telegram_notify import send_telegram
+from get_best_quote_async import (
+    get_best_quote_async,
+    count_calls_into,
+    fastest_reliable_aggregator,
+    deadline_scope,
+    deadline_expired,
+    note_shed,
+    http_stats,
+    add_quote_listener,
+    remove_quote_listener,
+    set_tape,
+    relogio,
+)
+from quote_cache import QuoteCache, cached_rate
+from scan_plan import build_scan_plan
+from cross_chain import find_divergences, bridge_table_from_env
+from chain_workers import ResultsHub, supervise_chain
+from route_eval import cotar_rota, avaliar_rota, recheck_rota, tipo_rota, pernas_de
+from streaming import StreamPipeline, AgendaFixa
+from scheduler import AgendaPrioridade
+from sniper import Sniper
+from interval_controller import AdaptiveInterval
+from prefetch import planejar_pernas, prefetch_na_janela
+from triggers import PriceProbes, AgendaEventos
+from sampling import AmostragemRotas
+from sharding import HashRing, ShardPool, chave_rota
+from coordination import Coordenador, backend_from_url
+from quote_board import QuoteBoard
+from alert_dedup import AlertDeduplicator
+from subscriptions import IndiceAssinaturas, carregar_assinaturas
+from history import HistoryStore
+from tape import TapeRecorder, TapePlayer
+from arbitrage_rotas_3_swaps_async import buscar_arbitragem_triangulo_base_async, speculative_stats, symmetric_stats
+from telegram_notify import TelegramQueue
+from notify_sinks import NotifyRouter, StdoutSink, TelegramSink, JsonlSink, WebhookSink, parse_rotas
 from utils import net_percent
 
 DEBUG = str(os.getenv("DEBUG", "0")).lower() in {"1", "true", "yes"}
 
+# bases cotadas 1:1 com a grade AMOUNTS_USDC
+_STABLES = {"USDC", "USDT", "DAI"}
+
 def _log(msg: str):
     if DEBUG:
         print(msg)
@@ -30,36 +69,41 @@ def _parse_amounts_list(env_value: str):
         vals.append(float(x))
     return vals
 
-def _chain_name(chain_id: int) -> str:
-    return {
-        1: "Ethereum",
-        10: "Optimism",
-        56: "BNB Smart Chain",
-        100: "Gnosis",
-        137: "Polygon",
-        250: "Fantom",
-        42161: "Arbitrum",
-        43114: "Avalanche",
-        8453: "Base",
-    }.get(chain_id, str(chain_id))
+def _env_por_chain(nome: str, chain_id: int, default, conv=float):
+    """<NOME>_<chain> tem prioridade sobre <NOME>; senão, default."""
+    v = os.getenv(f"{nome}_{chain_id}") or os.getenv(nome)
+    return conv(v) if v not in (None, "") else conv(default)
+
+def _linha_cortes(cortes) -> str:
+    """Rodapé do resumo com o que foi descartado por falta de tempo no ciclo."""
+    if not cortes:
+        return ""
+    return (f"\nOrçamento de tempo esgotado: {cortes.get('rotas_simples', 0)} simples + {cortes.get('rotas_tri', 0)} tri puladas"
+            f" | {cortes.get('cotacoes', 0)} cotações e {cortes.get('chamadas', 0)} chamadas canceladas")
 
 def _aggs_for_chain(chain_id: int):
     v = os.getenv(f"AGGREGATORS_{chain_id}") or os.getenv("AGGREGATORS", "1inch,0x,KyberSwap,Odos,OpenOcean,ParaSwap")
     return [x.strip() for x in v.split(",") if x.strip()]
 
-async def buscar_arbitragem_simples_base_async(session, base_token, other_tokens, amount_in_units, chain_id, log_thr, alert_thr, fee_bps, collector, notifier, sanity_cap, recheck_thr, recheck_tol):
+async def buscar_arbitragem_simples_base_async(session, base_token, other_tokens, amount_in_units, chain_id, log_thr, alert_thr, fee_bps, collector, notifier, sanity_cap, recheck_thr, recheck_tol, rotas=None, **quote_kw):
+    # rotas: subconjunto de tokens X a avaliar (default: todos de other_tokens)
+    # quote_kw: repassado a get_best_quote_async (ex.: aggregator_list, attempts)
     la = token_symbol(base_token, chain_id)
-    chain = _chain_name(chain_id)
+    chain = chain_name(chain_id)
 
-    for token_b in other_tokens:
+    for token_b in (other_tokens if rotas is None else rotas):
+        if deadline_expired():
+            # orçamento do ciclo esgotado: as rotas restantes (menor prioridade) são descartadas
+            note_shed("rotas_simples")
+            continue
         lb = token_symbol(token_b, chain_id)
 
-        q_ab = await get_best_quote_async(session, base_token, token_b, amount_in_units, chain_id)
+        q_ab = await get_best_quote_async(session, base_token, token_b, amount_in_units, chain_id, **quote_kw)
         if not q_ab:
             _log(f"[{chain}][SIMPLES] Falha BASE→X {la}→{lb}")
             continue
 
-        q_ba = await get_best_quote_async(session, token_b, base_token, q_ab["toAmount"], chain_id)
+        q_ba = await get_best_quote_async(session, token_b, base_token, q_ab["toAmount"], chain_id, **quote_kw)
         if not q_ba:
             _log(f"[{chain}][SIMPLES] Falha X→BASE {lb}→{la}")
             continue
@@ -69,7 +113,7 @@ async def buscar_arbitragem_simples_base_async(session, base_token, other_tokens
         net = net_percent(gross, swaps=2, fee_bps_per_swap=fee_bps)
 
         msg = f"[{chain}] SIMPLES {la}→{lb}→{la} gross {gross:.2f}% | net {net:.2f}% via {q_ab['aggregator']} + {q_ba['aggregator']}"
-        collector.append((net, msg, "SIMPLES", chain_id, amount_in_units))
+        collector.append((net, msg, "SIMPLES", chain_id, amount_in_units, (base_token, token_b), pernas_de(amount_in_units, (q_ab, q_ba)), relogio()))
 
         if net > sanity_cap:
             print(f"[{time.strftime('%H:%M:%S')}] SUSPEITO (>{sanity_cap:.2f}%): {msg}")
@@ -77,8 +121,9 @@ async def buscar_arbitragem_simples_base_async(session, base_token, other_tokens
 
         if recheck_thr > 0 and net >= recheck_thr:
             non_ps = ["1inch","0x","KyberSwap","OpenOcean","Odos"]
-            rq_ab = await get_best_quote_async(session, base_token, token_b, amount_in_units, chain_id, aggregator_list=non_ps)
-            rq_ba = await get_best_quote_async(session, token_b, base_token, q_ab["toAmount"], chain_id, aggregator_list=non_ps) if rq_ab else None
+            rq_kw = {**quote_kw, "aggregator_list": non_ps, "cache": None}
+            rq_ab = await get_best_quote_async(session, base_token, token_b, amount_in_units, chain_id, **rq_kw)
+            rq_ba = await get_best_quote_async(session, token_b, base_token, q_ab["toAmount"], chain_id, **rq_kw) if rq_ab else None
             if not rq_ab or not rq_ba:
                 print(f"[{time.strftime('%H:%M:%S')}] DESCARTADO: recheck sem consenso | {msg}")
                 continue
@@ -89,11 +134,13 @@ async def buscar_arbitragem_simples_base_async(session, base_token, other_tokens
                 continue
 
         if net >= log_thr:
-            notifier('log', msg)
+            item = (chain_id, (base_token, token_b), amount_in_units)
+            notifier('log', msg, item, net)
             if net >= alert_thr:
-                notifier('alert', msg)
+                notifier('alert', msg, item, net)
 
-async def main_loop():
+async def main_loop(shard=None):
+    # shard = (indice, total, fila) quando roda como processo de shard (ver _rodar_shard)
     CHAIN_IDS = [int(x) for x in (os.getenv("CHAIN_IDS","137").split(","))]
     AMOUNTS_USDC = _parse_amounts_list(os.getenv("AMOUNTS_USDC","50,100,250"))  # floats em USDC
     LOG_THR = float(os.getenv("LOG_THRESHOLD_PERCENT","0.2"))
@@ -110,55 +157,807 @@ async def main_loop():
     RECHECK_THR = float(os.getenv("RECHECK_IF_NET_ABOVE","3"))
     RECHECK_TOL = float(os.getenv("RECHECK_TOLERANCE_PERCENT","0.5"))
 
+    # Varredura em duas fases: triagem barata + confirmação completa
+    TWO_PHASE = os.getenv("TWO_PHASE","0") == "1"
+    # só é lido com TWO_PHASE ligado (sem triagem não há amount de triagem)
+    SCREEN_AMOUNT_USDC = float(os.getenv("SCREEN_AMOUNT_USDC", str(min(AMOUNTS_USDC)))) if TWO_PHASE else None
+    SCREEN_AGGREGATOR = os.getenv("SCREEN_AGGREGATOR","").strip()
+    TWO_PHASE_MARGIN = float(os.getenv("TWO_PHASE_MARGIN_PERCENT","0.5"))
+
+    # Pernas especulativas no triangular: 3 pernas em paralelo com amounts previstos
+    SPECULATIVE = os.getenv("SPECULATIVE_LEGS","0") == "1"
+    SPEC_TOL = float(os.getenv("SPECULATIVE_TOLERANCE_PERCENT","0.5"))
+    # idade máxima das taxas em cache usadas para prever amounts (pernas e grade das bases)
+    SPEC_MAX_AGE = float(os.getenv("SPECULATIVE_MAX_AGE_SECONDS","300"))
+
+    # Triangular simétrico: A→B→C→A e A→C→B→A avaliados juntos
+    SYMMETRIC = os.getenv("SYMMETRIC_TRIANGLES","0") == "1"
+    SYM_MARGIN = float(os.getenv("SYMMETRIC_MARGIN_PERCENT","0.3"))
+    tri_kw = {"especulativo": SPECULATIVE, "spec_tol_pct": SPEC_TOL, "simetrico": SYMMETRIC, "sym_margin_pct": SYM_MARGIN}
+
+    # Divergência entre chains (usa as taxas do próprio ciclo) e chains cotadas em paralelo
+    # (cada shard só vê as taxas das próprias rotas: sem cross-chain no modo com shards)
+    CROSS_CHAIN = os.getenv("CROSS_CHAIN","0") == "1" and shard is None
+    CONCURRENT_CHAINS = os.getenv("CONCURRENT_CHAINS", "1" if CROSS_CHAIN else "0") == "1"
+    BRIDGE_TABLE, BRIDGE_DEFAULT_BPS = bridge_table_from_env()
+
+    # Workers por chain com cadência própria; resumo por janela de SUMMARY_INTERVAL_SECONDS
+    CHAIN_WORKERS = os.getenv("CHAIN_WORKERS","0") == "1"
+    SUMMARY_INTERVAL = float(os.getenv("SUMMARY_INTERVAL_SECONDS", str(INTERVAL)))
+
+    # Pipeline contínuo: cada rota revarrida a cada ROUTE_RESCAN_SECONDS, sem barreira de ciclo
+    STREAM_MODE = os.getenv("STREAM_MODE","0") == "1"
+    ROUTE_RESCAN = float(os.getenv("ROUTE_RESCAN_SECONDS", str(INTERVAL)))
+    STREAM_FETCHERS = int(os.getenv("STREAM_FETCHERS","8"))
+    LEG_CACHE_TTL = float(os.getenv("LEG_CACHE_TTL_SECONDS","5"))
+
+    # Agenda por prioridade no modo contínuo (net recente, volatilidade, distância ao alerta)
+    PRIORITY_SCHEDULER = os.getenv("PRIORITY_SCHEDULER","0") == "1"
+    ROUTE_RESCAN_MIN = float(os.getenv("ROUTE_RESCAN_MIN_SECONDS","5"))
+    ROUTE_RESCAN_MAX = float(os.getenv("ROUTE_RESCAN_MAX_SECONDS", str(ROUTE_RESCAN * 4)))
+    REQUEST_BUDGET = float(os.getenv("REQUEST_BUDGET_PER_MINUTE","0"))
+
+    # Revarredura por evento no modo contínuo: sondas de preço por token disparam só as rotas que andaram
+    EVENT_TRIGGERS = os.getenv("EVENT_TRIGGERS","0") == "1"
+    TRIGGER_BPS = float(os.getenv("TRIGGER_BPS","15"))
+    TRIGGER_PROBE_SECONDS = float(os.getenv("TRIGGER_PROBE_SECONDS","5"))
+    TRIGGER_PROBE_AMOUNT = float(os.getenv("TRIGGER_PROBE_AMOUNT_USDC","10"))
+    TRIGGER_MAX_SECONDS = float(os.getenv("TRIGGER_MAX_SECONDS","300"))
+
+    # Sniper: recota em alta frequência as rotas que cruzaram o alerta, até caírem abaixo dele
+    SNIPER = os.getenv("SNIPER_MODE","0") == "1"
+    SNIPER_INTERVAL = float(os.getenv("SNIPER_INTERVAL_SECONDS","2"))
+    SNIPER_MAX_SECONDS = float(os.getenv("SNIPER_MAX_SECONDS","600"))
+    SNIPER_MAX_ACTIVE = int(os.getenv("SNIPER_MAX_ACTIVE","5"))
+
+    # Orçamento de tempo por ciclo (ou por varredura de chain no modo CHAIN_WORKERS)
+    CYCLE_BUDGET = float(os.getenv("CYCLE_BUDGET_SECONDS","0"))
+    # último net visto por (chain, rota): define a prioridade quando o orçamento aperta
+    ultimo_net = {}
+
+    # Intervalo adaptativo: encurta com volatilidade, alonga com 429/erros
+    ADAPTIVE = os.getenv("ADAPTIVE_INTERVAL","0") == "1"
+    intervalo = AdaptiveInterval(
+        INTERVAL,
+        float(os.getenv("SCAN_INTERVAL_MIN_SECONDS","5")),
+        float(os.getenv("SCAN_INTERVAL_MAX_SECONDS","300")),
+        LOG_THR,
+        vol_ref=float(os.getenv("ADAPTIVE_VOLATILITY_PERCENT","0.05")),
+        max_error_rate=float(os.getenv("ADAPTIVE_MAX_ERROR_RATE","0.2")),
+    ) if ADAPTIVE else None
+
+    # Prefetch: usa a pausa entre ciclos para aquecer o cache de pernas do próximo ciclo
+    PREFETCH = os.getenv("PREFETCH","0") == "1"
+    PREFETCH_MAX_LEGS = int(os.getenv("PREFETCH_MAX_LEGS","60"))
+    # vazio = validade igual à pausa em curso (acompanha o controle adaptativo do intervalo)
+    PREFETCH_TTL = os.getenv("PREFETCH_TTL_SECONDS","").strip()
+    # só guarda as pernas do prefetch; cada ciclo começa com elas e as cotações dele ficam nele
+    cache_persistente = QuoteCache(ttl=float(PREFETCH_TTL) if PREFETCH_TTL else INTERVAL) if PREFETCH else None
+    # último plano varrido por chain: [(base, rotas_s, rotas_t, amounts, agregadores)], com os
+    # amounts e agregadores da primeira fase que lê as pernas (triagem com TWO_PHASE)
+    planos = {}
+
+    # Amostragem: cada ciclo varre só parte das rotas, com cobertura total em SAMPLE_MAX_WINDOWS ciclos
+    SAMPLING = os.getenv("SAMPLING_MODE","0") == "1"
+    amostragem = AmostragemRotas(
+        int(os.getenv("SAMPLE_MAX_WINDOWS","10")),
+        float(os.getenv("SAMPLE_FRACTION","0.2")),
+        float(os.getenv("SAMPLE_POSITIVE_WEIGHT","10")),
+    ) if SAMPLING else None
+
+    # Shards: SHARD_PROCESSES processos, cada um com uma fatia das rotas (hash consistente)
+    SHARDS = int(os.getenv("SHARD_PROCESSES","0"))
+    # shard que morre é reiniciado com espera exponencial; depois de tantas mortes seguidas, fica parado
+    SHARD_MAX_RESTARTS = int(os.getenv("SHARD_MAX_RESTARTS","10"))
+    SHARD_RESTART_BACKOFF_MAX = float(os.getenv("SHARD_RESTART_BACKOFF_MAX_SECONDS","300"))
+    anel = HashRing(shard[1]) if shard else None
+
+    def _do_shard(chain_id, rota) -> bool:
+        return anel is None or anel.shard(chave_rota(chain_id, rota)) == shard[0]
+
+    # Várias instâncias: leases sobre shards de rotas, líder envia resumos/heartbeats, alerta único
+    COORD_URL = os.getenv("COORD_BACKEND","").strip()
+    ALERT_DEDUP_SECONDS = float(os.getenv("ALERT_DEDUP_SECONDS","300"))
+    coord = None
+    if COORD_URL:
+        # os processos de shard herdam o ambiente: mesmo INSTANCE_ID, mesmos leases
+        os.environ.setdefault("INSTANCE_ID", f"{socket.gethostname()}-{os.getpid()}")
+        coord = Coordenador(
+            backend_from_url(COORD_URL),
+            os.environ["INSTANCE_ID"],
+            int(os.getenv("COORD_SHARDS","16")),
+            float(os.getenv("COORD_LEASE_SECONDS","30")),
+        )
+
+    # Quadro de cotações em memória compartilhada para outros processos do host
+    QUOTE_BOARD_NAME = os.getenv("QUOTE_BOARD_NAME","").strip()
+    QUOTE_BOARD_SLOTS = int(os.getenv("QUOTE_BOARD_SLOTS","4096"))
+
+    # Telegram por fila assíncrona (alerta > resumo > heartbeat); "0" envia um a um numa thread
+    TELEGRAM_ASYNC = os.getenv("TELEGRAM_ASYNC","1") == "1"
+    TELEGRAM_MAX_BACKLOG = int(os.getenv("TELEGRAM_MAX_BACKLOG","200"))
+    TELEGRAM_MIN_INTERVAL = float(os.getenv("TELEGRAM_MIN_INTERVAL_SECONDS","1"))
+
+    # Avisos repetidos da mesma (chain, rota) suprimidos por NOTIFY_DEDUP_SECONDS; simultâneos agrupados
+    NOTIFY_DEDUP = float(os.getenv("NOTIFY_DEDUP_SECONDS","300"))
+    NOTIFY_DEDUP_IMPROVEMENT = float(os.getenv("NOTIFY_DEDUP_MIN_IMPROVEMENT_PERCENT","0.1"))
+    NOTIFY_DIGEST = float(os.getenv("NOTIFY_DIGEST_SECONDS","2"))
+
+    # Destinos de notificação (stdout e Telegram sempre; JSONL e webhook se configurados) e roteamento
+    NOTIFY_JSONL = os.getenv("NOTIFY_JSONL_PATH","").strip()
+    NOTIFY_WEBHOOK = os.getenv("NOTIFY_WEBHOOK_URL","").strip()
+    NOTIFY_ROUTES = os.getenv("NOTIFY_ROUTES","").strip()
+
+    # Assinaturas: vários chats/webhooks com filtros próprios sobre a mesma varredura
+    SUBSCRIPTIONS_FILE = os.getenv("SUBSCRIPTIONS_FILE","").strip()
+    assinaturas = IndiceAssinaturas(carregar_assinaturas(SUBSCRIPTIONS_FILE)) if SUBSCRIPTIONS_FILE else None
+    # a varredura avisa a partir do menor limiar entre o LOG_THRESHOLD_PERCENT e as assinaturas
+    SCAN_LOG_THR = min(LOG_THR, assinaturas.min_net) if assinaturas and assinaturas.assinaturas else LOG_THR
+
+    # Histórico: toda rota avaliada gravada num SQLite, em lotes, fora do event loop
+    HISTORY_DB = os.getenv("HISTORY_DB","").strip()
+    HISTORY_RETENTION_DAYS = float(os.getenv("HISTORY_RETENTION_DAYS","30"))
+    # nos shards quem grava é o processo pai, que recebe os registros de todos
+    historico = HistoryStore(HISTORY_DB, HISTORY_RETENTION_DAYS) if HISTORY_DB and not shard else None
+
+    # Fita: grava o tráfego com os agregadores (TAPE_RECORD) ou o reproduz sem rede (TAPE_REPLAY)
+    TAPE_RECORD = os.getenv("TAPE_RECORD","").strip()
+    TAPE_REPLAY = os.getenv("TAPE_REPLAY","").strip()
+    TAPE_REPLAY_SPEED = float(os.getenv("TAPE_REPLAY_SPEED","0"))
+    if TAPE_REPLAY:
+        fita = TapePlayer(TAPE_REPLAY, TAPE_REPLAY_SPEED)
+        print(f"Reproduzindo {len(fita)} respostas gravadas em {TAPE_REPLAY} (velocidade={TAPE_REPLAY_SPEED or 'máxima'})")
+    elif TAPE_RECORD:
+        fita = TapeRecorder(TAPE_RECORD)
+    else:
+        fita = None
+
+    def _minha_rota(chain_id, rota) -> bool:
+        """Rota deste processo (SHARD_PROCESSES) e de um shard com lease desta instância (COORD_BACKEND)."""
+        return _do_shard(chain_id, rota) and (coord is None or coord.dono_da_rota(chain_id, rota))
+
     cycle = 0
 
     async with aiohttp.ClientSession(headers={
         "User-Agent": "Mozilla/5.0 (compatible; ArbitrBot/1.0)",
         "Accept": "application/json",
     }) as session:
-        def notifier(kind: str, msg: str):
-            print(f"[{time.strftime('%H:%M:%S')}] {msg}")
+        telegram = TelegramQueue(session, max_backlog=TELEGRAM_MAX_BACKLOG, min_interval=TELEGRAM_MIN_INTERVAL) if TELEGRAM_ASYNC else None
+
+        sinks = [StdoutSink(), TelegramSink(telegram)]
+        if NOTIFY_JSONL:
+            sinks.append(JsonlSink(NOTIFY_JSONL))
+        if NOTIFY_WEBHOOK:
+            sinks.append(WebhookSink(session, NOTIFY_WEBHOOK))
+        extras = [sk.nome for sk in sinks[2:]]
+        for a in (assinaturas.assinaturas if assinaturas else []):
+            if a.chat_id:
+                sinks.append(TelegramSink(telegram, chat_id=a.chat_id, nome=a.destino))
+            else:
+                sinks.append(WebhookSink(session, a.webhook, nome=a.destino))
+        # default: o comportamento de antes (log no stdout; alerta no stdout e Telegram; resumo e
+        # heartbeat no Telegram), e JSONL/webhook recebem tudo
+        rotas_notif = {
+            "log": ["stdout"] + extras,
+            "alert": ["stdout", "telegram"] + extras,
+            "summary": ["telegram"] + extras,
+            "heartbeat": ["telegram"] + extras,
+        }
+        if NOTIFY_ROUTES:
+            rotas_notif.update(parse_rotas(NOTIFY_ROUTES, ["stdout", "telegram"] + extras))
+        router = NotifyRouter(sinks, rotas_notif)
+
+        def _publicar(texto: str, kind: str, **extra):
+            router.publicar(kind, texto, **extra)
+
+        async def requote_sniper(item):
+            chain_id, rota, amount_units = item
+            quotes = await cotar_rota(session, rota, amount_units, chain_id)
+            if not quotes:
+                return None
+            _, net, msg = avaliar_rota(rota, amount_units, chain_id, quotes, FEE_BPS)
+            return net, msg
+
+        def _sniper_fechou(texto):
+            print(f"[{time.strftime('%H:%M:%S')}] {texto}")
+            _publicar(texto, "summary")
+
+        # nos shards o sniper fica no processo pai, que recebe os alertas
+        sniper = Sniper(requote_sniper, _sniper_fechou, ALERT_THR, SNIPER_INTERVAL, SNIPER_MAX_SECONDS, SNIPER_MAX_ACTIVE) if SNIPER and not shard else None
+
+        # alertas esperando a marca do backend de coordenação (ver _alerta_coordenado)
+        alertas_coord = set()
+
+        def notifier(kind: str, msg: str, item=None, net=None, chave=None):
+            # item = (chain_id, rota, amount) quando o aviso vem de uma rota reavaliável
+            # chave = identidade estável de um aviso sem item (cross-chain: (sym, compra, venda)),
+            #         já que o texto traz os preços do ciclo
+            if shard:
+                shard[2].put(("aviso", kind, msg, item, net, chave))
+                return
+            if kind == 'alert' and coord:
+                # a marca no backend é I/O bloqueante: sai do event loop e o aviso segue depois dela
+                t = asyncio.create_task(_alerta_coordenado(msg, item, net, chave))
+                alertas_coord.add(t)
+                t.add_done_callback(alertas_coord.discard)
+                return
+            _despachar(kind, msg, item, net, chave)
+
+        async def _alerta_coordenado(msg, item, net, chave):
+            if item:
+                chave_coord = f"{chave_rota(item[0], item[1])}:{item[2]}"
+            elif chave is not None:
+                chave_coord = ":".join(str(c).lower() for c in chave)
+            else:
+                chave_coord = msg.split(" gross")[0]
+            try:
+                primeiro = await asyncio.to_thread(coord.primeiro_alerta, chave_coord, ALERT_DEDUP_SECONDS)
+            except Exception as e:
+                # backend fora: melhor um alerta duplicado que um perdido
+                print(f"⚠️ [coord] falha ao marcar alerta: {e.__class__.__name__}: {e}")
+                primeiro = True
+            if not primeiro:
+                _log(f"[COORD] alerta já enviado por outra instância: {msg}")
+                return
+            _despachar('alert', msg, item, net, chave)
+
+        async def aguardar_alertas_coord():
+            if alertas_coord:
+                await asyncio.gather(*list(alertas_coord), return_exceptions=True)
+
+        def _despachar(kind: str, msg: str, item=None, net=None, chave=None):
             if kind == 'alert':
-                send_telegram(msg)
+                # o sniper vê todo alerta, mesmo os que a deduplicação vai segurar
+                if sniper and item is not None and sniper.disparar(item, net, msg):
+                    _log(f"[SNIPER] acompanhando a cada {SNIPER_INTERVAL:g}s: {msg}")
+            # filtra por destino antes da deduplicação: cada destino tem as próprias janelas, e uma
+            # assinatura de limiar mais baixo não segura o aviso do canal principal
+            destinos = []
+            if kind != 'log' or net is None or net >= LOG_THR:
+                destinos.append(None)
+            if kind == 'log' and assinaturas and item is not None and net is not None:
+                destinos += [sub.destino for sub in assinaturas.casar(item, net, tipo_rota(item[1]))]
+            for destino in destinos:
+                if dedup:
+                    dedup.oferecer(kind, msg, item, net, destino, chave)
+                else:
+                    _entregar(kind, msg, [(net, msg, item, 1)], destino)
+
+        def _rotas_json(avisos):
+            return [{"net": a[0], "chain_id": a[2][0], "rota": list(a[2][1]), "amount": a[2][2]} for a in (avisos or []) if a[2]]
+
+        def _entregar(kind: str, texto: str, avisos=None, destino=None):
+            # avisos estruturados seguem junto (úteis no JSONL/webhook)
+            if destino is None:
+                _publicar(texto, kind, rotas=_rotas_json(avisos))
+            else:
+                # para a assinatura, o aviso que casou com os filtros dela já é o alerta
+                router.publicar_em(destino, "alert", texto, rotas=_rotas_json(avisos))
+
+        dedup = AlertDeduplicator(_entregar, NOTIFY_DEDUP, NOTIFY_DEDUP_IMPROVEMENT, NOTIFY_DIGEST) if NOTIFY_DEDUP > 0 and not shard else None
+
+        def _silencioso(kind: str, msg: str, item=None, net=None):
+            pass
+
+        async def triagem(base_token, other, chain_id, screen, leg_cache, amount_units, rotas_s, rotas_t, agg):
+            """Fase 1: um tamanho pequeno, um único agregador (agg), sem retry.
+            Retorna as rotas (simples, tri) que merecem a confirmação completa.
+            """
+            kw = {"aggregator_list": [agg], "attempts": 1, "cache": leg_cache}
+            # sanity/recheck ficam para a fase 2; aqui só coletamos o net aproximado
+            local = []
+            await buscar_arbitragem_simples_base_async(session, base_token, other, amount_units, chain_id, LOG_THR, ALERT_THR, FEE_BPS, local, _silencioso, float("inf"), 0, RECHECK_TOL, rotas=rotas_s, **kw)
+            await buscar_arbitragem_triangulo_base_async(session, base_token, other, amount_units, chain_id, LOG_THR, ALERT_THR, FEE_BPS, local, _silencioso, float("inf"), 0, RECHECK_TOL, rotas=rotas_t, **tri_kw, **kw)
+            screen.extend(local)
+
+            corte = SCAN_LOG_THR - TWO_PHASE_MARGIN
+            aprovadas = [r for r in local if r[0] >= corte]
+            rotas_s = [r[5][1] for r in aprovadas if r[2] == "SIMPLES"]
+            rotas_t = [(r[5][1], r[5][2]) for r in aprovadas if r[2] == "TRI"]
+            _log(f"[{chain_name(chain_id)}][TRIAGEM] {token_symbol(base_token, chain_id)} via {agg}: {len(rotas_s)} simples + {len(rotas_t)} tri ≥ {corte:.2f}%")
+            return rotas_s, rotas_t
+
+        async def grade_de_amounts(chain_id, base_token, leg_cache):
+            """Amounts (unidades nativas) da base: AMOUNTS_<SÍMBOLO> se definido; stablecoins
+            usam AMOUNTS_USDC; demais bases convertem AMOUNTS_USDC pela taxa base primária→base.
+            """
+            sym = token_symbol(base_token, chain_id)
+            dec = get_token_decimals(chain_id, base_token)
+            env = os.getenv(f"AMOUNTS_{sym}")
+            if env:
+                return [int(a * (10**dec)) for a in _parse_amounts_list(env)]
+            primary = get_base_token_for_chain(chain_id)
+            if not primary or primary.lower() == base_token.lower() or sym in _STABLES:
+                return [int(a * (10**dec)) for a in AMOUNTS_USDC]
+            # taxa velha demais converteria a grade por um preço que já não vale: cota de novo
+            rate = cached_rate(chain_id, primary, base_token, SPEC_MAX_AGE)
+            pdec = get_token_decimals(chain_id, primary)
+            if rate is None:
+                ref = int(min(AMOUNTS_USDC) * (10**pdec))
+                q = await get_best_quote_async(session, primary, base_token, ref, chain_id, cache=leg_cache)
+                rate = q["toAmount"] / ref if q else None
+            if rate is None:
+                print(f"⚠️ Sem taxa {token_symbol(primary, chain_id)}→{sym} na {chain_name(chain_id)}; base ignorada neste ciclo")
+                return []
+            return [int(a * (10**pdec) * rate) for a in AMOUNTS_USDC]
+
+        async def varrer_chain(chain_id, found, screen, leg_cache, custo):
+            bases = get_base_tokens_for_chain(chain_id)
+            tokens = get_default_tokens_for_chain(chain_id)
+            plano = build_scan_plan(bases, tokens)
+
+            if not bases or not any(s or t for _, s, t in plano):
+                print(f"⚠️ Config incompleta na {chain_name(chain_id)}: bases={bases} tokens={len(tokens)}")
+                return
+
+            if anel or coord:
+                plano = [(b, [x for x in s if _minha_rota(chain_id, (b, x))],
+                          [bc for bc in t if _minha_rota(chain_id, (b,) + tuple(bc))]) for b, s, t in plano]
+
+            if amostragem:
+                chaves = [(chain_id, (b, x)) for b, s, _ in plano for x in s]
+                chaves += [(chain_id, (b,) + tuple(bc)) for b, _, t in plano for bc in t]
+                escolhidas, n_estrato = amostragem.amostrar(chain_id, chaves, lambda k: ultimo_net.get(k))
+                plano = [(b, [x for x in s if (chain_id, (b, x)) in escolhidas],
+                          [bc for bc in t if (chain_id, (b,) + tuple(bc)) in escolhidas]) for b, s, t in plano]
+                _log(f"[{chain_name(chain_id)}][AMOSTRA] {len(escolhidas)}/{len(chaves)} rotas ({n_estrato} do estrato obrigatório)")
+
+            # maior net recente primeiro (rota nunca vista também); rota que falhou fica no fim
+            prio = lambda r: ultimo_net.get((chain_id, r), float("inf"))
+
+            def lotes(base_token, rotas_s, rotas_t, grade):
+                """(tipo, amount, rotas) na ordem da confirmação. Com orçamento, os pares (rota, amount)
+                vão juntos do mais quente ao mais frio, e o corte leva só os frios; sem, amount a amount.
+                """
+                if CYCLE_BUDGET <= 0:
+                    for amount_units in grade:
+                        yield "SIMPLES", amount_units, rotas_s
+                        yield "TRI", amount_units, rotas_t
+                    return
+                pares = [(prio((base_token, x)), x.lower(), "SIMPLES", a, x) for x in rotas_s for a in grade]
+                for b, c in rotas_t:
+                    p = prio((base_token, b, c))
+                    if SYMMETRIC:
+                        # as duas direções lado a lado, para o triângulo simétrico continuar em par
+                        p = max(p, prio((base_token, c, b)))
+                    grupo = ",".join(sorted((b.lower(), c.lower())))
+                    pares += [(p, grupo, "TRI", a, (b, c)) for a in grade]
+                pares.sort(key=lambda x: (-x[0], x[1], x[3]))
+                for (tipo, amount_units), seq in itertools.groupby(pares, key=lambda x: (x[2], x[3])):
+                    yield tipo, amount_units, [x[4] for x in seq]
+
+            # todas as bases compartilham o mesmo leg_cache e o mesmo plano (ciclos sem repetição)
+            varrido = []
+            planos[chain_id] = varrido
+            for base_token, rotas_s, rotas_t in plano:
+                if CYCLE_BUDGET > 0:
+                    # se o orçamento acabar, sobram só as rotas frias
+                    rotas_s = sorted(rotas_s, key=lambda x: prio((base_token, x)), reverse=True)
+                    rotas_t = sorted(rotas_t, key=lambda bc: prio((base_token,) + tuple(bc)), reverse=True)
+                if not rotas_s and not rotas_t:
+                    continue
+                other = [t for t in tokens if t.lower() != base_token.lower()]
+                grade = await grade_de_amounts(chain_id, base_token, leg_cache)
+                if not grade:
+                    continue
+
+                if TWO_PHASE:
+                    if base_token.lower() == (get_base_token_for_chain(chain_id) or "").lower():
+                        screen_units = int(SCREEN_AMOUNT_USDC * (10**get_token_decimals(chain_id, base_token)))
+                    else:
+                        screen_units = min(grade)
+                    agg = SCREEN_AGGREGATOR or fastest_reliable_aggregator(chain_id, _aggs_for_chain(chain_id))
+                    # a triagem lê as pernas de todas as rotas; a confirmação, só as das aprovadas
+                    varrido.append((base_token, rotas_s, rotas_t, [screen_units], [agg]))
+                    with count_calls_into(custo, "triagem"):
+                        rotas_s, rotas_t = await triagem(base_token, other, chain_id, screen, leg_cache, screen_units, rotas_s, rotas_t, agg)
+                else:
+                    varrido.append((base_token, rotas_s, rotas_t, grade, None))
+
+                with count_calls_into(custo, "confirmacao"):
+                    for tipo, amount_units, lote in lotes(base_token, rotas_s, rotas_t, grade):
+                        if not lote:
+                            continue
+                        n0 = len(found)
+                        if tipo == "SIMPLES":
+                            await buscar_arbitragem_simples_base_async(session, base_token, other, amount_units, chain_id, SCAN_LOG_THR, ALERT_THR, FEE_BPS, found, notifier, SANITY_CAP, RECHECK_THR, RECHECK_TOL, rotas=lote, cache=leg_cache)
+                            chaves = [(chain_id, (base_token, x)) for x in lote]
+                        else:
+                            await buscar_arbitragem_triangulo_base_async(session, base_token, other, amount_units, chain_id, SCAN_LOG_THR, ALERT_THR, FEE_BPS, found, notifier, SANITY_CAP, RECHECK_THR, RECHECK_TOL, rotas=lote, cache=leg_cache, **tri_kw)
+                            chaves = [(chain_id, (base_token,) + tuple(bc)) for bc in lote]
+                        if deadline_expired():
+                            continue  # lote cortado pelo orçamento: não dá para saber quem falhou
+                        # rota cotada sem resultado (agregadores falharam) vai para o fim da fila; se
+                        # outro amount der certo no ciclo, atualizar_prioridades sobrescreve. No modo
+                        # simétrico o reverso sem resultado pode ter sido só pulado pela estimativa
+                        cotadas = {(r[3], r[5]) for r in found[n0:]}
+                        for k in chaves:
+                            if k not in cotadas and not (tipo == "TRI" and SYMMETRIC):
+                                ultimo_net[k] = float("-inf")
+
+        def varrer_cross_chain(found, max_age):
+            """Compara preços do mesmo token entre chains, líquido de taxas e bridge."""
+            for net, gross, sym, compra, venda, p_compra, p_venda, bps in find_divergences(CHAIN_IDS, max_age, FEE_BPS, BRIDGE_TABLE, BRIDGE_DEFAULT_BPS):
+                msg = f"[{chain_name(compra)}→{chain_name(venda)}] CROSS {sym} {p_compra:.6g}→{p_venda:.6g} USDC gross {gross:.2f}% | net {net:.2f}% (bridge {bps:g} bps)"
+                found.append((net, msg, "CROSS", compra, None, (sym, compra, venda), None, relogio()))
+                if net > SANITY_CAP:
+                    print(f"[{time.strftime('%H:%M:%S')}] SUSPEITO (>{SANITY_CAP:.2f}%): {msg}")
+                    continue
+                if net >= LOG_THR:
+                    chave = ("CROSS", sym, compra, venda)
+                    notifier('log', msg, net=net, chave=chave)
+                    if net >= ALERT_THR:
+                        notifier('alert', msg, net=net, chave=chave)
+
+        def atualizar_prioridades(found):
+            """Guarda o melhor net de cada (chain, rota) na varredura mais recente."""
+            melhor = {}
+            for r in found:
+                if r[2] in ("SIMPLES", "TRI"):
+                    k = (r[3], r[5])
+                    melhor[k] = max(r[0], melhor.get(k, float("-inf")))
+            ultimo_net.update(melhor)
 
         async def run_once():
             nonlocal cycle
             cycle += 1
+            if fita:
+                fita.ciclo = cycle
             found = []
+            screen = []
+            custo = {"triagem": 0, "confirmacao": 0}
+            # cache de pernas do ciclo: primeira perna (BASE→X) compartilhada por simples e triângulos.
+            # Só as pernas do prefetch atravessam a pausa; o resto do ciclo não vai para o seguinte
+            leg_cache = QuoteCache()
+            if cache_persistente:
+                leg_cache.absorver(cache_persistente)
+
+            inicio = time.time()
+            stats0 = http_stats()
+            cortes = {}
+            with deadline_scope(CYCLE_BUDGET, cortes):
+                if CONCURRENT_CHAINS:
+                    # todas as chains ao mesmo tempo: preços comparáveis entre si no estágio cross-chain
+                    await asyncio.gather(*(varrer_chain(c, found, screen, leg_cache, custo) for c in CHAIN_IDS))
+                else:
+                    for chain_id in CHAIN_IDS:
+                        await varrer_chain(chain_id, found, screen, leg_cache, custo)
+            atualizar_prioridades(found)
+
+            if intervalo:
+                d = {k: v - stats0.get(k, 0) for k, v in http_stats().items()}
+                intervalo.atualizar(found, d["http_calls"], d["http_errors"], d["http_429"])
+                _log(f"[INTERVALO] {intervalo.intervalo:.1f}s ({intervalo.motivo})")
+
+            if CROSS_CHAIN and len(CHAIN_IDS) > 1:
+                varrer_cross_chain(found, time.time() - inicio + 1)
+
+            if SPECULATIVE:
+                _log(f"[ESPECULATIVO] {speculative_stats()}")
+            if SYMMETRIC:
+                _log(f"[SIMÉTRICO] {symmetric_stats()}")
+            _log(f"[CACHE] pernas hits={leg_cache.hits} misses={leg_cache.misses}")
 
+            await enviar_resumo("Resumo do ciclo", found, screen, custo, extra=_linha_cortes(cortes))
+
+            if HEARTBEAT_EVERY > 0 and cycle % HEARTBEAT_EVERY == 0:
+                enviar_heartbeat(f" | intervalo={intervalo.intervalo:.1f}s ({intervalo.motivo})" if intervalo else "")
+
+        async def enviar_resumo(titulo, found, screen, custo, extra=""):
+            if shard:
+                # o resumo é montado no processo pai, com os resultados de todos os shards
+                shard[2].put(("resumo", shard[0], found, screen, custo))
+                return
+            if historico:
+                historico.registrar(found)
+                # com TWO_PHASE, as rotas da triagem (inclusive as barradas) também ficam no histórico
+                historico.registrar(screen, fase="triagem")
+            top_de = found
+            if coord:
+                # todas publicam o próprio top; só o líder envia, juntando o das outras instâncias
+                if not await asyncio.to_thread(coord.compartilhar_resumo, found, SUMMARY_TOP_K):
+                    return
+                top_de = list(found) + await asyncio.to_thread(coord.resumos_remotos)
+            rodape = ""
+            if TWO_PHASE:
+                confirmadas = len({(r[3], r[5]) for r in found})
+                rodape = f"\nChamadas: triagem={custo.get('triagem', 0)} | confirmação={custo.get('confirmacao', 0)} | rotas confirmadas={confirmadas}/{len(screen)}"
+            rodape += extra
+
+            if ALWAYS_SUMMARY and top_de:
+                top = sorted(top_de, key=lambda x: x[0], reverse=True)[:SUMMARY_TOP_K]
+                linhas = [f"{i+1}. {r[1]}" for i,r in enumerate(top)]
+                _publicar(f"{titulo}:\n" + "\n".join(linhas) + rodape, "summary")
+            elif ALWAYS_SUMMARY and screen:
+                melhor = max(screen, key=lambda x: x[0])
+                _publicar(f"{titulo}: nenhuma rota passou na triagem (melhor: {melhor[1]})" + rodape, "summary")
+            elif ALWAYS_SUMMARY and not found:
+                _publicar(f"{titulo}: nenhum par/trio retornou cotação válida (todos os agregadores falharam)." + rodape, "summary")
+
+        def enviar_heartbeat(extra=""):
+            if shard or (coord and not coord.lider):
+                return
+            if coord:
+                extra += "\n" + coord.status_linha()
+            names = [chain_name(c) for c in CHAIN_IDS]
+            if telegram:
+                extra += f" | telegram={telegram.stats}"
+            extra += f" | destinos={router.stats()}"
+            if dedup:
+                extra += f" | avisos={dedup.stats}"
+            if historico:
+                extra += f" | histórico={historico.stats}"
+            _publicar(f"{HEARTBEAT_TAG}: vivo às {time.strftime('%H:%M:%S')} | chains={names} | amounts={AMOUNTS_USDC} USDC | log={LOG_THR}% | alert={ALERT_THR}%" + extra, "heartbeat")
+
+        async def varrer_uma_chain(chain_id):
+            found, screen = [], []
+            custo = {"triagem": 0, "confirmacao": 0}
+            with deadline_scope(CYCLE_BUDGET, custo.setdefault("cortes", {})):
+                await varrer_chain(chain_id, found, screen, QuoteCache(), custo)
+            atualizar_prioridades(found)
+            return found, screen, custo
+
+        async def run_workers():
+            """Uma tarefa supervisionada por chain; resumos/heartbeats por janela de tempo."""
+            hub = ResultsHub(CHAIN_IDS)
+            workers = [
+                asyncio.create_task(supervise_chain(
+                    c, varrer_uma_chain, hub,
+                    interval=_env_por_chain("SCAN_INTERVAL_SECONDS", c, INTERVAL, float),
+                    stall_timeout=_env_por_chain("CHAIN_STALL_SECONDS", c, 300, float),
+                    max_concurrency=_env_por_chain("MAX_CONCURRENCY", c, 0, int),
+                    nomear=chain_name,
+                ))
+                for c in CHAIN_IDS
+            ]
+            janela = 0
+            try:
+                while True:
+                    await asyncio.sleep(SUMMARY_INTERVAL)
+                    janela += 1
+                    found, screen, custo = hub.drenar()
+                    if CROSS_CHAIN and len(CHAIN_IDS) > 1:
+                        varrer_cross_chain(found, SUMMARY_INTERVAL + max(_env_por_chain("SCAN_INTERVAL_SECONDS", c, INTERVAL, float) for c in CHAIN_IDS))
+                    await enviar_resumo(f"Resumo da janela ({SUMMARY_INTERVAL:.0f}s)", found, screen, custo, extra=_linha_cortes(custo.get("cortes", {})))
+                    if HEARTBEAT_EVERY > 0 and janela % HEARTBEAT_EVERY == 0:
+                        enviar_heartbeat("\n" + hub.status_linha(chain_name))
+            finally:
+                for w in workers:
+                    w.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+        async def montar_rotas():
+            """[(chain_id, rota, amount)] de todas as chains/bases/amounts do plano de varredura."""
+            rotas = []
+            leg_cache = QuoteCache()
             for chain_id in CHAIN_IDS:
-                base_token = get_base_token_for_chain(chain_id)
+                bases = get_base_tokens_for_chain(chain_id)
                 tokens = get_default_tokens_for_chain(chain_id)
-                other = [t for t in tokens if base_token and t.lower()!=base_token.lower()]
+                for base_token, simples, tri in build_scan_plan(bases, tokens):
+                    for amount_units in await grade_de_amounts(chain_id, base_token, leg_cache):
+                        rotas += [(chain_id, (base_token, x), amount_units) for x in simples]
+                        rotas += [(chain_id, (base_token, b, c), amount_units) for b, c in tri]
+            return [r for r in rotas if _do_shard(r[0], r[1])]
 
-                if not base_token or not other:
-                    print(f"⚠️ Config incompleta na {_chain_name(chain_id)}: base={base_token} tokens={len(other)}")
-                    continue
+        async def avaliar_item(item, quotes):
+            """Etapa de avaliação do pipeline: net, sanity, recheck e limiares."""
+            chain_id, rota, amount_units = item
+            gross, net, msg = avaliar_rota(rota, amount_units, chain_id, quotes, FEE_BPS)
+            registro = (net, msg, tipo_rota(rota), chain_id, amount_units, rota, pernas_de(amount_units, quotes), relogio())
 
-                base_decimals = get_token_decimals(chain_id, base_token)
+            if net > SANITY_CAP:
+                print(f"[{time.strftime('%H:%M:%S')}] SUSPEITO (>{SANITY_CAP:.2f}%): {msg}")
+                return registro, []
 
-                for amt_usdc in AMOUNTS_USDC:
-                    amount_units = int(float(amt_usdc) * (10**base_decimals))
-                    await buscar_arbitragem_simples_base_async(session, base_token, other, amount_units, chain_id, LOG_THR, ALERT_THR, FEE_BPS, found, notifier, SANITY_CAP, RECHECK_THR, RECHECK_TOL)
-                    await buscar_arbitragem_triangulo_base_async(session, base_token, other, amount_units, chain_id, LOG_THR, ALERT_THR, FEE_BPS, found, notifier, SANITY_CAP, RECHECK_THR, RECHECK_TOL)
+            if RECHECK_THR > 0 and net >= RECHECK_THR:
+                r_net = await recheck_rota(session, rota, amount_units, chain_id, FEE_BPS)
+                if r_net is None:
+                    print(f"[{time.strftime('%H:%M:%S')}] DESCARTADO: recheck sem consenso | {msg}")
+                    return registro, []
+                if abs(r_net - net) > RECHECK_TOL:
+                    print(f"[{time.strftime('%H:%M:%S')}] DESCARTADO no recheck (Δ>{RECHECK_TOL:.2f}%). antes={net:.2f}% depois={r_net:.2f}% | {msg}")
+                    return registro, []
 
-            if ALWAYS_SUMMARY and found:
-                top = sorted(found, key=lambda x: x[0], reverse=True)[:SUMMARY_TOP_K]
-                linhas = [f"{i+1}. {msg}" for i,(_,msg,_,_,_) in enumerate(top)]
-                send_telegram("Resumo do ciclo:\n" + "\n".join(linhas))
-            elif ALWAYS_SUMMARY and not found:
-                send_telegram("Resumo do ciclo: nenhum par/trio retornou cotação válida (todos os agregadores falharam).")
+            avisos = []
+            if net >= SCAN_LOG_THR:
+                avisos.append(('log', msg, item, net))
+                if net >= ALERT_THR:
+                    avisos.append(('alert', msg, item, net))
+            return registro, avisos
 
-            if HEARTBEAT_EVERY > 0 and cycle % HEARTBEAT_EVERY == 0:
-                names = [_chain_name(c) for c in CHAIN_IDS]
-                send_telegram(f"{HEARTBEAT_TAG}: vivo às {time.strftime('%H:%M:%S')} | chains={names} | amounts={AMOUNTS_USDC} USDC | log={LOG_THR}% | alert={ALERT_THR}%")
+        async def run_stream():
+            """Modo contínuo (STREAM_MODE): agenda → fetchers → avaliador → notificador."""
+            rotas = await montar_rotas()
+            if not rotas:
+                print("⚠️ Nenhuma rota para varrer no modo contínuo.")
+                return
+            # cache curto: a mesma perna pedida por várias rotas em poucos segundos é cotada uma vez
+            # (sempre menor que o período de revarredura, para a rota não reusar a própria cotação)
+            if EVENT_TRIGGERS:
+                menor_periodo = TRIGGER_PROBE_SECONDS
+            elif PRIORITY_SCHEDULER:
+                menor_periodo = ROUTE_RESCAN_MIN
+            else:
+                menor_periodo = ROUTE_RESCAN
+            stream_cache = QuoteCache(ttl=min(LEG_CACHE_TTL, menor_periodo / 2))
+
+            async def cotar_item(item):
+                chain_id, rota, amount_units = item
+                if coord and not coord.dono_da_rota(chain_id, rota):
+                    # shard com outra instância no momento: a agenda segue, mas a rota não é cotada
+                    return None
+                return await cotar_rota(session, rota, amount_units, chain_id, cache=stream_cache)
+
+            probes = None
+            if EVENT_TRIGGERS:
+                # sondas contra a base primária de cada chain, para todo token que aparece em alguma rota
+                tokens_por_chain, amount_por_chain = {}, {}
+                for chain_id in CHAIN_IDS:
+                    primaria = get_base_token_for_chain(chain_id)
+                    toks = {t.lower(): t for c, r, _ in rotas if c == chain_id for t in r if t.lower() != primaria.lower()}
+                    tokens_por_chain[chain_id] = (primaria, list(toks.values()))
+                    amount_por_chain[chain_id] = int(TRIGGER_PROBE_AMOUNT * (10**get_token_decimals(chain_id, primaria)))
+                probes = PriceProbes(session, tokens_por_chain, amount_por_chain, TRIGGER_PROBE_SECONDS)
+                agenda = AgendaEventos(rotas, probes, TRIGGER_BPS, TRIGGER_MAX_SECONDS)
+            elif PRIORITY_SCHEDULER:
+                # custo estimado de um item: pernas × agregadores consultados por perna
+                agenda = AgendaPrioridade(rotas, ALERT_THR, ROUTE_RESCAN_MIN, ROUTE_RESCAN_MAX, REQUEST_BUDGET,
+                                          custo_fn=lambda item: len(item[1]) * len(_aggs_for_chain(item[0])))
+            else:
+                agenda = AgendaFixa(rotas, ROUTE_RESCAN)
+            pipeline = StreamPipeline(agenda, cotar_item, avaliar_item, notifier, fetchers=STREAM_FETCHERS)
+            custo = {}
+            with count_calls_into(custo, "stream"):
+                tarefa = asyncio.create_task(pipeline.run())
+                sondas = asyncio.create_task(probes.run(agenda.preco_atualizado)) if probes else None
+
+            janela = 0
+            chamadas_antes = 0
+            try:
+                while True:
+                    done, _ = await asyncio.wait([t for t in (tarefa, sondas) if t], timeout=SUMMARY_INTERVAL)
+                    if done:
+                        for t in done:
+                            t.result()
+                        return
+                    janela += 1
+                    found = pipeline.drenar_janela()
+                    if CROSS_CHAIN and len(CHAIN_IDS) > 1:
+                        varrer_cross_chain(found, SUMMARY_INTERVAL + ROUTE_RESCAN)
+                    chamadas = custo.get("stream", 0) - chamadas_antes
+                    chamadas_antes = custo.get("stream", 0)
+                    extra = f"\nRotas: {len(rotas)} | avaliadas na janela: {len(found)} | chamadas: {chamadas}"
+                    await enviar_resumo(f"Resumo da janela ({SUMMARY_INTERVAL:.0f}s)", found, [], {}, extra=extra)
+                    if HEARTBEAT_EVERY > 0 and janela % HEARTBEAT_EVERY == 0:
+                        extra = f"\nstream: {pipeline.stats}"
+                        if probes:
+                            extra += f"\ngatilhos: {agenda.disparos} | sondagens: {probes.sondagens}"
+                        if PRIORITY_SCHEDULER:
+                            quentes = [f"{chain_name(c)} {'→'.join(token_symbol(t, c) for t in r + r[:1])} p={p:.2f} net≈{(e if e is not None else float('nan')):.2f}%"
+                                       for p, e, (c, r, _) in agenda.mais_quentes()]
+                            extra += "\nmais quentes: " + " | ".join(quentes)
+                        enviar_heartbeat(extra)
+            finally:
+                for t in (tarefa, sondas):
+                    if t:
+                        t.cancel()
+                await asyncio.gather(*(t for t in (tarefa, sondas) if t), return_exceptions=True)
+
+        async def run_shards():
+            """Processo pai: sobe os shards, repassa avisos e junta os resumos por janela."""
+            pool = ShardPool(_rodar_shard, SHARDS, backoff_max=SHARD_RESTART_BACKOFF_MAX, max_reinicios=SHARD_MAX_RESTARTS)
+            hub = ResultsHub(range(SHARDS))
+            pool.iniciar()
+            janela = 0
+            proximo = time.monotonic() + SUMMARY_INTERVAL
+            try:
+                while True:
+                    msg = await pool.receber(timeout=1.0)
+                    if msg and msg[0] == "aviso":
+                        notifier(*msg[1:])
+                    elif msg and msg[0] == "resumo":
+                        _, indice, found, screen, custo = msg
+                        hub.publicar(indice, found, screen, custo, None)
+                    for indice, code, espera in pool.verificar():
+                        hub.registrar_erro(indice, f"processo saiu (exitcode={code})")
+                        if espera is None:
+                            print(f"⚠️ [shard {indice}] processo saiu (exitcode={code}); {SHARD_MAX_RESTARTS} reinícios seguidos, desistindo")
+                        else:
+                            print(f"⚠️ [shard {indice}] processo saiu (exitcode={code}); reiniciando em {espera:.0f}s")
+                    if time.monotonic() >= proximo:
+                        proximo += SUMMARY_INTERVAL
+                        janela += 1
+                        found, screen, custo = hub.drenar()
+                        await enviar_resumo(f"Resumo da janela ({SUMMARY_INTERVAL:.0f}s, {SHARDS} shards)", found, screen, custo, extra=_linha_cortes(custo.get("cortes", {})))
+                        if HEARTBEAT_EVERY > 0 and janela % HEARTBEAT_EVERY == 0:
+                            enviar_heartbeat("\n" + hub.status_linha(lambda i: f"shard {i}"))
+            finally:
+                pool.parar()
 
-        if ONE_SHOT:
-            await run_once()
-        else:
-            while True:
+        envio = asyncio.create_task(telegram.run()) if telegram else None
+        router.iniciar()
+        agrupamento = asyncio.create_task(dedup.run()) if dedup else None
+
+        quadro = None
+        if QUOTE_BOARD_NAME and not (SHARDS > 1 and not shard):
+            # um escritor por quadro: cada processo de shard publica no próprio
+            quadro = QuoteBoard(f"{QUOTE_BOARD_NAME}-{shard[0]}" if shard else QUOTE_BOARD_NAME, QUOTE_BOARD_SLOTS)
+            add_quote_listener(quadro.publicar)
+
+        coordenacao = None
+        if coord:
+            # leases antes da primeira varredura; depois renovados em segundo plano
+            await asyncio.to_thread(coord.atualizar)
+            _log(coord.status_linha())
+            coordenacao = asyncio.create_task(coord.manter())
+        if fita:
+            set_tape(fita)
+        try:
+            if ONE_SHOT:
                 await run_once()
-                await asyncio.sleep(INTERVAL)
+                await aguardar_alertas_coord()
+                if sniper:
+                    await sniper.aguardar()
+            elif SHARDS > 1 and not shard:
+                await run_shards()
+            elif STREAM_MODE:
+                await run_stream()
+            elif CHAIN_WORKERS:
+                await run_workers()
+            else:
+                while True:
+                    await run_once()
+                    if fita and fita.reproduzindo:
+                        # reprodução: para no último ciclo gravado; em velocidade máxima, sem pausa
+                        if cycle >= fita.ultimo_ciclo:
+                            break
+                        if not fita.velocidade:
+                            continue
+                    pausa = intervalo.intervalo if intervalo else INTERVAL
+                    if PREFETCH:
+                        if not PREFETCH_TTL:
+                            cache_persistente.ttl = pausa
+                        pernas = planejar_pernas(planos, ultimo_net, PREFETCH_MAX_LEGS)
+                        n = await prefetch_na_janela(session, cache_persistente, pernas, pausa)
+                        _log(f"[PREFETCH] {n}/{len(pernas)} pernas aquecidas em {pausa:.0f}s")
+                    else:
+                        await asyncio.sleep(pausa)
+        finally:
+            await aguardar_alertas_coord()
+            if sniper:
+                await sniper.parar()
+            if coordenacao:
+                coordenacao.cancel()
+                await asyncio.gather(coordenacao, return_exceptions=True)
+            if quadro:
+                remove_quote_listener(quadro.publicar)
+                quadro.fechar()
+            if agrupamento:
+                agrupamento.cancel()
+                await asyncio.gather(agrupamento, return_exceptions=True)
+                dedup.descarregar()
+            await router.parar(timeout=10)
+            if envio:
+                # o que ficou na fila (ex.: resumo do ONE_SHOT) ainda sai antes de encerrar
+                await telegram.esvaziar(timeout=10)
+                envio.cancel()
+                await asyncio.gather(envio, return_exceptions=True)
+            if historico:
+                await asyncio.to_thread(historico.fechar)
+            if fita:
+                set_tape(None)
+                if fita.reproduzindo:
+                    _log(f"[FITA] {fita.stats}")
+                    fita.fechar()
+                else:
+                    await asyncio.to_thread(fita.fechar)
+
+def _rodar_shard(indice, total, fila):
+    """Ponto de entrada de cada processo de shard (precisa ser importável para o spawn)."""
+    try:
+        asyncio.run(main_loop(shard=(indice, total, fila)))
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
     try:
@@ -1,67 +1,180 @@
 
+import asyncio
+import os
 import time
 from itertools import permutations
-from get_best_quote_async import get_best_quote_async
+from get_best_quote_async import get_best_quote_async, deadline_expired, note_shed, relogio
+from quote_cache import predict_amount, round_trip_factor
+from route_eval import pernas_de
 from utils import net_percent
-from tokens_config import token_symbol
-
-def _chain_name(chain_id: int) -> str:
-    return {
-        1: "Ethereum",
-        10: "Optimism",
-        56: "BNB Smart Chain",
-        100: "Gnosis",
-        137: "Polygon",
-        250: "Fantom",
-        42161: "Arbitrum",
-        43114: "Avalanche",
-        8453: "Base",
-    }.get(chain_id, str(chain_id))
-
-async def buscar_arbitragem_triangulo_base_async(session, base_token, other_tokens, amount_in_base, chain_id, log_thr, alert_thr, fee_bps_per_swap, collector, notifier, sanity_cap, recheck_thr, recheck_tol):
+from tokens_config import token_symbol, chain_name
+
+DEBUG = str(os.getenv("DEBUG", "0")).lower() in {"1", "true", "yes"}
+
+def _log(msg: str):
+    if DEBUG:
+        print(msg)
+
+# contadores do modo especulativo (rotas disparadas em paralelo / pernas recotadas)
+_SPEC_STATS = {"rotas": 0, "recotadas": 0, "fallback": 0}
+
+def speculative_stats():
+    return dict(_SPEC_STATS)
+
+# contadores do modo simétrico (reversos pulados pela estimativa / confirmados)
+_SYM_STATS = {"pulados": 0, "confirmados": 0}
+
+def symmetric_stats():
+    return dict(_SYM_STATS)
+
+async def _cotar_triangulo(session, base_token, token_b, token_c, amount_in_base, chain_id, **quote_kw):
+    """Cotação sequencial: cada perna espera o toAmount da anterior (~3 RTT)."""
+    q_ab = await get_best_quote_async(session, base_token, token_b, amount_in_base, chain_id, **quote_kw)
+    if not q_ab: return None
+    q_bc = await get_best_quote_async(session, token_b, token_c, q_ab["toAmount"], chain_id, **quote_kw)
+    if not q_bc: return None
+    q_ca = await get_best_quote_async(session, token_c, base_token, q_bc["toAmount"], chain_id, **quote_kw)
+    if not q_ca: return None
+    return q_ab, q_bc, q_ca
+
+def _desvio_pct(real, previsto):
+    return abs(real - previsto) / previsto * 100.0 if previsto else float("inf")
+
+def _reescalar(q, real, previsto):
+    # entrada real dentro da tolerância: ajusta a saída proporcionalmente
+    return {**q, "toAmount": int(q["toAmount"] * real / previsto)}
+
+async def _cotar_triangulo_especulativo(session, base_token, token_b, token_c, amount_in_base, chain_id, spec_tol_pct, **quote_kw):
+    """Dispara as três pernas de uma vez com amounts previstos pelas taxas em cache (~1 RTT).
+    Só recota as pernas cuja entrada real difere da prevista em mais de spec_tol_pct.
+    """
+    max_age = float(os.getenv("SPECULATIVE_MAX_AGE_SECONDS", "300"))
+    pred_b = predict_amount(chain_id, base_token, token_b, amount_in_base, max_age)
+    pred_c = predict_amount(chain_id, token_b, token_c, pred_b, max_age) if pred_b else None
+    if not pred_b or not pred_c:
+        _SPEC_STATS["fallback"] += 1
+        return await _cotar_triangulo(session, base_token, token_b, token_c, amount_in_base, chain_id, **quote_kw)
+
+    _SPEC_STATS["rotas"] += 1
+    q_ab, q_bc, q_ca = await asyncio.gather(
+        get_best_quote_async(session, base_token, token_b, amount_in_base, chain_id, **quote_kw),
+        get_best_quote_async(session, token_b, token_c, pred_b, chain_id, **quote_kw),
+        get_best_quote_async(session, token_c, base_token, pred_c, chain_id, **quote_kw),
+    )
+    if not q_ab: return None
+
+    if not q_bc or _desvio_pct(q_ab["toAmount"], pred_b) > spec_tol_pct:
+        _SPEC_STATS["recotadas"] += 1
+        q_bc = await get_best_quote_async(session, token_b, token_c, q_ab["toAmount"], chain_id, **quote_kw)
+        if not q_bc: return None
+    else:
+        q_bc = _reescalar(q_bc, q_ab["toAmount"], pred_b)
+
+    if not q_ca or _desvio_pct(q_bc["toAmount"], pred_c) > spec_tol_pct:
+        _SPEC_STATS["recotadas"] += 1
+        q_ca = await get_best_quote_async(session, token_c, base_token, q_bc["toAmount"], chain_id, **quote_kw)
+        if not q_ca: return None
+    else:
+        q_ca = _reescalar(q_ca, q_bc["toAmount"], pred_c)
+
+    return q_ab, q_bc, q_ca
+
+def _agrupar_simetricos(pares):
+    """Agrupa (B, C) e (C, B) do mesmo par não ordenado, preservando a ordem de chegada."""
+    grupos = {}
+    for token_b, token_c in pares:
+        grupos.setdefault(frozenset((token_b.lower(), token_c.lower())), []).append((token_b, token_c))
+    return list(grupos.values())
+
+def _estimar_reverso(chain_id, base_token, token_b, token_c, fator_ida, max_age=None):
+    """Estima o fator final de A→C→B→A a partir do resultado de A→B→C→A e do quadro de spreads.
+    ida * volta = s(A,B) * s(B,C) * s(C,A), onde s(X,Y) = taxa(X→Y) * taxa(Y→X).
+    """
+    fatores = [
+        round_trip_factor(chain_id, base_token, token_b, max_age),
+        round_trip_factor(chain_id, token_b, token_c, max_age),
+        round_trip_factor(chain_id, token_c, base_token, max_age),
+    ]
+    if not fator_ida or any(f is None for f in fatores):
+        return None
+    return fatores[0] * fatores[1] * fatores[2] / fator_ida
+
+async def buscar_arbitragem_triangulo_base_async(session, base_token, other_tokens, amount_in_base, chain_id, log_thr, alert_thr, fee_bps_per_swap, collector, notifier, sanity_cap, recheck_thr, recheck_tol, rotas=None, especulativo=False, spec_tol_pct=0.5, simetrico=False, sym_margin_pct=0.3, **quote_kw):
+    # rotas: subconjunto de pares (B, C) a avaliar (default: permutations(other_tokens, 2))
+    # especulativo: dispara as 3 pernas em paralelo com amounts previstos (ver _cotar_triangulo_especulativo)
+    # simetrico: avalia A→B→C→A e A→C→B→A juntos; o reverso só é confirmado se a estimativa
+    #            pelo quadro de spreads ficar a menos de sym_margin_pct do log_thr
+    # quote_kw: repassado a get_best_quote_async (ex.: aggregator_list, attempts, cache)
     la = token_symbol(base_token, chain_id)
-    chain = _chain_name(chain_id)
+    chain = chain_name(chain_id)
 
-    for token_b, token_c in permutations(other_tokens, 2):
+    async def avaliar(token_b, token_c):
+        """Avalia uma direção; retorna o fator final (saída/entrada) ou None."""
+        if deadline_expired():
+            # orçamento do ciclo esgotado: as rotas restantes (menor prioridade) são descartadas
+            note_shed("rotas_tri")
+            return None
         lb = token_symbol(token_b, chain_id)
         lc = token_symbol(token_c, chain_id)
 
-        q_ab = await get_best_quote_async(session, base_token, token_b, amount_in_base, chain_id)
-        if not q_ab: continue
-
-        q_bc = await get_best_quote_async(session, token_b, token_c, q_ab["toAmount"], chain_id)
-        if not q_bc: continue
-
-        q_ca = await get_best_quote_async(session, token_c, base_token, q_bc["toAmount"], chain_id)
-        if not q_ca: continue
+        if especulativo:
+            pernas = await _cotar_triangulo_especulativo(session, base_token, token_b, token_c, amount_in_base, chain_id, spec_tol_pct, **quote_kw)
+        else:
+            pernas = await _cotar_triangulo(session, base_token, token_b, token_c, amount_in_base, chain_id, **quote_kw)
+        if not pernas: return None
+        q_ab, q_bc, q_ca = pernas
+        fator = q_ca["toAmount"] / amount_in_base
 
         retorno_final = q_ca["toAmount"] - amount_in_base
         gross = (retorno_final / amount_in_base) * 100.0
         net = net_percent(gross, swaps=3, fee_bps_per_swap=fee_bps_per_swap)
 
         msg = f"[{chain}] TRI {la}→{lb}→{lc}→{la} gross {gross:.2f}% | net {net:.2f}% via {q_ab['aggregator']} + {q_bc['aggregator']} + {q_ca['aggregator']}"
-        collector.append((net, msg, "TRI", chain_id, amount_in_base))
+        collector.append((net, msg, "TRI", chain_id, amount_in_base, (base_token, token_b, token_c), pernas_de(amount_in_base, pernas), relogio()))
 
         if net > sanity_cap:
             print(f"[{time.strftime('%H:%M:%S')}] SUSPEITO (>{sanity_cap:.2f}%): {msg}")
-            continue
+            return fator
 
         if recheck_thr > 0 and net >= recheck_thr:
             non_ps = ["1inch","0x","KyberSwap","OpenOcean","Odos"]
-            rq_ab = await get_best_quote_async(session, base_token, token_b, amount_in_base, chain_id, aggregator_list=non_ps)
-            if not rq_ab: continue
-            rq_bc = await get_best_quote_async(session, token_b, token_c, rq_ab["toAmount"], chain_id, aggregator_list=non_ps)
-            if not rq_bc: continue
-            rq_ca = await get_best_quote_async(session, token_c, base_token, rq_bc["toAmount"], chain_id, aggregator_list=non_ps)
-            if not rq_ca: continue
+            # recheck sempre sequencial e sem cache: precisa das entradas exatas e de cotações novas
+            rq = await _cotar_triangulo(session, base_token, token_b, token_c, amount_in_base, chain_id, **{**quote_kw, "aggregator_list": non_ps, "cache": None})
+            if not rq: return fator
+            rq_ca = rq[2]
 
             r_ret = rq_ca["toAmount"] - amount_in_base
             r_net = net_percent((r_ret/amount_in_base)*100.0, swaps=3, fee_bps_per_swap=fee_bps_per_swap)
             if abs(r_net - net) > recheck_tol:
                 print(f"[{time.strftime('%H:%M:%S')}] TRI descartada no recheck (Δ>{recheck_tol:.2f}%). antes={net:.2f}% depois={r_net:.2f}% | {msg}")
-                continue
+                return fator
 
         if net >= log_thr:
-            notifier('log', msg)
+            item = (chain_id, (base_token, token_b, token_c), amount_in_base)
+            notifier('log', msg, item, net)
             if net >= alert_thr:
-                notifier('alert', msg)
+                notifier('alert', msg, item, net)
+        return fator
+
+    pares = permutations(other_tokens, 2) if rotas is None else rotas
+    if not simetrico:
+        for token_b, token_c in pares:
+            await avaliar(token_b, token_c)
+        return
+
+    # spreads mais velhos que isso não servem para pular o reverso (mesma idade da previsão especulativa)
+    max_age = float(os.getenv("SPECULATIVE_MAX_AGE_SECONDS", "300"))
+    for grupo in _agrupar_simetricos(pares):
+        token_b, token_c = grupo[0]
+        fator_ida = await avaliar(token_b, token_c)
+        if len(grupo) < 2:
+            continue
+        est = _estimar_reverso(chain_id, base_token, token_b, token_c, fator_ida, max_age)
+        if est is not None:
+            est_net = net_percent((est - 1.0) * 100.0, swaps=3, fee_bps_per_swap=fee_bps_per_swap)
+            if est_net < log_thr - sym_margin_pct:
+                _SYM_STATS["pulados"] += 1
+                _log(f"[{chain}][TRI] reverso {la}→{token_symbol(token_c, chain_id)}→{token_symbol(token_b, chain_id)}→{la} pulado (estimado {est_net:.2f}%)")
+                continue
+        _SYM_STATS["confirmados"] += 1
+        await avaliar(token_c, token_b)
@@ -0,0 +1,203 @@
+# backtest.py — varredura de parâmetros sobre dados gravados
+# Reaplica a lógica de decisão da varredura (taxa por swap, sanidade, recheck, limiares de log
+# e alerta) às rotas do histórico (HISTORY_DB) para uma grade de parâmetros, em paralelo num
+# pool de processos, e compara alertas, falsos positivos e lucro hipotético de cada ajuste.
+#
+#   python backtest.py --history hist.db --fee-bps 5,10 --alert 0.3,0.6 --recheck 0,1 --tol 0.2,0.5
+#   python backtest.py --tape fita.db ...   # antes, reproduz a fita pela varredura (TAPE_RECORD)
+#
+# Com --tape, a fita passa pelo arbitrage_bot (TAPE_REPLAY, ciclo a ciclo até o último gravado)
+# e as rotas avaliadas vão para um histórico temporário. Rode com as mesmas variáveis de
+# ambiente da gravação (CHAIN_IDS, AMOUNTS_USDC, tokens, limiares, recheck, TWO_PHASE...),
+# senão os pedidos não batem com a fita; grave em modo contínuo (não ONE_SHOT), para cada
+# ciclo levar o seu número.
+#
+# Sem cotação nova disponível offline, o recheck e a confirmação usam as próximas observações
+# da mesma rota e amount: o recheck compara com a seguinte; o alerta é confirmado (ou vira
+# falso positivo) pela observação --passos adiante, e o lucro hipotético é o net dela. Como no
+# bot, a mesma (chain, rota) só conta um novo aviso ou alerta depois de --dedup-seconds, a não
+# ser que o net melhore --dedup-improvement pontos; os repetidos não somam lucro.
+import argparse
+import asyncio
+import csv
+import itertools
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from history import consultar
+from tokens_config import get_token_decimals, token_symbol
+from utils import net_percent
+
+# observações carregadas uma vez por processo do pool (ver _carregar)
+_OBS = None
+
+def _lista(texto: str, conv=float):
+    return [conv(x) for x in texto.split(",") if x.strip()]
+
+def historico_da_fita(fita: str, destino: str) -> int:
+    """Reproduz a fita pela varredura do bot, gravando as rotas avaliadas em destino.
+    Retorna o número de ciclos gravados na fita.
+    """
+    import arbitrage_bot
+    from tape import TapePlayer
+
+    # limiares, recheck e triagem ficam os da gravação: mudá-los muda a sequência de pedidos
+    os.environ.update({
+        "TAPE_REPLAY": fita, "TAPE_REPLAY_SPEED": "0", "ONE_SHOT": "0",
+        "HISTORY_DB": destino, "HISTORY_RETENTION_DAYS": "0",
+        "NOTIFY_ROUTES": "log:;alert:;summary:;heartbeat:", "HEARTBEAT_EVERY_CYCLES": "0",
+        "SNIPER_MODE": "0", "STREAM_MODE": "0", "SHARD_PROCESSES": "0", "CHAIN_WORKERS": "0",
+    })
+    for nome in ("TAPE_RECORD", "COORD_BACKEND", "SUBSCRIPTIONS_FILE", "NOTIFY_JSONL_PATH", "NOTIFY_WEBHOOK_URL", "QUOTE_BOARD_NAME"):
+        os.environ.pop(nome, None)
+
+    player = TapePlayer(fita)
+    ciclos = player.ultimo_ciclo
+    player.fechar()
+    asyncio.run(arbitrage_bot.main_loop())
+    print(f"Fita {fita}: {ciclos} ciclo(s) reproduzidos")
+    return ciclos
+
+def carregar_observacoes(caminho: str, passos: int = 1, max_gap: float = 600.0):
+    """Observações do histórico com a próxima (recheck) e a de `passos` adiante (confirmação),
+    em ordem de horário. Cada uma: (ts, (chain_id, rota), swaps, gross, amount, base,
+    gross_recheck, gross_confirmacao); None onde não houver.
+    """
+    series = {}
+    # só a cotação completa: a triagem (TWO_PHASE) é uma aproximação e não gera alerta
+    for r in consultar(caminho, fase="confirmacao"):
+        if not r.get("pernas"):
+            continue
+        chave = (r["chain_id"], tuple(r["rota"]), r["amount"])
+        gross = (r["pernas"][-1]["amount_out"] - r["amount"]) / r["amount"] * 100.0
+        series.setdefault(chave, []).append((r["ts"], len(r["pernas"]), gross))
+    obs = []
+    for (chain_id, rota, amount), serie in series.items():
+        base = token_symbol(rota[0], chain_id)
+        amount_base = amount / (10 ** get_token_decimals(chain_id, rota[0]))
+        for i, (ts, swaps, gross) in enumerate(serie):
+            def adiante(k):
+                j = i + k
+                if j >= len(serie) or serie[j][0] - serie[j - 1][0] > max_gap:
+                    return None
+                return serie[j][2]
+            obs.append((ts, (chain_id, rota), swaps, gross, amount_base, base, adiante(1), adiante(passos)))
+    obs.sort(key=lambda o: o[0])
+    return obs
+
+def _carregar(caminho, passos, max_gap):
+    global _OBS
+    _OBS = carregar_observacoes(caminho, passos, max_gap)
+
+def avaliar(ajuste, obs=None, fp_net=0.0, janela=300.0, melhora=0.1):
+    """Métricas de um ajuste {fee_bps, log, alert, recheck, tol, sanity} sobre as observações.
+    janela/melhora: deduplicação por (chain, rota) como a do bot (NOTIFY_DEDUP_*; janela 0 desliga).
+    """
+    obs = _OBS if obs is None else obs
+    fee, log_thr, alert_thr = ajuste["fee_bps"], ajuste["log"], ajuste["alert"]
+    recheck_thr, tol, sanity = ajuste["recheck"], ajuste["tol"], ajuste["sanity"]
+    m = {"avisos": 0, "alertas": 0, "repetidos": 0, "suspeitos": 0, "descartados_recheck": 0, "confirmados": 0, "falsos": 0, "sem_confirmacao": 0}
+    lucro, soma_net = {}, 0.0
+    enviado = {}  # (tipo, rota) -> (ts, net) do último aviso que passou
+
+    def novo(tipo, ts, rota, net):
+        ult = enviado.get((tipo, rota))
+        if janela > 0 and ult and ts - ult[0] < janela and net < ult[1] + melhora:
+            return False
+        enviado[(tipo, rota)] = (ts, net)
+        return True
+
+    for ts, rota, swaps, gross, amount, base, g_recheck, g_conf in obs:
+        net = net_percent(gross, swaps, fee)
+        if net < log_thr and net < alert_thr:
+            continue
+        if net > sanity:
+            m["suspeitos"] += 1
+            continue
+        if recheck_thr > 0 and net >= recheck_thr:
+            if g_recheck is None or abs(net_percent(g_recheck, swaps, fee) - net) > tol:
+                m["descartados_recheck"] += 1
+                continue
+        if net >= log_thr and novo("log", ts, rota, net):
+            m["avisos"] += 1
+        if net < alert_thr:
+            continue
+        if not novo("alert", ts, rota, net):
+            m["repetidos"] += 1
+            continue
+        m["alertas"] += 1
+        if g_conf is None:
+            m["sem_confirmacao"] += 1
+            continue
+        net_conf = net_percent(g_conf, swaps, fee)
+        m["confirmados"] += 1
+        if net_conf < fp_net:
+            m["falsos"] += 1
+        soma_net += net_conf
+        lucro[base] = lucro.get(base, 0.0) + amount * net_conf / 100.0
+    m["taxa_fp"] = m["falsos"] / m["confirmados"] if m["confirmados"] else None
+    m["net_medio"] = soma_net / m["confirmados"] if m["confirmados"] else None
+    m["lucro"] = lucro
+    return {**ajuste, **m}
+
+def _fmt(v):
+    if v is None:
+        return "-"
+    if isinstance(v, float):
+        return f"{v:.4g}"
+    if isinstance(v, dict):
+        return " ".join(f"{k}={x:+.4g}" for k, x in sorted(v.items())) or "-"
+    return str(v)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Varredura de parâmetros sobre o histórico ou uma fita gravada.")
+    fonte = p.add_mutually_exclusive_group(required=True)
+    fonte.add_argument("--history", help="histórico (HISTORY_DB) a usar")
+    fonte.add_argument("--tape", help="fita (TAPE_RECORD) a reproduzir pela varredura antes do backtest")
+    # defaults: os mesmos do bot, lidos do ambiente (a linha de base é a configuração atual)
+    p.add_argument("--fee-bps", default=os.getenv("FEE_BPS_PER_SWAP", "5"), help="FEE_BPS_PER_SWAP (lista separada por vírgulas)")
+    p.add_argument("--log", default=os.getenv("LOG_THRESHOLD_PERCENT", "0.2"), help="LOG_THRESHOLD_PERCENT")
+    p.add_argument("--alert", default=os.getenv("ALERT_THRESHOLD_PERCENT", "0.6"), help="ALERT_THRESHOLD_PERCENT")
+    p.add_argument("--recheck", default=os.getenv("RECHECK_IF_NET_ABOVE", "3"), help="RECHECK_IF_NET_ABOVE")
+    p.add_argument("--tol", default=os.getenv("RECHECK_TOLERANCE_PERCENT", "0.5"), help="RECHECK_TOLERANCE_PERCENT")
+    p.add_argument("--sanity", default=os.getenv("SANITY_MAX_NET_PERCENT", "30"), help="SANITY_MAX_NET_PERCENT")
+    p.add_argument("--passos", type=int, default=1, help="observações adiante que confirmam um alerta (default 1)")
+    p.add_argument("--max-gap", type=float, default=600.0, help="segundos máximos entre observações seguidas da mesma rota")
+    p.add_argument("--fp-net", type=float, default=0.0, help="alerta confirmado com net abaixo disso é falso positivo")
+    p.add_argument("--dedup-seconds", type=float, default=float(os.getenv("NOTIFY_DEDUP_SECONDS", "300")), help="NOTIFY_DEDUP_SECONDS (0 desliga)")
+    p.add_argument("--dedup-improvement", type=float, default=float(os.getenv("NOTIFY_DEDUP_MIN_IMPROVEMENT_PERCENT", "0.1")), help="NOTIFY_DEDUP_MIN_IMPROVEMENT_PERCENT")
+    p.add_argument("--workers", type=int, default=os.cpu_count(), help="processos do pool")
+    p.add_argument("--csv", help="também grava os resultados nesse CSV")
+    a = p.parse_args(argv)
+
+    caminho = a.history
+    if a.tape:
+        caminho = os.path.join(tempfile.mkdtemp(prefix="backtest-"), "historico.db")
+        historico_da_fita(a.tape, caminho)
+
+    nomes = ("fee_bps", "log", "alert", "recheck", "tol", "sanity")
+    grade = [dict(zip(nomes, v)) for v in itertools.product(*(_lista(x) for x in (a.fee_bps, a.log, a.alert, a.recheck, a.tol, a.sanity)))]
+    print(f"{len(grade)} ajuste(s) sobre {caminho} com {a.workers} processo(s)")
+
+    with ProcessPoolExecutor(max_workers=a.workers, initializer=_carregar, initargs=(caminho, a.passos, a.max_gap)) as pool:
+        resultados = list(pool.map(avaliar, grade, itertools.repeat(None), itertools.repeat(a.fp_net),
+                                  itertools.repeat(a.dedup_seconds), itertools.repeat(a.dedup_improvement), chunksize=max(1, len(grade) // (4 * a.workers))))
+
+    # ordem: soma do net realizado nos alertas confirmados (o lucro fica em unidades de cada base)
+    resultados.sort(key=lambda r: (r["net_medio"] or 0.0) * r["confirmados"], reverse=True)
+    colunas = nomes + ("avisos", "alertas", "repetidos", "suspeitos", "descartados_recheck", "confirmados", "falsos", "sem_confirmacao", "taxa_fp", "net_medio", "lucro")
+    print(" | ".join(colunas))
+    for r in resultados:
+        print(" | ".join(_fmt(r[c]) for c in colunas))
+    if a.csv:
+        with open(a.csv, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(colunas)
+            for r in resultados:
+                w.writerow([_fmt(r[c]) if c == "lucro" else r[c] for c in colunas])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
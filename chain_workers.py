@@ -0,0 +1,84 @@
+# chain_workers.py — uma tarefa asyncio supervisionada por chain
+# Cada chain tem seu próprio intervalo, orçamento de concorrência e isolamento de erro:
+# exceção ou travamento numa chain não atrasa nem derruba as outras. Os resultados vão
+# para um ResultsHub compartilhado, de onde saem os resumos e heartbeats.
+import asyncio
+import time
+
+from get_best_quote_async import limit_concurrency
+
+def _somar(destino: dict, origem: dict):
+    for k, v in origem.items():
+        if isinstance(v, dict):
+            _somar(destino.setdefault(k, {}), v)
+        else:
+            destino[k] = destino.get(k, 0) + v
+
+class ResultsHub:
+    """Agrega os resultados publicados pelos workers entre um resumo e outro."""
+
+    def __init__(self, chain_ids):
+        self.found = []
+        self.screen = []
+        self.custo = {}
+        self.status = {
+            cid: {"ciclos": 0, "erros": 0, "ultimo_ok": None, "ultimo_erro": None, "duracao": None}
+            for cid in chain_ids
+        }
+
+    def publicar(self, chain_id, found, screen, custo, duracao):
+        self.found.extend(found)
+        self.screen.extend(screen)
+        _somar(self.custo, custo)
+        st = self.status[chain_id]
+        st["ciclos"] += 1
+        st["ultimo_ok"] = time.time()
+        st["duracao"] = duracao
+
+    def registrar_erro(self, chain_id, erro: str):
+        st = self.status[chain_id]
+        st["erros"] += 1
+        st["ultimo_erro"] = erro
+
+    def drenar(self):
+        """Retorna e zera (found, screen, custo) acumulados desde o último resumo."""
+        found, screen, custo = self.found, self.screen, self.custo
+        self.found, self.screen, self.custo = [], [], {}
+        return found, screen, custo
+
+    def status_linha(self, nomear=str):
+        partes = []
+        agora = time.time()
+        for cid, st in self.status.items():
+            idade = f"{agora - st['ultimo_ok']:.0f}s" if st["ultimo_ok"] else "nunca"
+            dur = f"{st['duracao']:.1f}s" if st["duracao"] is not None else "-"
+            partes.append(f"{nomear(cid)}: ciclos={st['ciclos']} erros={st['erros']} último ok={idade} duração={dur}")
+        return " | ".join(partes)
+
+async def supervise_chain(chain_id, scan_fn, hub, interval, stall_timeout, max_concurrency=0, backoff_max=300, nomear=str):
+    """Roda scan_fn(chain_id) → (found, screen, custo) em loop, com cadência própria.
+    Exceções e travamentos (> stall_timeout) são registrados no hub e seguidos de backoff.
+    """
+    sem = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+    falhas = 0
+    with limit_concurrency(sem):
+        while True:
+            t0 = time.monotonic()
+            try:
+                found, screen, custo = await asyncio.wait_for(scan_fn(chain_id), timeout=stall_timeout)
+                hub.publicar(chain_id, found, screen, custo, time.monotonic() - t0)
+                falhas = 0
+                espera = max(0.0, interval - (time.monotonic() - t0))
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                falhas += 1
+                hub.registrar_erro(chain_id, f"travou > {stall_timeout:.0f}s")
+                print(f"⚠️ [{nomear(chain_id)}] varredura travada (> {stall_timeout:.0f}s); reiniciando")
+                espera = min(backoff_max, interval * (2 ** falhas))
+            except Exception as e:
+                falhas += 1
+                hub.registrar_erro(chain_id, f"{e.__class__.__name__}: {e}")
+                print(f"⚠️ [{nomear(chain_id)}] erro na varredura: {e.__class__.__name__}: {e}")
+                espera = min(backoff_max, interval * (2 ** falhas))
+            await asyncio.sleep(espera)
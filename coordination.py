@@ -0,0 +1,191 @@
+# coordination.py — coordenação entre várias instâncias do bot
+# Com vários workers (ex.: Render) rodando ao mesmo tempo, cada instância pega leases sobre uma
+# fatia dos shards de rotas (hash consistente), uma delas é eleita líder e só ela envia resumos
+# e heartbeats, e cada alerta é enviado uma vez só, por quem marcar primeiro.
+# O backend é plugável (COORD_BACKEND=<esquema>:<destino>); o SQLite serve para uma máquina só
+# ou para testes.
+import abc
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+
+from sharding import HashRing, chave_rota
+
+class CoordBackend(abc.ABC):
+    """Operações atômicas que um backend de coordenação precisa oferecer.
+    Os métodos bloqueiam (rede/disco): no event loop, chame-os via asyncio.to_thread.
+    """
+
+    @abc.abstractmethod
+    def adquirir(self, recurso: str, dono: str, ttl: float) -> bool:
+        """Pega (ou renova) o lease se estiver livre, expirado ou já for do dono."""
+
+    @abc.abstractmethod
+    def liberar(self, recurso: str, dono: str):
+        ...
+
+    @abc.abstractmethod
+    def donos(self, prefixo: str) -> dict:
+        """{recurso: dono} dos leases não expirados cujo nome começa com prefixo."""
+
+    @abc.abstractmethod
+    def marcar(self, chave: str, ttl: float) -> bool:
+        """True só para quem marcar a chave primeiro dentro da janela ttl."""
+
+    @abc.abstractmethod
+    def publicar_resumo(self, instancia: str, linhas):
+        """linhas: [(net, msg)] do último resumo da instância."""
+
+    @abc.abstractmethod
+    def resumos_desde(self, t: float):
+        """[(instancia, net, msg)] publicados depois de t."""
+
+class SQLiteBackend(CoordBackend):
+
+    def __init__(self, caminho: str, retencao: float = 3600.0):
+        self.retencao = retencao
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(caminho, timeout=10, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS leases (recurso TEXT PRIMARY KEY, dono TEXT NOT NULL, expira REAL NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS marcas (chave TEXT PRIMARY KEY, expira REAL NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS resumos (instancia TEXT NOT NULL, t REAL NOT NULL, net REAL NOT NULL, msg TEXT NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS resumos_t ON resumos (t)")
+
+    def _exec(self, sql, args=()):
+        with self._lock:
+            return self._db.execute(sql, args)
+
+    def adquirir(self, recurso, dono, ttl):
+        agora = time.time()
+        # upsert atômico: só sobrescreve se o lease é do próprio dono ou já expirou
+        self._exec(
+            "INSERT INTO leases VALUES (?, ?, ?) ON CONFLICT(recurso) DO UPDATE "
+            "SET dono = excluded.dono, expira = excluded.expira "
+            "WHERE leases.dono = excluded.dono OR leases.expira < ?",
+            (recurso, dono, agora + ttl, agora),
+        )
+        linha = self._exec("SELECT dono FROM leases WHERE recurso = ?", (recurso,)).fetchone()
+        return bool(linha) and linha[0] == dono
+
+    def liberar(self, recurso, dono):
+        self._exec("DELETE FROM leases WHERE recurso = ? AND dono = ?", (recurso, dono))
+
+    def donos(self, prefixo):
+        linhas = self._exec(
+            "SELECT recurso, dono FROM leases WHERE recurso LIKE ? AND expira >= ?",
+            (prefixo + "%", time.time()),
+        ).fetchall()
+        return dict(linhas)
+
+    def marcar(self, chave, ttl):
+        agora = time.time()
+        cur = self._exec(
+            "INSERT INTO marcas VALUES (?, ?) ON CONFLICT(chave) DO UPDATE "
+            "SET expira = excluded.expira WHERE marcas.expira < ?",
+            (chave, agora + ttl, agora),
+        )
+        return cur.rowcount == 1
+
+    def publicar_resumo(self, instancia, linhas):
+        agora = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany("INSERT INTO resumos VALUES (?, ?, ?, ?)", [(instancia, agora, net, msg) for net, msg in linhas])
+                self._db.execute("DELETE FROM resumos WHERE t < ?", (agora - self.retencao,))
+                self._db.execute("DELETE FROM marcas WHERE expira < ?", (agora,))
+                self._db.execute("COMMIT")
+            except Exception:
+                # sem isso a conexão fica presa na transação e todo BEGIN seguinte falha
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                raise
+
+    def resumos_desde(self, t):
+        return self._exec("SELECT instancia, net, msg FROM resumos WHERE t > ? ORDER BY t", (t,)).fetchall()
+
+_BACKENDS = {"sqlite": SQLiteBackend}
+
+def registrar_backend(esquema: str, cls):
+    _BACKENDS[esquema] = cls
+
+def backend_from_url(url: str) -> CoordBackend:
+    """'sqlite:/caminho/coord.db' → SQLiteBackend('/caminho/coord.db')."""
+    esquema, _, destino = url.partition(":")
+    if esquema not in _BACKENDS or not destino:
+        raise ValueError(f"COORD_BACKEND inválido: {url!r} (esquemas: {', '.join(_BACKENDS)})")
+    return _BACKENDS[esquema](destino)
+
+class Coordenador:
+
+    def __init__(self, backend: CoordBackend, instancia: str, n_shards=16, lease_ttl=30.0):
+        self.backend = backend
+        self.instancia = instancia
+        self.n_shards = n_shards
+        self.lease_ttl = lease_ttl
+        self.anel = HashRing(n_shards)
+        self.lider = False
+        self.membros = 1
+        self.meus_shards = set()
+        self.alertas_suprimidos = 0
+        self._ultimo_resumo = time.time()
+
+    def atualizar(self):
+        """Renova presença, liderança e leases; pega shards livres até a cota justa e devolve o excedente."""
+        b, eu, ttl = self.backend, self.instancia, self.lease_ttl
+        b.adquirir(f"membro:{eu}", eu, ttl)
+        self.membros = max(1, len(b.donos("membro:")))
+        self.lider = b.adquirir("lider", eu, ttl)
+
+        cota = math.ceil(self.n_shards / self.membros)
+        donos = b.donos("shard:")
+        meus = sorted(r for r, d in donos.items() if d == eu)
+        # instância nova entrou: devolve o que passou da cota para ela poder pegar
+        for r in meus[cota:]:
+            b.liberar(r, eu)
+        meus = [r for r in meus[:cota] if b.adquirir(r, eu, ttl)]
+        for i in range(self.n_shards):
+            if len(meus) >= cota:
+                break
+            r = f"shard:{i}"
+            if r not in donos and b.adquirir(r, eu, ttl):
+                meus.append(r)
+        self.meus_shards = {int(r.split(":", 1)[1]) for r in meus}
+
+    async def manter(self):
+        while True:
+            await asyncio.sleep(self.lease_ttl / 3)
+            try:
+                await asyncio.to_thread(self.atualizar)
+            except Exception as e:
+                # sem renovar, os leases expiram e outra instância assume os shards
+                print(f"⚠️ [coord] falha ao renovar leases: {e.__class__.__name__}: {e}")
+
+    def dono_da_rota(self, chain_id, rota) -> bool:
+        return self.anel.shard(chave_rota(chain_id, rota)) in self.meus_shards
+
+    def primeiro_alerta(self, chave: str, janela: float) -> bool:
+        if self.backend.marcar(f"alerta:{chave}", janela):
+            return True
+        self.alertas_suprimidos += 1
+        return False
+
+    def compartilhar_resumo(self, found, k: int) -> bool:
+        """Publica o top-k local; retorna True se esta instância é quem envia o resumo."""
+        top = sorted(found, key=lambda r: r[0], reverse=True)[:k]
+        self.backend.publicar_resumo(self.instancia, [(r[0], r[1]) for r in top])
+        return self.lider
+
+    def resumos_remotos(self):
+        """[(net, msg)] publicados pelas outras instâncias desde a última chamada."""
+        agora = time.time()
+        linhas = self.backend.resumos_desde(self._ultimo_resumo)
+        self._ultimo_resumo = agora
+        return [(net, msg) for inst, net, msg in linhas if inst != self.instancia]
+
+    def status_linha(self) -> str:
+        papel = "líder" if self.lider else "seguidor"
+        return f"coord: {self.instancia} ({papel}) | instâncias={self.membros} | shards={len(self.meus_shards)}/{self.n_shards} | alertas duplicados suprimidos={self.alertas_suprimidos}"
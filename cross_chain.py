@@ -0,0 +1,87 @@
+# cross_chain.py — divergência de preço do mesmo token entre chains
+# Não faz cotações próprias: usa as taxas já observadas no ciclo (quote_cache)
+# contra o token base de cada chain (USDC) e desconta o custo de bridge.
+import os
+from itertools import combinations
+
+from quote_cache import cached_rate
+from tokens_config import (
+    TOKENS_BY_CHAIN,
+    get_base_token_for_chain,
+    get_default_tokens_for_chain,
+    get_token_decimals,
+    token_symbol,
+)
+from utils import net_percent
+
+def parse_bridge_costs(s: str):
+    """'137-42161:8,137-56:15' → {frozenset({137, 42161}): 8.0, ...} (bps por travessia)."""
+    table = {}
+    for item in (s or "").split(","):
+        item = item.strip()
+        if not item or ":" not in item or "-" not in item:
+            continue
+        par, bps = item.split(":", 1)
+        a, b = par.split("-", 1)
+        try:
+            table[frozenset((int(a), int(b)))] = float(bps)
+        except ValueError:
+            continue
+    return table
+
+def bridge_cost_bps(chain_a: int, chain_b: int, table, default_bps: float) -> float:
+    return table.get(frozenset((chain_a, chain_b)), default_bps)
+
+def mid_price(chain_id: int, token: str, max_age=None):
+    """Preço do token em unidades do token base da chain (USDC), pelas taxas em cache.
+    Usa a média geométrica de BASE→X e X→BASE quando ambas existem (remove o spread).
+    """
+    base = get_base_token_for_chain(chain_id)
+    if not base or base.lower() == token.lower():
+        return None
+    db, dx = get_token_decimals(chain_id, base), get_token_decimals(chain_id, token)
+    precos = []
+    r_bx = cached_rate(chain_id, base, token, max_age)
+    if r_bx:
+        precos.append((10**dx) / (r_bx * (10**db)))
+    r_xb = cached_rate(chain_id, token, base, max_age)
+    if r_xb:
+        precos.append(r_xb * (10**dx) / (10**db))
+    if not precos:
+        return None
+    if len(precos) == 1:
+        return precos[0]
+    return (precos[0] * precos[1]) ** 0.5
+
+def equivalent_tokens(chain_ids):
+    """{símbolo: {chain_id: endereço}} para símbolos presentes em 2+ chains da varredura."""
+    por_simbolo = {}
+    for cid in chain_ids:
+        for addr in get_default_tokens_for_chain(cid):
+            sym = token_symbol(addr, cid)
+            if sym != "UNKNOWN" and sym in TOKENS_BY_CHAIN.get(cid, {}):
+                por_simbolo.setdefault(sym, {})[cid] = addr
+    return {sym: m for sym, m in por_simbolo.items() if len(m) >= 2}
+
+def find_divergences(chain_ids, max_age, fee_bps, bridge_table, default_bridge_bps):
+    """Retorna [(net, gross, sym, chain_compra, chain_venda, preço_compra, preço_venda, bridge_bps)]
+    ordenado por net. Compra na chain mais barata, faz bridge, vende na mais cara (2 swaps).
+    """
+    out = []
+    for sym, por_chain in equivalent_tokens(chain_ids).items():
+        precos = {}
+        for cid, addr in por_chain.items():
+            p = mid_price(cid, addr, max_age)
+            if p:
+                precos[cid] = p
+        for ca, cb in combinations(sorted(precos), 2):
+            compra, venda = (ca, cb) if precos[ca] <= precos[cb] else (cb, ca)
+            gross = (precos[venda] / precos[compra] - 1.0) * 100.0
+            bps = bridge_cost_bps(compra, venda, bridge_table, default_bridge_bps)
+            net = net_percent(gross, swaps=2, fee_bps_per_swap=fee_bps) - bps / 100.0
+            out.append((net, gross, sym, compra, venda, precos[compra], precos[venda], bps))
+    out.sort(key=lambda x: x[0], reverse=True)
+    return out
+
+def bridge_table_from_env():
+    return parse_bridge_costs(os.getenv("BRIDGE_COST_BPS", "")), float(os.getenv("BRIDGE_COST_BPS_DEFAULT", "20"))
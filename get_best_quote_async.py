@@ -1,8 +1,14 @@
 
 import asyncio
 import aiohttp
+import contextlib
+import contextvars
+import json
 import os
 import random
+import time
+
+from quote_cache import record_rate
 
 DEBUG = str(os.getenv("DEBUG", "0")).lower() in {"1", "true", "yes"}
 
@@ -53,26 +59,216 @@ def _aggregators_for_chain(chain_id: int):
         return [x.strip() for x in v.split(",") if x.strip()]
     return [x.strip() for x in os.getenv("AGGREGATORS", "1inch,0x,KyberSwap,Odos,OpenOcean,ParaSwap").split(",") if x.strip()]
 
+# ------------- Estatísticas -------------
+
+# contador global de requisições HTTP (usado para medir custo por fase/ciclo)
+_STATS = {"http_calls": 0, "http_errors": 0, "http_429": 0}
+
+# (chain_id, agregador) -> {"ok": int, "fail": int, "lat": média móvel em segundos das respostas boas, ou None}
+_AGG_STATS = {}
+
+# (dict, chave) que recebe as requisições da tarefa atual; propagado às subtarefas
+_CALL_SCOPE = contextvars.ContextVar("call_scope", default=None)
+
+# dict que recebe o que as cotações da tarefa atual observaram (ver outcome_scope)
+_OUTCOME = contextvars.ContextVar("outcome", default=None)
+
+@contextlib.contextmanager
+def outcome_scope():
+    """Coleta o que as cotações feitas dentro do bloco (e subtarefas) observaram:
+    {"http_calls", "http_errors", "http_429", "agregadores": [(nome, ok, latência)]}.
+    O serviço de cotações devolve isso junto com cada cotação para o cliente registrar.
+    """
+    res = {"http_calls": 0, "http_errors": 0, "http_429": 0, "agregadores": []}
+    token = _OUTCOME.set(res)
+    try:
+        yield res
+    finally:
+        _OUTCOME.reset(token)
+
+def _contar(chave, n=1):
+    _STATS[chave] += n
+    res = _OUTCOME.get()
+    if res is not None:
+        res[chave] += n
+
+def http_calls() -> int:
+    """Total de requisições HTTP feitas aos agregadores desde o início do processo."""
+    return _STATS["http_calls"]
+
+def http_stats() -> dict:
+    """Cópia dos contadores: requisições, erros (status != 200 ou exceção) e respostas 429."""
+    return dict(_STATS)
+
+# semáforo que limita as requisições simultâneas da tarefa atual (None = sem limite)
+_HTTP_LIMIT = contextvars.ContextVar("http_limit", default=None)
+
+@contextlib.contextmanager
+def limit_concurrency(sem):
+    """Aplica o semáforo sem a todas as requisições feitas dentro do bloco (e subtarefas)."""
+    token = _HTTP_LIMIT.set(sem)
+    try:
+        yield sem
+    finally:
+        _HTTP_LIMIT.reset(token)
+
+# (prazo em time.monotonic(), dict de estatísticas) do ciclo/janela atual
+_DEADLINE = contextvars.ContextVar("deadline", default=None)
+
+@contextlib.contextmanager
+def deadline_scope(seconds, stats=None):
+    """Orçamento de tempo para tudo o que rodar dentro do bloco (e subtarefas).
+    Cada requisição usa como timeout o tempo restante (no máximo 18 s); esgotado o prazo,
+    as cotações retornam None sem ir à rede. stats recebe os cortes (ver note_shed).
+    """
+    if not seconds or seconds <= 0:
+        yield stats
+        return
+    stats = stats if stats is not None else {}
+    token = _DEADLINE.set((time.monotonic() + seconds, stats))
+    try:
+        yield stats
+    finally:
+        _DEADLINE.reset(token)
+
+def remaining_time():
+    """Segundos restantes no orçamento atual, ou None se não houver orçamento."""
+    scope = _DEADLINE.get()
+    if scope is None:
+        return None
+    return scope[0] - time.monotonic()
+
+def deadline_expired() -> bool:
+    r = remaining_time()
+    return r is not None and r <= 0
+
+def note_shed(key: str, n: int = 1):
+    """Registra algo cortado por falta de tempo nas estatísticas do orçamento atual."""
+    scope = _DEADLINE.get()
+    if scope is not None:
+        scope[1][key] = scope[1].get(key, 0) + n
+
+@contextlib.contextmanager
+def count_calls_into(counter: dict, key: str):
+    """Soma em counter[key] as requisições feitas dentro do bloco (inclusive por subtarefas
+    criadas nele). Ao contrário de deltas de http_calls(), funciona com varreduras concorrentes.
+    """
+    token = _CALL_SCOPE.set((counter, key))
+    try:
+        yield counter
+    finally:
+        _CALL_SCOPE.reset(token)
+
+# chamadas a cada cotação bem-sucedida: fn(chain_id, from, to, amount_in, amount_out, agregador)
+_QUOTE_LISTENERS = []
+
+def add_quote_listener(fn):
+    _QUOTE_LISTENERS.append(fn)
+
+def remove_quote_listener(fn):
+    if fn in _QUOTE_LISTENERS:
+        _QUOTE_LISTENERS.remove(fn)
+
+def _publish_quote(chain_id, from_token, to_token, amount, amount_out, aggregator):
+    record_rate(chain_id, from_token, to_token, amount, amount_out)
+    for fn in _QUOTE_LISTENERS:
+        try:
+            fn(chain_id, from_token, to_token, amount, amount_out, aggregator)
+        except Exception as e:
+            _log(f"[quote listener] {e.__class__.__name__}: {e}")
+
+def _record_agg(chain_id, name, ok, elapsed):
+    res = _OUTCOME.get()
+    if res is not None:
+        res["agregadores"].append((name, ok, elapsed))
+    st = _AGG_STATS.setdefault((chain_id, name), {"ok": 0, "fail": 0, "lat": None})
+    st["ok" if ok else "fail"] += 1
+    # só respostas boas entram na latência: uma recusa rápida (401 sem chave) não é "rápido"
+    if ok:
+        st["lat"] = elapsed if st["lat"] is None else 0.8 * st["lat"] + 0.2 * elapsed
+
+def fastest_reliable_aggregator(chain_id: int, candidates=None):
+    """Agregador com menor latência/taxa de sucesso observadas na chain.
+    Candidatos ainda sem histórico vêm primeiro (são experimentados antes de um favorito ser
+    fixado); sem nenhuma resposta boa, fica o que menos falhou.
+    """
+    candidates = candidates or _aggregators_for_chain(chain_id)
+    best, best_score = None, None
+    for name in candidates:
+        st = _AGG_STATS.get((chain_id, name))
+        if not st:
+            return name
+        # suavização de Laplace para não descartar um agregador por uma falha isolada
+        success = (st["ok"] + 1) / (st["ok"] + st["fail"] + 2)
+        score = (st["lat"] / success if st["lat"] is not None else float("inf"), st["fail"])
+        if best_score is None or score < best_score:
+            best, best_score = name, score
+    return best
+
+# fita de gravação/reprodução do tráfego (tape.py); None = rede, sem gravar
+_TAPE = None
+
+def set_tape(tape):
+    """Liga um TapeRecorder ou TapePlayer a todas as requisições (None desliga); retorna o anterior."""
+    global _TAPE
+    anterior, _TAPE = _TAPE, tape
+    return anterior
+
+def relogio() -> float:
+    """Horário das cotações: o da gravação quando uma fita está sendo reproduzida."""
+    tape = _TAPE
+    if tape is not None and tape.reproduzindo and tape.relogio is not None:
+        return tape.relogio
+    return time.time()
+
 async def _fetch_json(session, method, url, name, **kwargs):
+    sem = _HTTP_LIMIT.get()
+    if sem is not None:
+        async with sem:
+            return await _fetch_json_raw(session, method, url, name, **kwargs)
+    return await _fetch_json_raw(session, method, url, name, **kwargs)
+
+async def _fetch_json_raw(session, method, url, name, **kwargs):
+    restante = remaining_time()
+    if restante is not None and restante <= 0:
+        note_shed("chamadas")
+        return None
+    _contar("http_calls")
+    scope = _CALL_SCOPE.get()
+    if scope is not None:
+        scope[0][scope[1]] = scope[0].get(scope[1], 0) + 1
+    tape = _TAPE
+    t0 = time.monotonic()
     try:
-        timeout = aiohttp.ClientTimeout(total=18)
-        async with session.request(method, url, timeout=timeout, **kwargs) as resp:
-            txt = await resp.text()
-            if resp.status != 200:
-                _log(f"[{name}] HTTP {resp.status} → {url}\n{txt[:240]}")
-                return None
-            ct = resp.headers.get("content-type","")
-            if "json" not in ct:
-                _log(f"[{name}] Unexpected content-type: {ct} → {url}")
-                return None
-            try:
-                return await resp.json()
-            except Exception as e:
-                _log(f"[{name}] JSON decode error: {e} | body={txt[:200]}")
-                return None
+        if tape is not None and tape.reproduzindo:
+            status, ct, txt = await tape.reproduzir(method, url, kwargs)
+        else:
+            timeout = aiohttp.ClientTimeout(total=18 if restante is None else min(18, restante))
+            async with session.request(method, url, timeout=timeout, **kwargs) as resp:
+                txt = await resp.text()
+                status, ct = resp.status, resp.headers.get("content-type","")
     except Exception as e:
+        if tape is not None and not tape.reproduzindo:
+            tape.gravar(method, url, kwargs, None, None, None, time.monotonic() - t0, f"{e.__class__.__name__}: {e}")
+        _contar("http_errors")
         _log(f"[{name}] Exception: {e.__class__.__name__}: {e}")
         return None
+    if tape is not None and not tape.reproduzindo:
+        tape.gravar(method, url, kwargs, status, ct, txt, time.monotonic() - t0)
+    if status != 200:
+        _contar("http_errors")
+        if status == 429:
+            _contar("http_429")
+        _log(f"[{name}] HTTP {status} → {url}\n{txt[:240]}")
+        return None
+    if "json" not in ct:
+        _log(f"[{name}] Unexpected content-type: {ct} → {url}")
+        return None
+    try:
+        return json.loads(txt)
+    except Exception as e:
+        _log(f"[{name}] JSON decode error: {e} | body={txt[:200]}")
+        return None
 
 # ------------- Aggregators -------------
 
@@ -212,12 +408,53 @@ async def _with_retry(coro_factory, attempts=2, delay=0.25):
     last = None
     for _ in range(attempts):
         last = await coro_factory()
-        if last is not None:
+        if last is not None or deadline_expired():
             return last
         await asyncio.sleep(delay)
     return last
 
-async def get_best_quote_async(session, from_token: str, to_token: str, amount: int, chain_id: int = 137, aggregator_list=None):
+async def _timed(chain_id, name, coro_factory, attempts):
+    t0 = time.monotonic()
+    val = await _with_retry(coro_factory, attempts=attempts)
+    _record_agg(chain_id, name, val is not None, time.monotonic() - t0)
+    return val
+
+async def get_best_quote_async(session, from_token: str, to_token: str, amount: int, chain_id: int = 137, aggregator_list=None, attempts=2, cache=None):
+    if cache is not None:
+        # cache de pernas (quote_cache.QuoteCache): mesma perna/amount cotada uma vez só
+        key = cache.key(chain_id, from_token, to_token, amount, aggregator_list)
+        return await cache.fetch(key, lambda: get_best_quote_async(session, from_token, to_token, amount, chain_id, aggregator_list, attempts))
+
+    if deadline_expired():
+        note_shed("cotacoes")
+        return None
+
+    service = os.getenv("QUOTE_SERVICE_URL", "").strip()
+    if service:
+        return await _quote_via_service(session, service, from_token, to_token, amount, chain_id, aggregator_list, attempts)
+    return await get_best_quote_direct(session, from_token, to_token, amount, chain_id, aggregator_list, attempts)
+
+async def _quote_via_service(session, url, from_token, to_token, amount, chain_id, aggregator_list, attempts):
+    # serviço local de cotações (quote_service.py): cache, coalescência e cota compartilhados no host
+    payload = {"chain_id": chain_id, "from": from_token, "to": to_token, "amount": str(amount), "aggregators": aggregator_list, "attempts": attempts}
+    data = await _fetch_json(session, "POST", url.rstrip("/") + "/quote", "quote-service", json=payload)
+    if not data:
+        return None
+    # o que o serviço viu nos agregadores entra nas estatísticas locais: sem isso a escolha do
+    # agregador (fastest_reliable_aggregator) e o controle de intervalo ficariam às cegas
+    for nome, ok, lat in data.get("agregadores") or ():
+        _record_agg(chain_id, nome, bool(ok), float(lat))
+    for chave, n in (data.get("http") or {}).items():
+        if chave in _STATS:
+            _contar(chave, int(n))
+    if not data.get("toAmount"):
+        return None
+    val = int(data["toAmount"])
+    _publish_quote(chain_id, from_token, to_token, amount, val, data.get("aggregator"))
+    return {"aggregator": data.get("aggregator"), "toAmount": val}
+
+async def get_best_quote_direct(session, from_token: str, to_token: str, amount: int, chain_id: int = 137, aggregator_list=None, attempts=2):
+    """Consulta os agregadores diretamente (sem cache nem QUOTE_SERVICE_URL)."""
     order = aggregator_list or _aggregators_for_chain(chain_id)
     if aggregator_list is None and os.getenv("AGGREGATORS") is None and os.getenv(f"AGGREGATORS_{chain_id}") is None:
         order = order.copy()
@@ -226,17 +463,17 @@ async def get_best_quote_async(session, from_token: str, to_token: str, amount:
     tasks = []
     for name in order:
         if name == "1inch":
-            tasks.append(_with_retry(lambda: _quote_1inch(session, chain_id, from_token, to_token, amount)))
+            tasks.append(_timed(chain_id, name, lambda: _quote_1inch(session, chain_id, from_token, to_token, amount), attempts))
         elif name == "0x":
-            tasks.append(_with_retry(lambda: _quote_0x(session, chain_id, from_token, to_token, amount)))
+            tasks.append(_timed(chain_id, name, lambda: _quote_0x(session, chain_id, from_token, to_token, amount), attempts))
         elif name == "KyberSwap":
-            tasks.append(_with_retry(lambda: _quote_kyber(session, chain_id, from_token, to_token, amount)))
+            tasks.append(_timed(chain_id, name, lambda: _quote_kyber(session, chain_id, from_token, to_token, amount), attempts))
         elif name == "OpenOcean":
-            tasks.append(_with_retry(lambda: _quote_openocean(session, chain_id, from_token, to_token, amount)))
+            tasks.append(_timed(chain_id, name, lambda: _quote_openocean(session, chain_id, from_token, to_token, amount), attempts))
         elif name == "Odos":
-            tasks.append(_with_retry(lambda: _quote_odos(session, chain_id, from_token, to_token, amount)))
+            tasks.append(_timed(chain_id, name, lambda: _quote_odos(session, chain_id, from_token, to_token, amount), attempts))
         elif name == "ParaSwap":
-            tasks.append(_with_retry(lambda: _quote_paraswap(session, chain_id, from_token, to_token, amount)))
+            tasks.append(_timed(chain_id, name, lambda: _quote_paraswap(session, chain_id, from_token, to_token, amount), attempts))
         else:
             _log(f"[get_best_quote_async] unknown aggregator '{name}' — ignoring")
 
@@ -256,4 +493,5 @@ async def get_best_quote_async(session, from_token: str, to_token: str, amount:
     if best_name is None:
         _log("[get_best_quote_async] all aggregators failed")
         return None
+    _publish_quote(chain_id, from_token, to_token, amount, int(best_val), best_name)
     return {"aggregator": best_name, "toAmount": int(best_val)}
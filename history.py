@@ -0,0 +1,132 @@
+# history.py — histórico das rotas avaliadas
+# Cada rota avaliada (SIMPLES/TRI) vira uma linha com horário, chain, rota, tamanho, gross, net
+# e, numa tabela à parte, agregador e amounts de cada perna. Serve para ajustar limiares,
+# comparar agregadores e rodar backtests. A coluna fase separa a cotação completa
+# ("confirmacao") da aproximação da triagem ("triagem", com TWO_PHASE=1), inclusive das
+# rotas que a triagem barrou.
+#
+# A gravação sai do event loop: registrar() só enfileira, e uma thread grava em lotes num
+# SQLite em modo WAL (ver sqlite_writer.py). Linhas mais velhas que a retenção são apagadas
+# de tempos em tempos.
+import sqlite3
+import time
+
+from sqlite_writer import EscritorEmLotes, abrir_wal, desfazer
+
+_ESQUEMA = (
+    "CREATE TABLE IF NOT EXISTS rotas ("
+    " id INTEGER PRIMARY KEY, ts REAL NOT NULL, chain_id INTEGER NOT NULL, tipo TEXT NOT NULL,"
+    " rota TEXT NOT NULL, amount TEXT NOT NULL, gross REAL NOT NULL, net REAL NOT NULL,"
+    " fase TEXT NOT NULL DEFAULT 'confirmacao')",
+    # amounts em texto: unidades nativas de tokens de 18 casas passam do INTEGER de 64 bits
+    "CREATE TABLE IF NOT EXISTS pernas ("
+    " rota_id INTEGER NOT NULL, i INTEGER NOT NULL, agregador TEXT, de TEXT NOT NULL, para TEXT NOT NULL,"
+    " amount_in TEXT NOT NULL, amount_out TEXT NOT NULL, PRIMARY KEY (rota_id, i)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS rotas_ts ON rotas (ts)",
+    "CREATE INDEX IF NOT EXISTS rotas_rota_ts ON rotas (chain_id, rota, ts)",
+)
+
+def _chave(rota) -> str:
+    return ",".join(t.lower() for t in rota)
+
+def _abrir(caminho: str):
+    # históricos criados antes da coluna fase ganham a coluna
+    return abrir_wal(caminho, _ESQUEMA, [("rotas", "fase", "TEXT NOT NULL DEFAULT 'confirmacao'")])
+
+class HistoryStore(EscritorEmLotes):
+    """Escritor do histórico. registrar() recebe registros do collector e nunca bloqueia."""
+    rotulo = "HISTÓRICO"
+
+    def __init__(self, caminho: str, retencao_dias: float = 30.0, lote: int = 500, max_fila: int = 100_000, limpeza_segundos: float = 3600.0):
+        self.retencao = retencao_dias * 86400.0
+        self.limpeza_segundos = limpeza_segundos
+        # sem registros chegando, a thread ainda acorda para a limpeza
+        self.espera = min(60.0, limpeza_segundos)
+        self._proxima_limpeza = time.time()
+        # ativo: a thread de gravação está de pé; falhas: registros que não puderam ser gravados
+        self.stats = {"gravados": 0, "lotes": 0, "descartados": 0, "falhas": 0, "apagados": 0, "ativo": True}
+        super().__init__(caminho, lote, max_fila, "historico")
+
+    def registrar(self, registros, fase: str = "confirmacao"):
+        """fase: "confirmacao" (cotação completa) ou "triagem" (aproximação da fase 1)."""
+        for r in registros:
+            if r[6] is None:
+                continue  # cross-chain: não tem pernas cotadas
+            self._enfileirar((fase, r))
+
+    def _abrir(self):
+        return _abrir(self.caminho)
+
+    def _descrever(self, r):
+        return str(r[1][1])
+
+    def _manutencao(self, db):
+        if self.retencao <= 0 or time.time() < self._proxima_limpeza:
+            return
+        try:
+            self._limpar(db)
+        except sqlite3.Error as e:
+            desfazer(db)
+            print(f"⚠️ [HISTÓRICO] limpeza falhou: {e.__class__.__name__}: {e}")
+        self._proxima_limpeza = time.time() + self.limpeza_segundos
+
+    def _gravar(self, db, lote):
+        pernas = []
+        db.execute("BEGIN")
+        for fase, (net, _msg, tipo, chain_id, amount, rota, legs, ts) in lote:
+            gross = (legs[-1][2] - amount) / amount * 100.0
+            cur = db.execute(
+                "INSERT INTO rotas (ts, chain_id, tipo, rota, amount, gross, net, fase) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (ts, chain_id, tipo, _chave(rota), str(amount), gross, net, fase),
+            )
+            cam = list(rota) + [rota[0]]
+            pernas.extend(
+                (cur.lastrowid, i, agg, cam[i].lower(), cam[i + 1].lower(), str(a_in), str(a_out))
+                for i, (agg, a_in, a_out) in enumerate(legs)
+            )
+        db.executemany("INSERT INTO pernas VALUES (?, ?, ?, ?, ?, ?, ?)", pernas)
+        db.execute("COMMIT")
+        self.stats["gravados"] += len(lote)
+        self.stats["lotes"] += 1
+
+    def _limpar(self, db):
+        corte = time.time() - self.retencao
+        db.execute("BEGIN")
+        db.execute("DELETE FROM pernas WHERE rota_id IN (SELECT id FROM rotas WHERE ts < ?)", (corte,))
+        n = db.execute("DELETE FROM rotas WHERE ts < ?", (corte,)).rowcount
+        db.execute("COMMIT")
+        self.stats["apagados"] += n
+
+def consultar(caminho: str, desde=None, ate=None, chain_id=None, rota=None, fase=None, com_pernas=True):
+    """Rotas do histórico entre desde e ate (epoch), em ordem de horário.
+    Cada uma é um dict com ts, chain_id, tipo, rota (lista), amount, gross, net, fase e pernas.
+    """
+    db = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, timeout=30)
+    try:
+        filtros, args = [], []
+        if chain_id is not None:
+            filtros.append("chain_id = ?"); args.append(chain_id)
+        if rota is not None:
+            filtros.append("rota = ?"); args.append(_chave(rota))
+        if fase is not None:
+            filtros.append("fase = ?"); args.append(fase)
+        if desde is not None:
+            filtros.append("ts >= ?"); args.append(desde)
+        if ate is not None:
+            filtros.append("ts < ?"); args.append(ate)
+        where = (" WHERE " + " AND ".join(filtros)) if filtros else ""
+        linhas = db.execute(f"SELECT id, ts, chain_id, tipo, rota, amount, gross, net, fase FROM rotas{where} ORDER BY ts", args).fetchall()
+        out = []
+        for rid, ts, chain, tipo, chave, amount, gross, net, fase_r in linhas:
+            d = {"ts": ts, "chain_id": chain, "tipo": tipo, "rota": chave.split(","), "amount": int(amount), "gross": gross, "net": net, "fase": fase_r}
+            if com_pernas:
+                d["pernas"] = [
+                    {"aggregator": agg, "from": de, "to": para, "amount_in": int(a_in), "amount_out": int(a_out)}
+                    for agg, de, para, a_in, a_out in db.execute(
+                        "SELECT agregador, de, para, amount_in, amount_out FROM pernas WHERE rota_id = ? ORDER BY i", (rid,)
+                    )
+                ]
+            out.append(d)
+        return out
+    finally:
+        db.close()
@@ -0,0 +1,56 @@
+# interval_controller.py — intervalo entre ciclos adaptativo
+# Encurta o intervalo quando os nets mudam muito entre ciclos ou alguma rota chega perto do
+# LOG_THRESHOLD_PERCENT; alonga quando os agregadores devolvem 429 ou a taxa de erro sobe.
+# Sem sinal forte, volta aos poucos para o intervalo base.
+#
+# A taxa de erro é comparada com a linha de base (média lenta dos ciclos anteriores), não com
+# um valor absoluto: parte das respostas não-200 é estrutural (1inch v6→v5→v4, fallback da
+# Kyber, agregador sem chave) e, sozinha, deixaria o intervalo preso no máximo.
+
+class AdaptiveInterval:
+
+    def __init__(self, base, min_s, max_s, log_thr, vol_ref=0.05, max_error_rate=0.2, encurtar=0.7, recuar=1.5, peso_base=0.1):
+        # max_error_rate: quanto a taxa de erro do ciclo pode passar da linha de base
+        # peso_base: peso de cada ciclo na média móvel da linha de base
+        self.base = base
+        self.min_s = min(min_s, max_s)
+        self.max_s = max(min_s, max_s)
+        self.log_thr = log_thr
+        self.vol_ref = vol_ref
+        self.max_error_rate = max_error_rate
+        self.peso_base = peso_base
+        self.erro_base = None
+        self.encurtar = encurtar
+        self.recuar = recuar
+        self.intervalo = self._limitar(base)
+        self.motivo = "inicial"
+        self.ultima_mudanca = 0.0
+        self._anterior = {}
+
+    def _limitar(self, v):
+        return max(self.min_s, min(self.max_s, v))
+
+    def atualizar(self, found, chamadas: int, erros: int, n429: int) -> float:
+        """found: registros do ciclo; chamadas/erros/n429: requisições do ciclo."""
+        nets = {(r[3], r[5], r[4]): r[0] for r in found if r[2] in ("SIMPLES", "TRI")}
+        comuns = [k for k in nets if k in self._anterior]
+        mudanca = sum(abs(nets[k] - self._anterior[k]) for k in comuns) / len(comuns) if comuns else 0.0
+        self._anterior = nets
+        self.ultima_mudanca = mudanca
+        melhor = max(nets.values()) if nets else float("-inf")
+        taxa_erro = erros / chamadas if chamadas else 0.0
+        base_erro = taxa_erro if self.erro_base is None else self.erro_base
+        if chamadas:
+            self.erro_base = base_erro + (taxa_erro - base_erro) * self.peso_base
+
+        if n429 > 0 or taxa_erro - base_erro > self.max_error_rate:
+            self.intervalo *= self.recuar
+            self.motivo = f"throttling (429={n429}, erro={taxa_erro:.0%}, base={base_erro:.0%})"
+        elif mudanca > self.vol_ref or melhor >= self.log_thr:
+            self.intervalo *= self.encurtar
+            self.motivo = f"volátil (Δnet médio={mudanca:.3f}%, melhor={melhor:.2f}%)"
+        else:
+            self.intervalo += (self.base - self.intervalo) * 0.25
+            self.motivo = "calmo"
+        self.intervalo = self._limitar(self.intervalo)
+        return self.intervalo
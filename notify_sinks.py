@@ -0,0 +1,181 @@
+# notify_sinks.py — destinos de notificação plugáveis
+# Cada destino (Telegram, webhook, arquivo JSONL, stdout) roda numa tarefa própria, com fila
+# limitada, envio em lotes e isolamento de falhas: um destino lento ou fora do ar nunca segura
+# a varredura nem os outros destinos. Regras de roteamento dizem quais tipos de mensagem
+# (log, alert, summary, heartbeat) vão para quais destinos.
+import abc
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from telegram_notify import send_telegram
+
+TIPOS = ("log", "alert", "summary", "heartbeat")
+
+class Sink(abc.ABC):
+    """Destino de notificação. enviar_lote recebe [mensagem], com mensagem = {"kind", "texto", "ts"}."""
+
+    nome = "sink"
+    lote = 1
+
+    @abc.abstractmethod
+    async def enviar_lote(self, mensagens):
+        ...
+
+class StdoutSink(Sink):
+    nome = "stdout"
+    lote = 50
+
+    async def enviar_lote(self, mensagens):
+        for m in mensagens:
+            print(f"[{time.strftime('%H:%M:%S', time.localtime(m['ts']))}] {m['texto']}")
+
+class TelegramSink(Sink):
+    """Com uma TelegramQueue, só enfileira (prioridade e limite por chat ficam com ela);
+    sem fila, usa send_telegram numa thread para não travar o event loop.
+    """
+    nome = "telegram"
+
+    def __init__(self, fila=None, chat_id=None, nome=None):
+        self.fila = fila
+        self.chat_id = chat_id
+        self.nome = nome or self.nome
+
+    async def enviar_lote(self, mensagens):
+        for m in mensagens:
+            if self.fila:
+                self.fila.enviar(m["texto"], m["kind"], chat_id=self.chat_id)
+            else:
+                await asyncio.to_thread(send_telegram, m["texto"], self.chat_id)
+
+class WebhookSink(Sink):
+    """POST de um JSON {"mensagens": [...]} por lote."""
+    nome = "webhook"
+    lote = 20
+
+    def __init__(self, session, url, timeout=10, nome=None):
+        self.session = session
+        self.url = url
+        self.timeout = timeout
+        self.nome = nome or self.nome
+
+    async def enviar_lote(self, mensagens):
+        async with self.session.request(
+            "POST", self.url, json={"mensagens": mensagens},
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        ) as resp:
+            if resp.status >= 300:
+                raise RuntimeError(f"HTTP {resp.status}")
+
+class JsonlSink(Sink):
+    """Uma linha JSON por mensagem, anexada ao arquivo."""
+    nome = "jsonl"
+    lote = 100
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+    def _gravar(self, linhas):
+        with open(self.caminho, "a", encoding="utf-8") as f:
+            f.writelines(linhas)
+
+    async def enviar_lote(self, mensagens):
+        linhas = [json.dumps(m, ensure_ascii=False) + "\n" for m in mensagens]
+        await asyncio.to_thread(self._gravar, linhas)
+
+class _SinkWorker:
+
+    def __init__(self, sink: Sink, max_fila=1000, backoff_max=60.0):
+        self.sink = sink
+        self.fila = asyncio.Queue(maxsize=max_fila)
+        self.backoff_max = backoff_max
+        self.ocupado = False
+        self.stats = {"enviadas": 0, "falhas": 0, "descartadas": 0}
+
+    def oferecer(self, mensagem):
+        try:
+            self.fila.put_nowait(mensagem)
+        except asyncio.QueueFull:
+            self.stats["descartadas"] += 1
+
+    async def run(self):
+        falhas = 0
+        while True:
+            lote = [await self.fila.get()]
+            while len(lote) < self.sink.lote and not self.fila.empty():
+                lote.append(self.fila.get_nowait())
+            self.ocupado = True
+            try:
+                await self.sink.enviar_lote(lote)
+                self.stats["enviadas"] += len(lote)
+                falhas = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # o lote é perdido; o destino espera um pouco antes de tentar o próximo
+                falhas += 1
+                self.stats["falhas"] += len(lote)
+                print(f"⚠️ [notificação:{self.sink.nome}] {e.__class__.__name__}: {e}")
+                await asyncio.sleep(min(self.backoff_max, 2 ** falhas))
+            finally:
+                self.ocupado = False
+
+class NotifyRouter:
+    """publicar(kind, texto) entrega a mensagem na fila de cada destino roteado para o tipo."""
+
+    def __init__(self, sinks, rotas, max_fila=1000):
+        # rotas: {kind: [nome do destino]}
+        self.workers = {s.nome: _SinkWorker(s, max_fila) for s in sinks}
+        self.rotas = {k: [n for n in nomes if n in self.workers] for k, nomes in rotas.items()}
+        self._tarefas = []
+
+    def publicar(self, kind: str, texto: str, **extra):
+        m = {"kind": kind, "texto": texto, "ts": time.time(), **extra}
+        for nome in self.rotas.get(kind, ()):
+            self.workers[nome].oferecer(m)
+
+    def publicar_em(self, destino: str, kind: str, texto: str, **extra):
+        """Entrega direto num destino, sem passar pelas regras de roteamento."""
+        self.workers[destino].oferecer({"kind": kind, "texto": texto, "ts": time.time(), **extra})
+
+    def iniciar(self):
+        self._tarefas = [asyncio.create_task(w.run()) for w in self.workers.values()]
+
+    async def parar(self, timeout: float = 10.0):
+        """Dá até timeout segundos para as filas esvaziarem e encerra os destinos."""
+        fim = time.monotonic() + timeout
+        while any(not w.fila.empty() or w.ocupado for w in self.workers.values()) and time.monotonic() < fim:
+            await asyncio.sleep(0.05)
+        for t in self._tarefas:
+            t.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+
+    def stats(self):
+        return {nome: w.stats for nome, w in self.workers.items()}
+
+def parse_rotas(texto: str, destinos):
+    """"alert:telegram,stdout;log:stdout" → {"alert": [...], "log": [...]}.
+    Só traz os tipos citados: quem chama mescla sobre os defaults, então tipos sem regra
+    mantêm os destinos default ("log:" sem destinos silencia o tipo). Destinos fora de
+    `destinos` (desconhecidos ou não configurados) são avisados e ignorados.
+    """
+    rotas = {}
+    for parte in texto.split(";"):
+        if ":" not in parte:
+            continue
+        kind, nomes = parte.split(":", 1)
+        kind = kind.strip()
+        if kind not in TIPOS:
+            print(f"⚠️ NOTIFY_ROUTES: tipo desconhecido {kind!r} (use {', '.join(TIPOS)})")
+            continue
+        rotas[kind] = []
+        for nome in (n.strip() for n in nomes.split(",")):
+            if not nome:
+                continue
+            if nome not in destinos:
+                print(f"⚠️ NOTIFY_ROUTES: destino desconhecido ou não configurado {nome!r} em {kind!r} (disponíveis: {', '.join(destinos)})")
+                continue
+            rotas[kind].append(nome)
+    return rotas
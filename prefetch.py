@@ -0,0 +1,63 @@
+# prefetch.py — aquece o cache de pernas durante a pausa entre ciclos
+# Em vez de ficar parado e disparar uma rajada no início do ciclo seguinte, cota aos poucos
+# as pernas que o próximo ciclo mais vai pedir: primeiras pernas BASE→X compartilhadas por
+# muitos triângulos e as das rotas de maior net recente. As requisições são espalhadas
+# uniformemente pela janela, e o resultado vai para o QuoteCache usado pelo ciclo, com a mesma
+# chave (amount e agregadores) que a fase que vai lê-las usa: com TWO_PHASE, a triagem.
+import asyncio
+import time
+
+from get_best_quote_async import get_best_quote_async, deadline_scope
+
+def planejar_pernas(planos, ultimo_net, max_pernas, bonus_quente=10.0, top_quentes=10):
+    """planos: {chain_id: [(base, rotas_s, rotas_t, amounts, agregadores)]}, agregadores None =
+    todos; ultimo_net: {(chain, rota): net}.
+    Retorna até max_pernas pernas (chain_id, from, to, amount, agregadores), da mais para a menos útil.
+    """
+    peso = {}
+    aggs = {}
+    for chain_id, plano in planos.items():
+        for base, rotas_s, rotas_t, grade, agregadores in plano:
+            uso = {}
+            for x in rotas_s:
+                uso[x] = uso.get(x, 0) + 1
+            for b, _ in rotas_t:
+                uso[b] = uso.get(b, 0) + 1
+            for x, n in uso.items():
+                for amount in grade:
+                    k = (chain_id, base, x, amount)
+                    peso[k] = peso.get(k, 0) + n
+                    aggs[k] = agregadores
+
+    # rotas quentes: a primeira perna delas passa na frente
+    quentes = sorted(ultimo_net.items(), key=lambda kv: kv[1], reverse=True)[:top_quentes]
+    for i, ((chain_id, rota), _) in enumerate(quentes):
+        for k in list(peso):
+            if k[0] == chain_id and k[1].lower() == rota[0].lower() and k[2].lower() == rota[1].lower():
+                peso[k] += bonus_quente * (top_quentes - i)
+
+    return [k + (aggs[k],) for k, _ in sorted(peso.items(), key=lambda kv: kv[1], reverse=True)[:max_pernas]]
+
+async def prefetch_na_janela(session, cache, pernas, janela: float):
+    """Cota as pernas espaçadas uniformemente em `janela` segundos e grava no cache.
+    Sempre leva ~janela segundos (faz o papel do sleep entre ciclos). Retorna quantas cotou.
+    """
+    fim = time.monotonic() + janela
+    if not pernas:
+        await asyncio.sleep(janela)
+        return 0
+    passo = janela / (len(pernas) + 1)
+    ok = 0
+    # o prefetch nunca invade o ciclo seguinte
+    with deadline_scope(janela):
+        for chain_id, a, b, amount, agregadores in pernas:
+            await asyncio.sleep(max(0.0, min(passo, fim - time.monotonic())))
+            if time.monotonic() >= fim:
+                break
+            q = await get_best_quote_async(session, a, b, amount, chain_id, aggregator_list=agregadores)
+            if q:
+                # cotação nova sobrescreve a antiga mesmo que ainda válida
+                cache.put(cache.key(chain_id, a, b, amount, agregadores), q)
+                ok += 1
+    await asyncio.sleep(max(0.0, fim - time.monotonic()))
+    return ok
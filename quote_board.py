@@ -0,0 +1,157 @@
+# quote_board.py — quadro de cotações em memória compartilhada
+# O bot publica a última cotação de cada perna (chain, from, to) num bloco de memória
+# compartilhada de layout fixo; outros processos do host (análises, alertas) leem direto
+# dali, sem HTTP e sem pedir a cotação de novo.
+#
+# Layout: cabeçalho + n_slots slots de tamanho fixo. Cada slot tem um seqlock: o escritor
+# deixa a sequência ímpar enquanto escreve e par ao terminar; o leitor só aceita a leitura
+# se a sequência era par e não mudou durante a cópia. Um escritor por quadro.
+import hashlib
+import struct
+import time
+from multiprocessing import shared_memory
+
+_MAGIC = 0x51424F44  # "QBOD"
+_VERSAO = 1
+# magic, versão, n_slots, tamanho do slot, escritas (contador global)
+_CAB = struct.Struct("<IIIIQ")
+# seq, hash da chave, chain, from, to, amount_in, amount_out, taxa, timestamp, agregador
+_SLOT = struct.Struct("<QQI20s20sdddd16s")
+_SEQ = struct.Struct("<Q")
+_SONDAGEM = 8
+
+def _addr_bytes(addr: str) -> bytes:
+    return bytes.fromhex(addr[2:] if addr.lower().startswith("0x") else addr)
+
+def _hash_perna(chain_id, from_token, to_token) -> int:
+    h = hashlib.blake2b(f"{chain_id}:{from_token.lower()}:{to_token.lower()}".encode(), digest_size=8).digest()
+    # 0 marca slot vazio
+    return int.from_bytes(h, "little") or 1
+
+def _offset(i: int) -> int:
+    return _CAB.size + i * _SLOT.size
+
+class QuoteBoard:
+    """Lado do escritor (o bot). Cria o bloco `nome`, substituindo um antigo de mesmo nome."""
+
+    def __init__(self, nome: str, n_slots: int = 4096):
+        self.nome = nome
+        self.n_slots = n_slots
+        tamanho = _CAB.size + n_slots * _SLOT.size
+        try:
+            self.shm = shared_memory.SharedMemory(name=nome, create=True, size=tamanho)
+        except FileExistsError:
+            # sobra de uma execução que não encerrou direito
+            antigo = shared_memory.SharedMemory(name=nome)
+            antigo.close()
+            antigo.unlink()
+            self.shm = shared_memory.SharedMemory(name=nome, create=True, size=tamanho)
+        self.buf = self.shm.buf
+        self.buf[:tamanho] = bytes(tamanho)
+        self._escritas = 0
+        _CAB.pack_into(self.buf, 0, _MAGIC, _VERSAO, n_slots, _SLOT.size, 0)
+
+    def _slot_para(self, h: int) -> int:
+        """Slot da chave h: o já ocupado por ela, um vazio, ou o mais antigo da sondagem."""
+        base = h % self.n_slots
+        mais_antigo, ts_antigo = base, float("inf")
+        for d in range(_SONDAGEM):
+            i = (base + d) % self.n_slots
+            _, hs, *_, ts, _ = _SLOT.unpack_from(self.buf, _offset(i))
+            if hs == h or hs == 0:
+                return i
+            if ts < ts_antigo:
+                mais_antigo, ts_antigo = i, ts
+        return mais_antigo
+
+    def publicar(self, chain_id, from_token, to_token, amount_in, amount_out, aggregator=None):
+        """Assinatura de get_best_quote_async.add_quote_listener."""
+        try:
+            a, b = _addr_bytes(from_token), _addr_bytes(to_token)
+        except ValueError:
+            return
+        h = _hash_perna(chain_id, from_token, to_token)
+        off = _offset(self._slot_para(h))
+        seq = _SEQ.unpack_from(self.buf, off)[0]
+        _SEQ.pack_into(self.buf, off, seq + 1)  # ímpar: escrevendo
+        _SLOT.pack_into(
+            self.buf, off, seq + 1, h, int(chain_id), a, b,
+            float(amount_in), float(amount_out), amount_out / amount_in if amount_in else 0.0,
+            time.time(), (aggregator or "").encode()[:16],
+        )
+        _SEQ.pack_into(self.buf, off, seq + 2)  # par: pronto
+        self._escritas += 1
+        _CAB.pack_into(self.buf, 0, _MAGIC, _VERSAO, self.n_slots, _SLOT.size, self._escritas)
+
+    def fechar(self):
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+class QuoteBoardReader:
+    """Lado do leitor (qualquer processo do host). Não remove o bloco ao sair."""
+
+    def __init__(self, nome: str):
+        self.shm = shared_memory.SharedMemory(name=nome)
+        try:
+            # o resource_tracker apagaria o bloco do escritor quando este processo terminasse
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        except Exception:
+            pass
+        self.buf = self.shm.buf
+        magic, versao, self.n_slots, tam_slot, _ = _CAB.unpack_from(self.buf, 0)
+        if magic != _MAGIC or versao != _VERSAO or tam_slot != _SLOT.size:
+            self.fechar()
+            raise ValueError(f"bloco {nome!r} não é um quadro de cotações compatível")
+
+    def escritas(self) -> int:
+        """Contador global de escritas: mudou desde a última leitura → há cotação nova."""
+        return _CAB.unpack_from(self.buf, 0)[4]
+
+    def _ler_slot(self, i: int, tentativas: int = 100):
+        off = _offset(i)
+        for _ in range(tentativas):
+            s1 = _SEQ.unpack_from(self.buf, off)[0]
+            if s1 & 1:
+                continue
+            campos = _SLOT.unpack_from(self.buf, off)
+            if _SEQ.unpack_from(self.buf, off)[0] == s1:
+                return campos
+        return None
+
+    @staticmethod
+    def _registro(campos):
+        _, _, chain_id, a, b, amount_in, amount_out, taxa, ts, agg = campos
+        return {
+            "chain_id": chain_id, "from": "0x" + a.hex(), "to": "0x" + b.hex(),
+            "amount_in": amount_in, "amount_out": amount_out, "rate": taxa, "ts": ts,
+            "aggregator": agg.rstrip(b"\0").decode(errors="replace") or None,
+        }
+
+    def ler(self, chain_id, from_token, to_token):
+        """Última cotação da perna, ou None."""
+        h = _hash_perna(chain_id, from_token, to_token)
+        base = h % self.n_slots
+        for d in range(_SONDAGEM):
+            campos = self._ler_slot((base + d) % self.n_slots)
+            if campos and campos[1] == h:
+                return self._registro(campos)
+        return None
+
+    def snapshot(self, max_age=None):
+        """Todas as pernas do quadro (cada slot lido de forma consistente)."""
+        agora = time.time()
+        out = []
+        for i in range(self.n_slots):
+            campos = self._ler_slot(i)
+            if not campos or campos[1] == 0:
+                continue
+            if max_age is not None and agora - campos[8] > max_age:
+                continue
+            out.append(self._registro(campos))
+        return out
+
+    def fechar(self):
+        self.buf = None
+        self.shm.close()
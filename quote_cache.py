@@ -0,0 +1,110 @@
+# quote_cache.py — taxas observadas por par (chain, from, to) e cache de pernas
+# As taxas são alimentadas por get_best_quote_async a cada cotação bem-sucedida e
+# usadas para prever amounts (pernas especulativas) e estimar spreads de ida e volta.
+import asyncio
+import time
+
+# (chain_id, from.lower(), to.lower()) -> (taxa em unidades nativas to/from, timestamp)
+_RATES = {}
+
+def _key(chain_id, from_token, to_token):
+    return (int(chain_id), (from_token or "").lower(), (to_token or "").lower())
+
+def record_rate(chain_id, from_token, to_token, amount_in, amount_out):
+    if not amount_in or not amount_out:
+        return
+    _RATES[_key(chain_id, from_token, to_token)] = (amount_out / amount_in, time.time())
+
+def cached_rate(chain_id, from_token, to_token, max_age=None):
+    """Última taxa observada para o par, ou None se ausente/velha demais."""
+    v = _RATES.get(_key(chain_id, from_token, to_token))
+    if not v:
+        return None
+    rate, ts = v
+    if max_age is not None and time.time() - ts > max_age:
+        return None
+    return rate
+
+def predict_amount(chain_id, from_token, to_token, amount_in, max_age=None):
+    """Amount de saída previsto pela taxa em cache (None se não houver taxa)."""
+    rate = cached_rate(chain_id, from_token, to_token, max_age)
+    if rate is None or not amount_in:
+        return None
+    return int(amount_in * rate)
+
+def round_trip_factor(chain_id, token_a, token_b, max_age=None):
+    """Quadro de spreads: taxa(A→B) * taxa(B→A), i.e. quanto sobra de uma ida e volta
+    (< 1 em mercado normal). None se alguma das direções não tiver taxa em cache.
+    """
+    ab = cached_rate(chain_id, token_a, token_b, max_age)
+    ba = cached_rate(chain_id, token_b, token_a, max_age)
+    if ab is None or ba is None:
+        return None
+    return ab * ba
+
+class QuoteCache:
+    """Cache de cotações exatas (mesmo par, amount e agregadores).
+    Pedidos simultâneos da mesma chave aguardam uma única requisição (coalescência).
+    ttl=None → vale enquanto o objeto existir (ex.: um ciclo).
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._data = {}      # key -> (quote, ts)
+        self._inflight = {}  # key -> asyncio.Future
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(chain_id, from_token, to_token, amount, aggregator_list=None):
+        aggs = tuple(aggregator_list) if aggregator_list else None
+        return (int(chain_id), (from_token or "").lower(), (to_token or "").lower(), int(amount), aggs)
+
+    def get(self, key):
+        v = self._data.get(key)
+        if not v:
+            return None
+        quote, ts = v
+        if self.ttl is not None and time.time() - ts > self.ttl:
+            self._data.pop(key, None)
+            return None
+        return quote
+
+    def put(self, key, quote):
+        if quote:
+            self._data[key] = (quote, time.time())
+
+    def absorver(self, outro):
+        """Traz as cotações ainda válidas de outro cache (com o horário original) e o esvazia."""
+        for key in list(outro._data):
+            if outro.get(key) is not None:
+                self._data[key] = outro._data[key]
+        outro._data.clear()
+
+    async def fetch(self, key, factory):
+        quote = self.get(key)
+        if quote is not None:
+            self.hits += 1
+            return quote
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.hits += 1
+            return await asyncio.shield(fut)
+        self.misses += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            quote = await factory()
+            self.put(key, quote)
+            fut.set_result(quote)
+            return quote
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            # evita "Future exception was never retrieved" quando ninguém mais aguardava
+            fut.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
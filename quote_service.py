@@ -0,0 +1,151 @@
+# quote_service.py — serviço local de cotações
+# Processo de longa duração que expõe get_best_quote_async por HTTP (e, opcionalmente, por um
+# unix socket), com um cache compartilhado, coalescência de pedidos iguais e limite de
+# requisições: todos os bots e scripts do host dividem o mesmo cache quente e a mesma cota
+# nos agregadores.
+#
+#   python quote_service.py                      # sobe o serviço
+#   QUOTE_SERVICE_URL=http://127.0.0.1:8710      # no bot: cotações passam pelo serviço
+#
+# POST /quote {"chain_id", "from", "to", "amount", "aggregators"?, "attempts"?}
+#   → {"aggregator", "toAmount", "agregadores", "http"}; aggregator/toAmount null sem cotação,
+#     "agregadores" = [[nome, ok, latência], ...] e "http" = requisições/erros/429 feitos para
+#     atender este pedido (vazios quando veio do cache)
+# GET /stats → contadores do serviço
+import asyncio
+import os
+
+import aiohttp
+from aiohttp import web
+
+from get_best_quote_async import get_best_quote_direct, limit_concurrency, outcome_scope, http_stats, _aggregators_for_chain
+from quote_cache import QuoteCache
+from scheduler import RequestBudget
+
+class QuoteService:
+
+    def __init__(self, ttl=5.0, budget_por_minuto=0, max_concurrency=16):
+        self.cache = QuoteCache(ttl=ttl)
+        self.budget = RequestBudget(budget_por_minuto) if budget_por_minuto > 0 else None
+        self.sem = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self.session = None
+        self.stats = {"pedidos": 0, "cotacoes": 0, "sem_cotacao": 0}
+
+    async def cotar(self, chain_id, from_token, to_token, amount, aggregator_list=None, attempts=2):
+        self.stats["pedidos"] += 1
+        key = self.cache.key(chain_id, from_token, to_token, amount, aggregator_list)
+        q = await self.cache.fetch(key, lambda: self._direto(chain_id, from_token, to_token, amount, aggregator_list, attempts))
+        if q is None:
+            self.stats["sem_cotacao"] += 1
+        return q
+
+    async def _direto(self, chain_id, from_token, to_token, amount, aggregator_list, attempts):
+        self.stats["cotacoes"] += 1
+        if self.budget:
+            # uma ficha por agregador consultado
+            await self.budget.consumir(len(aggregator_list or _aggregators_for_chain(chain_id)))
+        with limit_concurrency(self.sem):
+            return await get_best_quote_direct(self.session, from_token, to_token, amount, chain_id, aggregator_list, attempts)
+
+    async def _h_quote(self, request):
+        try:
+            body = await request.json()
+            chain_id = int(body["chain_id"])
+            from_token, to_token = str(body["from"]), str(body["to"])
+            amount = int(body["amount"])
+            aggs = body.get("aggregators") or None
+            attempts = int(body.get("attempts") or 2)
+        except (ValueError, KeyError, TypeError) as e:
+            return web.json_response({"error": f"pedido inválido: {e}"}, status=400)
+        with outcome_scope() as res:
+            q = await self.cotar(chain_id, from_token, to_token, amount, aggs, attempts)
+        return web.json_response({
+            **(q or {"aggregator": None, "toAmount": None}),
+            "agregadores": res.pop("agregadores"),
+            "http": res,
+        })
+
+    async def _h_stats(self, request):
+        return web.json_response({
+            **self.stats,
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            **http_stats(),
+        })
+
+    async def _sessao(self, app):
+        async with aiohttp.ClientSession(headers={
+            "User-Agent": "Mozilla/5.0 (compatible; ArbitrBot/1.0)",
+            "Accept": "application/json",
+        }) as session:
+            self.session = session
+            yield
+
+    def app(self):
+        app = web.Application()
+        app.cleanup_ctx.append(self._sessao)
+        app.router.add_post("/quote", self._h_quote)
+        app.router.add_get("/stats", self._h_stats)
+        return app
+
+class QuoteServiceClient:
+    """Cliente mínimo para scripts: `async with QuoteServiceClient(url) as c: await c.quote(...)`.
+    url = "http://host:porta" ou "unix:/caminho/do/socket".
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._session = None
+
+    async def __aenter__(self):
+        if self.url.startswith("unix:"):
+            self._session = aiohttp.ClientSession(connector=aiohttp.UnixConnector(path=self.url[len("unix:"):]))
+            self._base = "http://localhost"
+        else:
+            self._session = aiohttp.ClientSession()
+            self._base = self.url.rstrip("/")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    async def quote(self, from_token, to_token, amount, chain_id=137, aggregator_list=None, attempts=2):
+        payload = {"chain_id": chain_id, "from": from_token, "to": to_token, "amount": str(amount), "aggregators": aggregator_list, "attempts": attempts}
+        async with self._session.post(self._base + "/quote", json=payload) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+        if not data or not data.get("toAmount"):
+            return None
+        return {"aggregator": data.get("aggregator"), "toAmount": int(data["toAmount"])}
+
+    async def stats(self):
+        async with self._session.get(self._base + "/stats") as resp:
+            resp.raise_for_status()
+            return await resp.json()
+
+async def main():
+    host = os.getenv("QUOTE_SERVICE_HOST", "127.0.0.1")
+    port = int(os.getenv("QUOTE_SERVICE_PORT", "8710"))
+    sock = os.getenv("QUOTE_SERVICE_SOCKET", "").strip()
+    servico = QuoteService(
+        ttl=float(os.getenv("QUOTE_SERVICE_TTL_SECONDS", "5")),
+        budget_por_minuto=float(os.getenv("QUOTE_SERVICE_BUDGET_PER_MINUTE", "0")),
+        max_concurrency=int(os.getenv("QUOTE_SERVICE_MAX_CONCURRENCY", "16")),
+    )
+    runner = web.AppRunner(servico.app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"Serviço de cotações em http://{host}:{port}")
+    if sock:
+        await web.UnixSite(runner, sock).start()
+        print(f"Serviço de cotações em unix:{sock}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("Encerrado.")
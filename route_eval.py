@@ -0,0 +1,53 @@
+# route_eval.py — cotação e avaliação de uma rota isolada
+# Uma rota é (base, X) para SIMPLES (BASE→X→BASE) ou (base, B, C) para TRI (BASE→B→C→BASE).
+# Usado pelos modos que agendam rotas individualmente (streaming, sniper...).
+from get_best_quote_async import get_best_quote_async
+from tokens_config import token_symbol, chain_name
+from utils import net_percent
+
+NON_PS = ["1inch","0x","KyberSwap","OpenOcean","Odos"]
+
+def tipo_rota(rota) -> str:
+    return "SIMPLES" if len(rota) == 2 else "TRI"
+
+def caminho(rota):
+    """Tokens na ordem dos swaps, voltando à base."""
+    return list(rota) + [rota[0]]
+
+async def cotar_rota(session, rota, amount_in, chain_id, **quote_kw):
+    """Cota as pernas em sequência; retorna a lista de cotações ou None se alguma falhar."""
+    cam = caminho(rota)
+    quotes = []
+    amount = amount_in
+    for a, b in zip(cam, cam[1:]):
+        q = await get_best_quote_async(session, a, b, amount, chain_id, **quote_kw)
+        if not q:
+            return None
+        quotes.append(q)
+        amount = q["toAmount"]
+    return quotes
+
+def pernas_de(amount_in, quotes):
+    """((agregador, amount_in, amount_out), ...) de cada perna, para o histórico."""
+    out, amount = [], amount_in
+    for q in quotes:
+        out.append((q["aggregator"], amount, q["toAmount"]))
+        amount = q["toAmount"]
+    return tuple(out)
+
+def avaliar_rota(rota, amount_in, chain_id, quotes, fee_bps):
+    """(gross, net, msg) no mesmo formato das varreduras SIMPLES/TRI."""
+    retorno_final = quotes[-1]["toAmount"] - amount_in
+    gross = (retorno_final / amount_in) * 100.0
+    net = net_percent(gross, swaps=len(quotes), fee_bps_per_swap=fee_bps)
+    simbolos = "→".join(token_symbol(t, chain_id) for t in caminho(rota))
+    via = " + ".join(q["aggregator"] for q in quotes)
+    msg = f"[{chain_name(chain_id)}] {tipo_rota(rota)} {simbolos} gross {gross:.2f}% | net {net:.2f}% via {via}"
+    return gross, net, msg
+
+async def recheck_rota(session, rota, amount_in, chain_id, fee_bps, **quote_kw):
+    """Net recotado sem ParaSwap e sem cache (None se não houver consenso)."""
+    rq = await cotar_rota(session, rota, amount_in, chain_id, **{**quote_kw, "aggregator_list": NON_PS, "cache": None})
+    if not rq:
+        return None
+    return avaliar_rota(rota, amount_in, chain_id, rq, fee_bps)[1]
@@ -0,0 +1,46 @@
+# sampling.py — varredura por amostragem para universos grandes
+# Com 50+ tokens por chain, permutations(tokens, 2) gera milhares de triângulos por amount e
+# uma varredura completa não cabe no intervalo. Cada janela avalia só uma amostra:
+#   - um estrato fixo (hash da rota mod max_janelas), rodando a cada janela: toda rota é
+#     visitada pelo menos uma vez a cada max_janelas janelas;
+#   - o restante do orçamento sorteado com peso, favorecendo rotas com net recente positivo.
+import heapq
+import random
+import zlib
+
+def _estrato(chave, n: int) -> int:
+    # estável entre execuções (hash() de str muda a cada processo)
+    return zlib.crc32(repr(chave).encode()) % n
+
+class AmostragemRotas:
+
+    def __init__(self, max_janelas=10, fracao=0.2, bonus_positivo=10.0, rng=None):
+        self.max_janelas = max(1, max_janelas)
+        # a fração nunca fica abaixo do que o estrato sozinho já garante
+        self.fracao = max(fracao, 1.0 / self.max_janelas)
+        self.bonus_positivo = bonus_positivo
+        self.rng = rng or random.Random()
+        self._janela = {}
+
+    def peso(self, net) -> float:
+        if net is None or net <= 0:
+            return 1.0
+        return 1.0 + self.bonus_positivo * net
+
+    def amostrar(self, grupo, chaves, net_fn=lambda chave: None):
+        """Escolhe as chaves desta janela do grupo (ex.: a chain). net_fn(chave) → último net ou None.
+        Retorna (set de chaves escolhidas, quantas vieram do estrato obrigatório).
+        """
+        janela = self._janela.get(grupo, 0)
+        self._janela[grupo] = janela + 1
+        estrato = janela % self.max_janelas
+
+        obrigatorias = {k for k in chaves if _estrato(k, self.max_janelas) == estrato}
+        alvo = max(len(obrigatorias), int(round(len(chaves) * self.fracao)))
+        resto = [k for k in chaves if k not in obrigatorias]
+        # sorteio ponderado sem reposição (Efraimidis–Spirakis): maior u^(1/peso)
+        extras = heapq.nlargest(
+            alvo - len(obrigatorias), resto,
+            key=lambda k: self.rng.random() ** (1.0 / self.peso(net_fn(k))),
+        )
+        return obrigatorias | set(extras), len(obrigatorias)
@@ -0,0 +1,41 @@
+# scan_plan.py — plano de varredura com vários tokens base por chain
+# Um ciclo de tokens é o mesmo qualquer que seja o ponto de partida
+# (USDC→WETH→USDT→USDC ≡ WETH→USDT→USDC→WETH), então cada ciclo é atribuído
+# a uma única base: adicionar uma base só acrescenta os ciclos que ainda não existiam.
+from itertools import permutations
+
+def _canon_ciclo(tokens):
+    """Rotação canônica de um ciclo dirigido (preserva o sentido)."""
+    low = [t.lower() for t in tokens]
+    i = low.index(min(low))
+    return tuple(low[i:] + low[:i])
+
+def build_scan_plan(bases, tokens):
+    """Retorna [(base, simples, tri)] onde simples é a lista de X para BASE→X→BASE
+    e tri é a lista de pares (B, C) para BASE→B→C→BASE, sem repetir ciclos entre bases.
+    """
+    universo = []
+    vistos_tok = set()
+    for t in list(bases) + list(tokens):
+        if t.lower() not in vistos_tok:
+            vistos_tok.add(t.lower())
+            universo.append(t)
+
+    vistos = set()
+    plano = []
+    for base in bases:
+        others = [t for t in universo if t.lower() != base.lower()]
+        simples = []
+        for x in others:
+            k = frozenset((base.lower(), x.lower()))
+            if k not in vistos:
+                vistos.add(k)
+                simples.append(x)
+        tri = []
+        for b, c in permutations(others, 2):
+            k = _canon_ciclo((base, b, c))
+            if k not in vistos:
+                vistos.add(k)
+                tri.append((b, c))
+        plano.append((base, simples, tri))
+    return plano
@@ -0,0 +1,108 @@
+# scheduler.py — agenda por prioridade para o modo contínuo
+# Cada item (chain, rota, amount) recebe uma prioridade em [0, 1] a partir do net recente,
+# da volatilidade e da distância ao ALERT_THRESHOLD_PERCENT. A prioridade define o período de
+# revarredura (entre min_period e max_period); entre os itens vencidos, sai primeiro o de maior
+# prioridade, e um balde de fichas limita as requisições por minuto.
+import asyncio
+import heapq
+import itertools
+import math
+import time
+
+class _Estado:
+    __slots__ = ("ewma", "vol", "ultimo", "n", "prioridade")
+
+    def __init__(self):
+        self.ewma = None
+        self.vol = 0.0
+        self.ultimo = None
+        self.n = 0
+        self.prioridade = 1.0  # nunca avaliado: máxima
+
+class RequestBudget:
+    """Balde de fichas: por_minuto requisições/min, com rajada de até 10 s de orçamento."""
+
+    def __init__(self, por_minuto: float):
+        self.taxa = por_minuto / 60.0
+        self.capacidade = max(1.0, self.taxa * 10)
+        self.fichas = self.capacidade
+        self.t = time.monotonic()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self.fichas = min(self.capacidade, self.fichas + (agora - self.t) * self.taxa)
+        self.t = agora
+
+    async def consumir(self, n: float):
+        n = min(n, self.capacidade)
+        while True:
+            self._repor()
+            if self.fichas >= n:
+                self.fichas -= n
+                return
+            await asyncio.sleep((n - self.fichas) / self.taxa)
+
+class AgendaPrioridade:
+    """Mesma interface de streaming.AgendaFixa: proxima() e resultado(item, net)."""
+
+    def __init__(self, itens, alert_thr, min_period, max_period, budget_por_minuto=0, custo_fn=None, alpha=0.3):
+        self.alert_thr = alert_thr
+        self.min_period = min_period
+        self.max_period = max(max_period, min_period)
+        self.alpha = alpha
+        self.custo_fn = custo_fn or (lambda item: 1)
+        self.budget = RequestBudget(budget_por_minuto) if budget_por_minuto > 0 else None
+        self.estado = {item: _Estado() for item in itens}
+        self._seq = itertools.count()
+        agora = time.monotonic()
+        n = max(1, len(itens))
+        # heap por vencimento; os vencidos passam para _prontos (heap por -prioridade)
+        self._vencimentos = [(agora + min_period * i / n, next(self._seq), item) for i, item in enumerate(itens)]
+        heapq.heapify(self._vencimentos)
+        self._prontos = []
+
+    def _prioridade(self, st: _Estado) -> float:
+        if st.n == 0:
+            return 1.0
+        if st.ewma is None:
+            return 0.5  # só falhas até agora
+        dist = max(0.0, self.alert_thr - st.ewma)
+        sigma = max(st.vol, 0.02)
+        return math.exp(-dist / (3.0 * sigma))
+
+    def periodo(self, item) -> float:
+        p = self.estado[item].prioridade
+        return self.max_period - (self.max_period - self.min_period) * p
+
+    def resultado(self, item, net):
+        st = self.estado.get(item)
+        if st is None:
+            return
+        st.n += 1
+        if net is not None:
+            if st.ewma is None:
+                st.ewma = net
+            else:
+                st.vol = (1 - self.alpha) * st.vol + self.alpha * abs(net - st.ultimo)
+                st.ewma = (1 - self.alpha) * st.ewma + self.alpha * net
+            st.ultimo = net
+        st.prioridade = self._prioridade(st)
+
+    async def proxima(self):
+        while True:
+            agora = time.monotonic()
+            while self._vencimentos and self._vencimentos[0][0] <= agora:
+                _, seq, item = heapq.heappop(self._vencimentos)
+                heapq.heappush(self._prontos, (-self.estado[item].prioridade, seq, item))
+            if self._prontos:
+                _, _, item = heapq.heappop(self._prontos)
+                if self.budget:
+                    await self.budget.consumir(self.custo_fn(item))
+                heapq.heappush(self._vencimentos, (time.monotonic() + self.periodo(item), next(self._seq), item))
+                return item
+            await asyncio.sleep(max(0.0, self._vencimentos[0][0] - agora) if self._vencimentos else 1.0)
+
+    def mais_quentes(self, k=3):
+        """[(prioridade, ewma, item)] dos k itens de maior prioridade."""
+        top = sorted(self.estado.items(), key=lambda kv: kv[1].prioridade, reverse=True)[:k]
+        return [(st.prioridade, st.ewma, item) for item, st in top]
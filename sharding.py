@@ -0,0 +1,107 @@
+# sharding.py — divide as rotas entre vários processos
+# Um anel de hash consistente distribui cada (chain, rota) para um shard; cada shard roda num
+# processo próprio, com sessão HTTP e cache próprios, e manda avisos e resumos para o processo
+# pai por uma fila. O pai junta tudo no mesmo caminho de resumo/alerta do main_loop.
+import asyncio
+import bisect
+import hashlib
+import multiprocessing
+import queue
+import time
+
+def chave_rota(chain_id, rota):
+    return f"{chain_id}:" + ">".join(t.lower() for t in rota)
+
+class HashRing:
+    """Anel de hash consistente com nós virtuais: mudar o número de shards move poucas rotas."""
+
+    def __init__(self, total: int, vnodes: int = 64):
+        self.total = total
+        self._anel = sorted(
+            (self._hash(f"shard-{i}#{v}"), i) for i in range(total) for v in range(vnodes)
+        )
+        self._pontos = [h for h, _ in self._anel]
+
+    @staticmethod
+    def _hash(s: str) -> int:
+        # md5 só como função de espalhamento (estável entre processos, ao contrário de hash())
+        return int.from_bytes(hashlib.md5(s.encode()).digest()[:8], "big")
+
+    def shard(self, chave: str) -> int:
+        i = bisect.bisect(self._pontos, self._hash(chave)) % len(self._anel)
+        return self._anel[i][1]
+
+class ShardPool:
+    """Processos de shard supervisionados. alvo(indice, total, fila) roda dentro de cada processo.
+    Mensagens na fila são tuplas cujo primeiro elemento é o tipo ("aviso", "resumo", ...).
+    """
+
+    def __init__(self, alvo, total: int, metodo: str = "spawn", backoff_base=1.0, backoff_max=300.0, max_reinicios=10, estavel=300.0):
+        # reinício de um shard morto espera backoff_base·2^(falhas-1) segundos (até backoff_max);
+        # depois de max_reinicios falhas seguidas (0 = sem limite) o shard fica parado. Um shard
+        # que viveu `estavel` segundos zera a contagem.
+        self.alvo = alvo
+        self.total = total
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_reinicios = max_reinicios
+        self.estavel = estavel
+        self._ctx = multiprocessing.get_context(metodo)
+        self.fila = self._ctx.Queue()
+        self.procs = {}
+        self.reinicios = 0
+        self.desistidos = set()
+        self._falhas = {}    # indice -> falhas seguidas
+        self._inicio = {}    # indice -> time.monotonic() do último start
+        self._agendado = {}  # indice -> time.monotonic() do próximo reinício
+
+    def _novo(self, indice):
+        p = self._ctx.Process(target=self.alvo, args=(indice, self.total, self.fila), name=f"shard-{indice}", daemon=True)
+        p.start()
+        self.procs[indice] = p
+        self._inicio[indice] = time.monotonic()
+
+    def iniciar(self):
+        for i in range(self.total):
+            self._novo(i)
+
+    def verificar(self):
+        """Agenda o reinício dos shards que morreram e reinicia os que já esperaram o bastante.
+        Retorna [(indice, exitcode, espera)] das mortes vistas agora; espera None = desistiu.
+        """
+        agora = time.monotonic()
+        mortes = []
+        for i, p in self.procs.items():
+            if p.is_alive() or i in self._agendado or i in self.desistidos:
+                continue
+            if agora - self._inicio[i] >= self.estavel:
+                self._falhas[i] = 0
+            n = self._falhas[i] = self._falhas.get(i, 0) + 1
+            if self.max_reinicios and n > self.max_reinicios:
+                self.desistidos.add(i)
+                mortes.append((i, p.exitcode, None))
+                continue
+            espera = min(self.backoff_max, self.backoff_base * 2 ** (n - 1))
+            self._agendado[i] = agora + espera
+            mortes.append((i, p.exitcode, espera))
+        for i, t in list(self._agendado.items()):
+            if agora >= t:
+                del self._agendado[i]
+                self.reinicios += 1
+                self._novo(i)
+        return mortes
+
+    async def receber(self, timeout: float = 1.0):
+        """Próxima mensagem da fila, ou None se nada chegou em `timeout` segundos."""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(None, self.fila.get, True, timeout)
+        except queue.Empty:
+            return None
+
+    def parar(self, timeout: float = 5.0):
+        for p in self.procs.values():
+            if p.is_alive():
+                p.terminate()
+        for p in self.procs.values():
+            p.join(timeout)
@@ -0,0 +1,100 @@
+# sniper.py — acompanhamento em alta frequência de oportunidades ativas
+# Quando uma rota cruza o ALERT_THRESHOLD_PERCENT, uma tarefa dedicada recota a mesma
+# rota a cada poucos segundos enquanto ela continuar acima do limiar, registrando quanto
+# tempo a oportunidade durou e como o lucro decaiu; ao encerrar, envia um relatório.
+import asyncio
+import contextvars
+import time
+
+class Sniper:
+    """requote_fn(item) -> (net, msg) ou None; on_close(texto) recebe o relatório final."""
+
+    def __init__(self, requote_fn, on_close, alert_thr, interval=2.0, max_seconds=600, max_active=5, max_falhas=3):
+        self.requote_fn = requote_fn
+        self.on_close = on_close
+        self.alert_thr = alert_thr
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.max_active = max_active
+        self.max_falhas = max_falhas
+        self._ativos = {}  # item -> Task
+        self.historico = []  # relatórios (dict) das oportunidades encerradas
+
+    def ativo(self, item) -> bool:
+        return item in self._ativos
+
+    def disparar(self, item, net, msg) -> bool:
+        """Começa a seguir item (se ainda não seguido e houver vaga). Retorna True se iniciou."""
+        if item is None or item in self._ativos or len(self._ativos) >= self.max_active:
+            return False
+        # contexto vazio: a tarefa não herda o orçamento do ciclo (deadline_scope), a contagem de
+        # chamadas nem o limite de concorrência de quem disparou, e sobrevive ao fim do ciclo
+        task = contextvars.Context().run(asyncio.create_task, self._seguir(item, net, msg))
+        self._ativos[item] = task
+        task.add_done_callback(lambda _t: self._ativos.pop(item, None))
+        return True
+
+    async def _seguir(self, item, net0, msg0):
+        t0 = time.monotonic()
+        amostras = [(0.0, net0)]
+        falhas = 0
+        ultimo_msg = msg0
+        motivo = "tempo máximo"
+        while time.monotonic() - t0 < self.max_seconds:
+            await asyncio.sleep(self.interval)
+            try:
+                r = await self.requote_fn(item)
+            except Exception as e:
+                print(f"⚠️ [sniper] erro ao recotar: {e.__class__.__name__}: {e}")
+                r = None
+            if r is None:
+                falhas += 1
+                if falhas >= self.max_falhas:
+                    motivo = "sem cotação"
+                    break
+                continue
+            falhas = 0
+            net, ultimo_msg = r
+            amostras.append((time.monotonic() - t0, net))
+            if net < self.alert_thr:
+                motivo = "abaixo do alerta"
+                break
+
+        duracao = time.monotonic() - t0
+        rel = self._relatorio(item, msg0, ultimo_msg, amostras, duracao, motivo)
+        self.historico.append(rel)
+        try:
+            self.on_close(rel["texto"])
+        except Exception as e:
+            print(f"⚠️ [sniper] erro ao enviar relatório: {e.__class__.__name__}: {e}")
+
+    @staticmethod
+    def _relatorio(item, msg0, ultimo_msg, amostras, duracao, motivo):
+        nets = [n for _, n in amostras]
+        inicial, final, pico = nets[0], nets[-1], max(nets)
+        # decaimento médio do net por minuto (regressão linear simples sobre as amostras)
+        if len(amostras) >= 2:
+            ts = [t for t, _ in amostras]
+            mt, mn = sum(ts) / len(ts), sum(nets) / len(nets)
+            var = sum((t - mt) ** 2 for t in ts)
+            incl = sum((t - mt) * (n - mn) for t, n in amostras) / var if var else 0.0
+        else:
+            incl = 0.0
+        texto = (
+            f"SNIPER encerrado ({motivo}): {msg0}\n"
+            f"duração {duracao:.0f}s | net inicial {inicial:.2f}% | pico {pico:.2f}% | final {final:.2f}% | "
+            f"decaimento {incl * 60:.3f}%/min | amostras {len(amostras)}\n"
+            f"última: {ultimo_msg}"
+        )
+        return {"item": item, "duracao": duracao, "inicial": inicial, "pico": pico, "final": final,
+                "decaimento_min": incl * 60, "amostras": amostras, "motivo": motivo, "texto": texto}
+
+    async def aguardar(self):
+        """Espera as oportunidades em acompanhamento encerrarem (ex.: ONE_SHOT)."""
+        while self._ativos:
+            await asyncio.gather(*list(self._ativos.values()), return_exceptions=True)
+
+    async def parar(self):
+        for t in list(self._ativos.values()):
+            t.cancel()
+        await asyncio.gather(*list(self._ativos.values()), return_exceptions=True)
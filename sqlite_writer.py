@@ -0,0 +1,126 @@
+# sqlite_writer.py — gravação em lotes num SQLite fora do event loop
+# Base do histórico (history.py) e da fita (tape.py): quem produz só enfileira, e uma thread
+# junta o que estiver na fila em lotes e grava cada lote numa transação, num SQLite em modo
+# WAL (leitores não bloqueiam o escritor). Um lote que falha é desfeito e regravado registro
+# a registro, para um registro ruim não levar os outros junto.
+import abc
+import queue
+import sqlite3
+import threading
+
+def abrir_wal(caminho: str, esquema, colunas_novas=(), **kwargs):
+    """Conexão em autocommit e modo WAL, com o esquema criado.
+    colunas_novas: (tabela, coluna, definição) acrescentadas a bancos criados antes delas.
+    """
+    db = sqlite3.connect(caminho, timeout=30, isolation_level=None, **kwargs)
+    db.execute("PRAGMA journal_mode=WAL")
+    # com WAL, NORMAL não corrompe o banco numa queda; no máximo perde o último lote
+    db.execute("PRAGMA synchronous=NORMAL")
+    for sql in esquema:
+        db.execute(sql)
+    for tabela, coluna, definicao in colunas_novas:
+        if coluna not in {c[1] for c in db.execute(f"PRAGMA table_info({tabela})")}:
+            db.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+    return db
+
+def desfazer(db):
+    if db.in_transaction:
+        db.execute("ROLLBACK")
+
+class EscritorEmLotes(abc.ABC):
+    """Thread que grava em lotes o que _enfileirar() recebe. As subclasses definem _abrir()
+    e _gravar(db, lote) e criam self.stats com "falhas", "ativo" e a chave de `descartes`
+    antes de chamar este __init__.
+    """
+    rotulo = "SQLITE"           # prefixo das mensagens de erro
+    descartes = "descartados"   # chave de stats dos registros que nem entraram na fila
+    espera = None               # segundos sem registros até a próxima _manutencao (None = sem limite)
+
+    def __init__(self, caminho: str, lote: int, max_fila: int, nome_thread: str):
+        self.caminho = caminho
+        self.lote = lote
+        self._fila = queue.Queue(maxsize=max_fila)
+        # abre (e cria o esquema) já aqui, para um caminho inválido falhar na partida
+        self._abrir().close()
+        self._thread = threading.Thread(target=self._run, name=nome_thread, daemon=True)
+        self._thread.start()
+
+    @abc.abstractmethod
+    def _abrir(self):
+        """Conexão com o esquema pronto (ver abrir_wal)."""
+
+    @abc.abstractmethod
+    def _gravar(self, db, lote):
+        """Grava o lote numa transação (BEGIN ... COMMIT)."""
+
+    def _descrever(self, r) -> str:
+        """Identificação do registro nas mensagens de erro."""
+        return repr(r)[:120]
+
+    def _manutencao(self, db):
+        """Chamada depois de cada lote (e a cada `espera` segundos sem registros)."""
+
+    def _enfileirar(self, r) -> bool:
+        """Não bloqueia: com a thread parada ou a fila cheia, o registro é descartado."""
+        if not self._thread.is_alive():
+            self.stats["ativo"] = False
+            self.stats[self.descartes] += 1
+            return False
+        try:
+            self._fila.put_nowait(r)
+            return True
+        except queue.Full:
+            self.stats[self.descartes] += 1
+            return False
+
+    def fechar(self, timeout: float = 10.0):
+        """Grava o que falta na fila e encerra a thread (bloqueante: chame via asyncio.to_thread)."""
+        try:
+            self._fila.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def _run(self):
+        db = self._abrir()
+        try:
+            fim = False
+            while not fim:
+                try:
+                    r = self._fila.get(timeout=self.espera)
+                except queue.Empty:
+                    r = ()
+                lote = []
+                while r is not None:
+                    if r:
+                        lote.append(r)
+                    if len(lote) >= self.lote:
+                        break
+                    try:
+                        r = self._fila.get_nowait()
+                    except queue.Empty:
+                        break
+                fim = r is None
+                if lote:
+                    self._gravar_lote(db, lote)
+                self._manutencao(db)
+        except Exception as e:
+            print(f"⚠️ [{self.rotulo}] gravação interrompida: {e.__class__.__name__}: {e}")
+        finally:
+            self.stats["ativo"] = False
+            db.close()
+
+    def _gravar_lote(self, db, lote):
+        try:
+            self._gravar(db, lote)
+            return
+        except Exception as e:
+            desfazer(db)
+            print(f"⚠️ [{self.rotulo}] lote de {len(lote)} registros falhou ({e.__class__.__name__}: {e}); gravando um a um")
+        for r in lote:
+            try:
+                self._gravar(db, [r])
+            except Exception as e:
+                desfazer(db)
+                self.stats["falhas"] += 1
+                print(f"⚠️ [{self.rotulo}] registro descartado ({e.__class__.__name__}: {e}): {self._descrever(r)}")
@@ -0,0 +1,121 @@
+# streaming.py — pipeline contínuo no lugar da varredura por ciclo
+# agenda → fila_rotas → fetchers (cotações) → fila_eval → avaliador → fila_notif → notificador
+# Cada rota é revarrida segundo a própria agenda; não há pausa entre ciclos, e os
+# resumos passam a ser por janela de tempo.
+import asyncio
+import heapq
+import itertools
+import time
+
+class AgendaFixa:
+    """Agenda por rota com período fixo (heap por horário de vencimento)."""
+
+    def __init__(self, rotas, periodo: float):
+        self.periodo = periodo
+        self._seq = itertools.count()
+        agora = time.monotonic()
+        # espalha o primeiro vencimento para não disparar tudo de uma vez
+        n = max(1, len(rotas))
+        self._heap = [(agora + periodo * i / n, next(self._seq), r) for i, r in enumerate(rotas)]
+        heapq.heapify(self._heap)
+
+    async def proxima(self):
+        while True:
+            due, _, rota = self._heap[0]
+            espera = due - time.monotonic()
+            if espera > 0:
+                await asyncio.sleep(espera)
+                continue
+            heapq.heapreplace(self._heap, (max(due + self.periodo, time.monotonic()), next(self._seq), rota))
+            return rota
+
+    def resultado(self, rota, net):
+        pass
+
+class StreamPipeline:
+    """Liga as etapas por filas limitadas (backpressure) e acumula os resultados da janela.
+
+    fetch_fn(rota) -> cotações ou None
+    eval_fn(rota, cotações) -> (registro, [aviso, ...]) ; registro é a tupla do collector
+    notify_fn(*aviso), com aviso = (kind, msg[, item, net])
+    """
+
+    def __init__(self, agenda, fetch_fn, eval_fn, notify_fn, fetchers=8, queue_size=64):
+        self.agenda = agenda
+        self.fetch_fn = fetch_fn
+        self.eval_fn = eval_fn
+        self.notify_fn = notify_fn
+        self.n_fetchers = fetchers
+        self.fila_rotas = asyncio.Queue(maxsize=queue_size)
+        self.fila_eval = asyncio.Queue(maxsize=queue_size)
+        self.fila_notif = asyncio.Queue()
+        self.janela = []
+        self.stats = {"agendadas": 0, "cotadas": 0, "falhas": 0, "avaliadas": 0, "erros": 0}
+
+    async def _agendador(self):
+        while True:
+            rota = await self.agenda.proxima()
+            await self.fila_rotas.put(rota)
+            self.stats["agendadas"] += 1
+
+    async def _fetcher(self):
+        while True:
+            rota = await self.fila_rotas.get()
+            try:
+                quotes = await self.fetch_fn(rota)
+                if quotes:
+                    self.stats["cotadas"] += 1
+                    await self.fila_eval.put((rota, quotes))
+                else:
+                    self.stats["falhas"] += 1
+                    self.agenda.resultado(rota, None)
+            except Exception as e:
+                self.stats["erros"] += 1
+                print(f"⚠️ [stream] erro ao cotar {rota}: {e.__class__.__name__}: {e}")
+            finally:
+                self.fila_rotas.task_done()
+
+    async def _avaliador(self):
+        while True:
+            rota, quotes = await self.fila_eval.get()
+            try:
+                registro, avisos = await self.eval_fn(rota, quotes)
+                self.stats["avaliadas"] += 1
+                if registro:
+                    self.janela.append(registro)
+                    self.agenda.resultado(rota, registro[0])
+                for aviso in avisos:
+                    self.fila_notif.put_nowait(aviso)
+            except Exception as e:
+                self.stats["erros"] += 1
+                print(f"⚠️ [stream] erro ao avaliar {rota}: {e.__class__.__name__}: {e}")
+            finally:
+                self.fila_eval.task_done()
+
+    async def _notificador(self):
+        while True:
+            aviso = await self.fila_notif.get()
+            try:
+                self.notify_fn(*aviso)
+            except Exception as e:
+                print(f"⚠️ [stream] erro ao notificar: {e.__class__.__name__}: {e}")
+            finally:
+                self.fila_notif.task_done()
+
+    def drenar_janela(self):
+        """Retorna e zera os registros avaliados desde a última chamada."""
+        janela, self.janela = self.janela, []
+        return janela
+
+    async def run(self):
+        tarefas = [asyncio.create_task(self._agendador()), asyncio.create_task(self._avaliador()), asyncio.create_task(self._notificador())]
+        tarefas += [asyncio.create_task(self._fetcher()) for _ in range(self.n_fetchers)]
+        try:
+            # as tarefas só terminam por exceção inesperada ou cancelamento
+            done, _ = await asyncio.wait(tarefas, return_when=asyncio.FIRST_EXCEPTION)
+            for t in done:
+                t.result()
+        finally:
+            for t in tarefas:
+                t.cancel()
+            await asyncio.gather(*tarefas, return_exceptions=True)
@@ -0,0 +1,96 @@
+# subscriptions.py — várias mesas (chats/webhooks) alimentadas pela mesma varredura
+# Cada assinatura tem seus filtros: chains, tokens, tipos de rota, faixa de tamanho e net
+# mínimo. Os filtros são compilados uma vez num índice por chain, ordenado pelo net mínimo,
+# e casar um aviso só percorre as assinaturas da chain cujo limiar ele já atingiu.
+#
+# SUBSCRIPTIONS_FILE aponta para um JSON com uma lista de assinaturas, ex.:
+#   [{"nome": "mesa-a", "telegram_chat_id": "-100123", "chains": [137], "tokens": ["USDC", "WETH"],
+#     "min_net": 0.3, "amount_min": 100, "amount_max": 1000, "tipos": ["TRI"]},
+#    {"nome": "quant", "webhook": "https://exemplo/hook", "min_net": 0.1}]
+import json
+
+from tokens_config import get_token_decimals, token_symbol
+
+_TIPOS = {"SIMPLES", "TRI"}
+
+class Assinatura:
+    __slots__ = ("nome", "chat_id", "webhook", "chains", "tokens", "tipos", "min_net", "amount_min", "amount_max")
+
+    def __init__(self, nome, chat_id=None, webhook=None, chains=None, tokens=None, tipos=None, min_net=0.0, amount_min=None, amount_max=None):
+        self.nome = nome
+        self.chat_id = chat_id
+        self.webhook = webhook
+        self.chains = frozenset(int(c) for c in chains) if chains else None
+        # símbolos (maiúsculos) e endereços (minúsculos) no mesmo conjunto
+        self.tokens = frozenset(t.lower() if t.lower().startswith("0x") else t.upper() for t in tokens) if tokens else None
+        self.tipos = frozenset(t.upper() for t in tipos) if tipos else None
+        self.min_net = float(min_net)
+        self.amount_min = amount_min
+        self.amount_max = amount_max
+
+    @property
+    def destino(self) -> str:
+        return f"assinatura:{self.nome}"
+
+def carregar_assinaturas(caminho: str):
+    with open(caminho, encoding="utf-8") as f:
+        dados = json.load(f)
+    out, nomes = [], set()
+    for i, d in enumerate(dados):
+        nome = str(d.get("nome") or f"assinatura-{i + 1}")
+        if nome in nomes:
+            raise ValueError(f"SUBSCRIPTIONS_FILE: nome repetido {nome!r}")
+        if not d.get("telegram_chat_id") and not d.get("webhook"):
+            raise ValueError(f"SUBSCRIPTIONS_FILE: {nome!r} sem telegram_chat_id nem webhook")
+        tipos = d.get("tipos")
+        if tipos and not {t.upper() for t in tipos} <= _TIPOS:
+            raise ValueError(f"SUBSCRIPTIONS_FILE: {nome!r} com tipo inválido {tipos} (use {sorted(_TIPOS)})")
+        nomes.add(nome)
+        out.append(Assinatura(
+            nome, d.get("telegram_chat_id"), d.get("webhook"), d.get("chains"), d.get("tokens"), tipos,
+            d.get("min_net", 0.0), d.get("amount_min"), d.get("amount_max"),
+        ))
+    return out
+
+class IndiceAssinaturas:
+
+    def __init__(self, assinaturas):
+        self.assinaturas = list(assinaturas)
+        por_chain, todas = {}, []
+        for a in self.assinaturas:
+            if a.chains is None:
+                todas.append(a)
+            else:
+                for c in a.chains:
+                    por_chain.setdefault(c, []).append(a)
+        chave = lambda a: a.min_net
+        self._todas = sorted(todas, key=chave)
+        self._por_chain = {c: sorted(lst + todas, key=chave) for c, lst in por_chain.items()}
+        self.min_net = min((a.min_net for a in self.assinaturas), default=None)
+
+    def casar(self, item, net, tipo):
+        """Assinaturas que querem o aviso item = (chain_id, rota, amount) com esse net."""
+        chain_id, rota, amount = item
+        simbolos = enderecos = tamanho = None
+        out = []
+        for a in self._por_chain.get(chain_id, self._todas):
+            if net < a.min_net:
+                break  # ordenadas por min_net: as seguintes também não querem
+            if a.tipos is not None and tipo not in a.tipos:
+                continue
+            if a.tokens is not None:
+                if simbolos is None:
+                    enderecos = [t.lower() for t in rota]
+                    simbolos = [token_symbol(t, chain_id) for t in rota]
+                if not all(e in a.tokens or s in a.tokens for e, s in zip(enderecos, simbolos)):
+                    continue
+            if a.amount_min is not None or a.amount_max is not None:
+                if tamanho is None:
+                    # tamanho em unidades do token base da rota
+                    tamanho = amount / (10 ** get_token_decimals(chain_id, rota[0]))
+                if a.amount_min is not None and tamanho < a.amount_min:
+                    continue
+                if a.amount_max is not None and tamanho > a.amount_max:
+                    continue
+            out.append(a)
+        return out
@@ -0,0 +1,136 @@
+# tape.py — gravação e reprodução do tráfego com os agregadores
+# TapeRecorder grava cada requisição de _fetch_json (método, URL, parâmetros, status, corpo,
+# latência) numa fita: um SQLite com o corpo comprimido (zlib) e um índice pelo pedido.
+# TapePlayer devolve essas respostas no lugar da rede, na ordem em que foram gravadas, para
+# rodar a mesma varredura offline (depuração, profiling, backtest).
+#
+# Cada chamada leva o número do ciclo em que foi feita (o bot atualiza `ciclo` a cada ciclo);
+# na reprodução, um pedido só recebe respostas do mesmo ciclo, então uma sequência de pedidos
+# um pouco diferente (outro recheck, outra triagem) não consome as respostas do ciclo seguinte.
+#
+#   TAPE_RECORD=/tmp/fita.db python arbitrage_bot.py     # grava
+#   TAPE_REPLAY=/tmp/fita.db python arbitrage_bot.py     # reproduz, sem rede
+#
+# Cabeçalhos não são gravados (levam as chaves de API).
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+
+from sqlite_writer import EscritorEmLotes, abrir_wal
+
+_ESQUEMA = (
+    "CREATE TABLE IF NOT EXISTS chamadas ("
+    " seq INTEGER PRIMARY KEY, t REAL NOT NULL, chave INTEGER NOT NULL, metodo TEXT NOT NULL, url TEXT NOT NULL,"
+    " pedido TEXT NOT NULL, status INTEGER, content_type TEXT, corpo BLOB, latencia REAL NOT NULL, erro TEXT,"
+    " ciclo INTEGER NOT NULL DEFAULT 0)",
+    "CREATE INDEX IF NOT EXISTS chamadas_chave ON chamadas (chave, seq)",
+)
+
+def _pedido(kwargs) -> str:
+    """Parâmetros que identificam o pedido (query string e corpo JSON), em forma canônica."""
+    return json.dumps({"params": kwargs.get("params"), "json": kwargs.get("json")}, sort_keys=True, separators=(",", ":"))
+
+def _chave(metodo: str, url: str, pedido: str) -> int:
+    h = hashlib.blake2b(f"{metodo} {url} {pedido}".encode(), digest_size=8).digest()
+    return int.from_bytes(h, "little", signed=True)
+
+def _abrir(caminho: str):
+    # fitas gravadas antes da coluna ciclo ganham a coluna
+    return abrir_wal(caminho, _ESQUEMA, [("chamadas", "ciclo", "INTEGER NOT NULL DEFAULT 0")], check_same_thread=False)
+
+class TapeRecorder(EscritorEmLotes):
+    """Lado da gravação. gravar() só enfileira; compressão e escrita ficam numa thread."""
+
+    reproduzindo = False
+    rotulo = "FITA"
+    descartes = "descartadas"
+
+    def __init__(self, caminho: str, lote: int = 200, max_fila: int = 50_000):
+        self.ciclo = 0
+        # ativo: a thread de gravação está de pé; falhas: chamadas que não puderam ser gravadas
+        self.stats = {"gravadas": 0, "descartadas": 0, "falhas": 0, "ativo": True}
+        super().__init__(caminho, lote, max_fila, "fita")
+
+    def gravar(self, metodo, url, kwargs, status, content_type, texto, latencia, erro=None):
+        self._enfileirar((time.time(), metodo, url, _pedido(kwargs), status, content_type, texto, latencia, erro, self.ciclo))
+
+    def _abrir(self):
+        return _abrir(self.caminho)
+
+    def _descrever(self, r):
+        return f"{r[1]} {r[2]}"
+
+    def _gravar(self, db, lote):
+        linhas = [
+            (t, _chave(metodo, url, pedido), metodo, url, pedido, status, ct,
+             zlib.compress(texto.encode(), 6) if texto is not None else None, latencia, erro, ciclo)
+            for t, metodo, url, pedido, status, ct, texto, latencia, erro, ciclo in lote
+        ]
+        db.execute("BEGIN")
+        db.executemany(
+            "INSERT INTO chamadas (t, chave, metodo, url, pedido, status, content_type, corpo, latencia, erro, ciclo)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", linhas,
+        )
+        db.execute("COMMIT")
+        self.stats["gravadas"] += len(lote)
+
+class TapePlayer:
+    """Lado da reprodução. Pedidos iguais do mesmo ciclo recebem as respostas na ordem
+    gravada; esgotadas, a última se repete. Fitas sem ciclo (ou pedidos fora de qualquer
+    ciclo gravado) usam a ordem da fita inteira. velocidade: 0 = o mais rápido possível;
+    1 = latência gravada; 2 = metade da latência gravada, e assim por diante.
+    """
+
+    reproduzindo = True
+
+    def __init__(self, caminho: str, velocidade: float = 0.0):
+        self.caminho = caminho
+        self.velocidade = velocidade
+        self.ciclo = 0
+        # horário gravado da última resposta servida (ver get_best_quote_async.relogio)
+        self.relogio = None
+        self._db = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, timeout=30, check_same_thread=False)
+        colunas = {c[1] for c in self._db.execute("PRAGMA table_info(chamadas)")}
+        sql_ciclo = "ciclo" if "ciclo" in colunas else "0"
+        self._indice = {}  # (ciclo, chave) -> [seq]; ciclo None = fita inteira
+        for chave, seq, ciclo in self._db.execute(f"SELECT chave, seq, {sql_ciclo} FROM chamadas ORDER BY seq"):
+            self._indice.setdefault((ciclo, chave), []).append(seq)
+            self._indice.setdefault((None, chave), []).append(seq)
+        self.ultimo_ciclo = max((c for c, _ in self._indice if c is not None), default=0)
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Volta a fita ao início (ex.: para rodar a mesma gravação com outros parâmetros)."""
+        self._posicao = dict.fromkeys(self._indice, 0)
+        self.relogio = None
+        self.stats = {"servidas": 0, "faltando": 0}
+
+    def __len__(self):
+        return sum(len(v) for (c, _), v in self._indice.items() if c is None)
+
+    async def reproduzir(self, metodo, url, kwargs):
+        """(status, content_type, texto) gravados para o pedido; sem gravação, LookupError."""
+        chave = _chave(metodo, url, _pedido(kwargs))
+        k = (self.ciclo, chave) if (self.ciclo, chave) in self._indice else (None, chave)
+        seqs = self._indice.get(k)
+        if not seqs:
+            self.stats["faltando"] += 1
+            raise LookupError(f"pedido não gravado na fita: {metodo} {url}")
+        i = min(self._posicao[k], len(seqs) - 1)
+        self._posicao[k] += 1
+        t, status, ct, corpo, latencia, erro = self._db.execute(
+            "SELECT t, status, content_type, corpo, latencia, erro FROM chamadas WHERE seq = ?", (seqs[i],)
+        ).fetchone()
+        if self.velocidade > 0:
+            await asyncio.sleep(latencia / self.velocidade)
+        self.relogio = t
+        self.stats["servidas"] += 1
+        if erro is not None:
+            raise ConnectionError(erro)
+        return status, ct or "", zlib.decompress(corpo).decode() if corpo is not None else ""
+
+    def fechar(self):
+        self._db.close()
@@ -1,11 +1,17 @@
 
+import asyncio
+import heapq
+import itertools
 import os
 import requests
 import json
+import time
 
-def send_telegram(text: str) -> bool:
+import aiohttp
+
+def send_telegram(text: str, chat_id=None) -> bool:
     token = os.environ.get("TELEGRAM_BOT_TOKEN")
-    chat_id = os.environ.get("TELEGRAM_CHAT_ID")
+    chat_id = chat_id or os.environ.get("TELEGRAM_CHAT_ID")
     if not token or not chat_id:
         print("⚠️ TELEGRAM_BOT_TOKEN/TELEGRAM_CHAT_ID não configurados no ambiente.")
         return False
@@ -22,3 +28,109 @@ def send_telegram(text: str) -> bool:
     except Exception as e:
         print("⚠️ Erro ao enviar Telegram:", e)
         return False
+
+# ------------- Envio assíncrono -------------
+# send_telegram bloqueia o event loop (requests, timeout 10 s). No bot, as mensagens vão para
+# uma fila com prioridade (alerta > resumo > heartbeat), esvaziada em segundo plano pela sessão
+# aiohttp do bot, respeitando o intervalo mínimo por chat e o retry_after dos 429.
+PRIORIDADES = {"alert": 0, "summary": 1, "heartbeat": 2}
+
+class TelegramQueue:
+
+    def __init__(self, session, token=None, chat_id=None, max_backlog=200, min_interval=1.0):
+        self.session = session
+        self.token = token or os.environ.get("TELEGRAM_BOT_TOKEN")
+        self.chat_id = chat_id or os.environ.get("TELEGRAM_CHAT_ID")
+        self.max_backlog = max_backlog
+        self.min_interval = min_interval
+        self._heap = []  # (prioridade, seq, chat_id, texto)
+        self._seq = itertools.count()
+        self._tem_msg = asyncio.Event()
+        self._livre_em = {}  # chat_id -> time.monotonic() em que pode receber de novo
+        self._enviando = False
+        self._avisou = False
+        self.stats = {"enviadas": 0, "falhas": 0, "descartadas": 0, "429": 0}
+
+    def enviar(self, texto: str, kind: str = "alert", chat_id=None) -> bool:
+        """Enfileira sem bloquear. False se não há configuração ou a mensagem foi descartada."""
+        if not self.token or not (chat_id or self.chat_id):
+            if not self._avisou:
+                print("⚠️ TELEGRAM_BOT_TOKEN/TELEGRAM_CHAT_ID não configurados no ambiente.")
+                self._avisou = True
+            return False
+        item = (PRIORIDADES.get(kind, 1), next(self._seq), chat_id or self.chat_id, str(texto)[:4096])
+        if len(self._heap) >= self.max_backlog:
+            # fila cheia: sai a mensagem de menor prioridade (a mais nova entre as de menor prioridade)
+            pior = max(self._heap)
+            if item[:2] > pior[:2]:
+                self.stats["descartadas"] += 1
+                return False
+            self._heap.remove(pior)
+            heapq.heapify(self._heap)
+            self.stats["descartadas"] += 1
+        heapq.heappush(self._heap, item)
+        self._tem_msg.set()
+        return True
+
+    async def _post(self, chat_id, texto):
+        """True se enviou; número = segundos a esperar (429); False em outra falha."""
+        try:
+            async with self.session.request(
+                "POST", f"https://api.telegram.org/bot{self.token}/sendMessage",
+                json={"chat_id": chat_id, "text": texto, "disable_web_page_preview": True},
+                timeout=aiohttp.ClientTimeout(total=10),
+            ) as resp:
+                data = await resp.json(content_type=None)
+                if data.get("ok"):
+                    return True
+                if resp.status == 429:
+                    return float((data.get("parameters") or {}).get("retry_after", 1))
+                print("⚠️ Falha ao enviar Telegram:", json.dumps(data))
+        except Exception as e:
+            print("⚠️ Erro ao enviar Telegram:", e)
+        return False
+
+    async def run(self):
+        while True:
+            if not self._heap:
+                self._tem_msg.clear()
+                await self._tem_msg.wait()
+                continue
+            # a mais urgente entre as de chats liberados: um chat em retry_after/intervalo mínimo
+            # não segura as mensagens dos outros
+            agora = time.monotonic()
+            prontas = [it for it in self._heap if self._livre_em.get(it[2], 0.0) <= agora]
+            if not prontas:
+                espera = min(self._livre_em.get(it[2], 0.0) for it in self._heap) - agora
+                # acorda antes se chegar algo mais urgente
+                self._tem_msg.clear()
+                try:
+                    await asyncio.wait_for(self._tem_msg.wait(), timeout=espera)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            item = min(prontas)
+            self._heap.remove(item)
+            heapq.heapify(self._heap)
+            chat_id = item[2]
+            self._enviando = True
+            try:
+                r = await self._post(item[2], item[3])
+            finally:
+                self._enviando = False
+            if r is True:
+                self.stats["enviadas"] += 1
+                self._livre_em[chat_id] = time.monotonic() + self.min_interval
+            elif r is False:
+                self.stats["falhas"] += 1
+                self._livre_em[chat_id] = time.monotonic() + self.min_interval
+            else:
+                self.stats["429"] += 1
+                self._livre_em[chat_id] = time.monotonic() + r
+                heapq.heappush(self._heap, item)
+
+    async def esvaziar(self, timeout: float):
+        """Espera a fila esvaziar (ex.: antes de encerrar), por no máximo timeout segundos."""
+        fim = time.monotonic() + timeout
+        while (self._heap or self._enviando) and time.monotonic() < fim:
+            await asyncio.sleep(0.1)
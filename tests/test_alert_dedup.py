@@ -0,0 +1,69 @@
+import pytest
+
+import alert_dedup
+from alert_dedup import AlertDeduplicator, chave_aviso
+
+class Relogio:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+@pytest.fixture
+def relogio(monkeypatch):
+    r = Relogio()
+    monkeypatch.setattr(alert_dedup.time, "monotonic", r)
+    return r
+
+@pytest.fixture
+def saidas():
+    return []
+
+@pytest.fixture
+def dedup(saidas):
+    return AlertDeduplicator(lambda kind, texto, avisos, destino: saidas.append((kind, destino, avisos)), janela=300.0, melhora=0.1)
+
+ITEM = (137, ("0xA", "0xB"), 100)
+
+def test_repeticao_dentro_da_janela_e_suprimida(relogio, dedup, saidas):
+    assert dedup.oferecer("log", "m1", ITEM, 0.5)
+    dedup.descarregar()
+    relogio.t += 10
+    # outro amount da mesma (chain, rota) conta como a mesma rota
+    assert not dedup.oferecer("log", "m2", (137, ("0xa", "0xb"), 250), 0.55)
+    assert dedup.oferecer("log", "m3", ITEM, 0.61)  # melhorou mais que `melhora`
+    dedup.descarregar()
+    assert [len(a) for _, _, a in saidas] == [1, 1]
+    assert dedup.stats == {"recebidos": 3, "suprimidos": 1, "mensagens": 2}
+
+def test_janela_expirada_libera_o_aviso(relogio, dedup, saidas):
+    dedup.oferecer("alert", "m", ITEM, 1.0)
+    dedup.descarregar()
+    relogio.t += 300
+    assert dedup.oferecer("alert", "m", ITEM, 1.0)
+
+def test_tipos_e_destinos_tem_janelas_proprias(relogio, dedup, saidas):
+    dedup.oferecer("log", "m", ITEM, 0.5)
+    dedup.oferecer("log", "m", ITEM, 0.5, destino="assinatura:mesa-a")
+    dedup.descarregar()
+    assert dedup.oferecer("alert", "m", ITEM, 0.5)
+    assert not dedup.oferecer("log", "m", ITEM, 0.5, destino="assinatura:mesa-a")
+    assert sorted(d or "" for _, d, _ in saidas) == ["", "assinatura:mesa-a"]
+
+def test_simultaneos_saem_numa_mensagem_com_o_melhor_net(relogio, dedup, saidas):
+    dedup.oferecer("log", "menor", ITEM, 0.3)
+    dedup.oferecer("log", "maior", (137, ("0xA", "0xB"), 250), 0.4)
+    dedup.oferecer("log", "outra", (137, ("0xA", "0xC"), 100), 0.2)
+    dedup.descarregar()
+    (_, _, avisos), = saidas
+    assert [(a[1], a[3]) for a in avisos] == [("maior", 2), ("outra", 1)]
+
+def test_chave_estavel_sem_item(relogio, dedup):
+    chave = ("CROSS", "WETH", 137, 42161)
+    assert dedup.oferecer("log", "CROSS WETH 3000→3010 gross 0.3%", net=0.1, chave=chave)
+    dedup.descarregar()
+    # preços mudaram no texto, mas a chave é a mesma
+    assert not dedup.oferecer("log", "CROSS WETH 3001→3011 gross 0.3%", net=0.1, chave=chave)
+    assert chave_aviso(None, "x gross 1%", chave) == chave
+    assert chave_aviso(ITEM, "x") == (137, ("0xa", "0xb"))
@@ -0,0 +1,44 @@
+import pytest
+
+from backtest import avaliar
+
+AJUSTE = {"fee_bps": 5.0, "log": 0.2, "alert": 0.6, "recheck": 0.0, "tol": 0.5, "sanity": 30.0}
+ROTA = (137, ("0xa", "0xb"))
+
+def _obs(ts, gross, g_conf, rota=ROTA, g_recheck=None, swaps=2, amount=100.0):
+    return (ts, rota, swaps, gross, amount, "USDC", g_recheck, g_conf)
+
+def test_metricas_de_alerta_confirmado_e_falso_positivo():
+    # net = gross - 0,1 (2 swaps de 5 bps)
+    obs = [
+        _obs(0, 0.9, 0.8),                                # alerta confirmado: net 0,7
+        _obs(1, 1.0, 0.05, rota=(137, ("0xa", "0xc"))),   # alerta falso: net confirmado -0,05
+        _obs(2, 0.4, None, rota=(137, ("0xa", "0xd"))),   # só aviso
+        _obs(3, 0.1, None, rota=(137, ("0xa", "0xe"))),   # abaixo dos limiares
+        _obs(4, 40.0, 40.0, rota=(137, ("0xa", "0xf"))),  # suspeito
+    ]
+    m = avaliar(AJUSTE, obs, janela=0)
+    assert (m["avisos"], m["alertas"], m["confirmados"], m["falsos"], m["suspeitos"]) == (3, 2, 2, 1, 1)
+    assert m["taxa_fp"] == 0.5
+    assert m["net_medio"] == pytest.approx((0.7 - 0.05) / 2)
+    assert m["lucro"]["USDC"] == pytest.approx(100 * (0.7 - 0.05) / 100)
+
+def test_recheck_descarta_quando_diverge():
+    ajuste = {**AJUSTE, "recheck": 0.5}
+    obs = [_obs(0, 0.9, 0.9, g_recheck=0.2), _obs(1000, 0.9, 0.9, g_recheck=0.8)]
+    m = avaliar(ajuste, obs)
+    assert (m["descartados_recheck"], m["alertas"]) == (1, 1)
+
+def test_oportunidade_que_dura_varios_ciclos_conta_uma_vez():
+    obs = [_obs(t, 0.9, 0.9) for t in (0, 30, 60, 90)]
+    m = avaliar(AJUSTE, obs, janela=300, melhora=0.1)
+    assert (m["alertas"], m["repetidos"], m["avisos"]) == (1, 3, 1)
+    assert m["lucro"]["USDC"] == pytest.approx(0.8)
+
+    # melhora acima do mínimo ou fim da janela: alerta de novo
+    obs += [_obs(120, 1.1, 1.1), _obs(500, 1.1, 1.1)]
+    m = avaliar(AJUSTE, obs, janela=300, melhora=0.1)
+    assert (m["alertas"], m["repetidos"]) == (3, 3)
+
+    # sem deduplicação, cada observação soma
+    assert avaliar(AJUSTE, obs, janela=0)["alertas"] == 6
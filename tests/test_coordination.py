@@ -0,0 +1,55 @@
+import pytest
+
+import coordination
+from coordination import Coordenador, SQLiteBackend, backend_from_url
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(coordination.time, "time", lambda: agora[0])
+    return agora
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteBackend(str(tmp_path / "coord.db"))
+
+def test_lease_expira_e_muda_de_dono(relogio, backend):
+    assert backend.adquirir("lider", "a", 30)
+    assert not backend.adquirir("lider", "b", 30)
+    relogio[0] += 20
+    assert backend.adquirir("lider", "a", 30)  # renovação
+    relogio[0] += 40
+    assert backend.donos("lid") == {}
+    assert backend.adquirir("lider", "b", 30)
+    assert not backend.adquirir("lider", "a", 30)
+    backend.liberar("lider", "a")  # só o dono libera
+    assert backend.donos("") == {"lider": "b"}
+
+def test_alerta_marcado_uma_vez_por_janela(relogio, backend):
+    a, b = Coordenador(backend, "a"), Coordenador(backend, "b")
+    assert a.primeiro_alerta("137:usdc,weth", 60)
+    assert not b.primeiro_alerta("137:usdc,weth", 60)
+    assert not a.primeiro_alerta("137:usdc,weth", 60)
+    assert b.primeiro_alerta("137:usdc,dai", 60)
+    relogio[0] += 61
+    assert b.primeiro_alerta("137:usdc,weth", 60)
+    assert (a.alertas_suprimidos, b.alertas_suprimidos) == (1, 1)
+
+def test_shards_divididos_e_reassumidos(relogio, backend):
+    a, b = Coordenador(backend, "a", n_shards=8, lease_ttl=30), Coordenador(backend, "b", n_shards=8, lease_ttl=30)
+    a.atualizar()
+    assert a.lider and a.meus_shards == set(range(8))
+    b.atualizar()
+    a.atualizar()  # vê a segunda instância e devolve o excedente
+    b.atualizar()
+    assert len(a.meus_shards) == len(b.meus_shards) == 4
+    assert not a.meus_shards & b.meus_shards
+    assert a.lider and not b.lider
+    # b para de renovar: os leases dele expiram e a assume tudo
+    relogio[0] += 31
+    a.atualizar()
+    assert a.meus_shards == set(range(8)) and a.membros == 1
+
+def test_backend_invalido():
+    with pytest.raises(ValueError):
+        backend_from_url("redis:")
@@ -0,0 +1,60 @@
+import time
+
+from history import HistoryStore, consultar
+
+def _registro(net, rota, amount, saida, ts, tipo="TRI"):
+    cam = list(rota) + [rota[0]]
+    pernas = [("0x", amount, amount * 2)] + [("KyberSwap", amount * 2, saida)] * (len(cam) - 2)
+    return (net, "msg", tipo, 137, amount, rota, pernas, ts)
+
+def test_historico_grava_e_consulta(tmp_path):
+    caminho = str(tmp_path / "hist.db")
+    agora = time.time()
+    grande = 10**24  # passa do INTEGER de 64 bits
+    h = HistoryStore(caminho)
+    h.registrar([
+        _registro(0.4, ("0xA", "0xB", "0xC"), grande, grande * 101 // 100, agora - 10),
+        _registro(-0.2, ("0xA", "0xB"), 1000, 999, agora - 5, "SIMPLES"),
+        # cross-chain: sem pernas cotadas, não entra
+        (1.0, "msg", "CROSS", 0, 0, ("USDC", 137, 1), None, agora),
+    ])
+    h.registrar([_registro(0.1, ("0xA", "0xB"), 500, 501, agora - 1, "SIMPLES")], fase="triagem")
+    h.fechar()
+    assert h.stats["gravados"] == 3 and h.stats["falhas"] == 0 and not h.stats["ativo"]
+
+    todas = consultar(caminho)
+    assert [r["tipo"] for r in todas] == ["TRI", "SIMPLES", "SIMPLES"]
+    tri = todas[0]
+    assert tri["rota"] == ["0xa", "0xb", "0xc"] and tri["amount"] == grande
+    assert tri["gross"] == 1.0
+    assert [(p["from"], p["to"]) for p in tri["pernas"]] == [("0xa", "0xb"), ("0xb", "0xc"), ("0xc", "0xa")]
+    assert tri["pernas"][-1]["amount_out"] == grande * 101 // 100
+
+    assert [r["fase"] for r in consultar(caminho, rota=("0xA", "0xB"))] == ["confirmacao", "triagem"]
+    assert len(consultar(caminho, fase="triagem", com_pernas=False)) == 1
+    assert len(consultar(caminho, desde=agora - 6)) == 2
+
+def test_registro_ruim_nao_derruba_o_lote(tmp_path):
+    caminho = str(tmp_path / "hist.db")
+    h = HistoryStore(caminho)
+    agora = time.time()
+    h.registrar([
+        _registro(0.1, ("0xA", "0xB"), 1000, 1001, agora, "SIMPLES"),
+        _registro(0.1, ("0xA", "0xC"), 0, 1, agora, "SIMPLES"),  # amount 0: gross impossível
+        _registro(0.1, ("0xA", "0xD"), 1000, 1002, agora, "SIMPLES"),
+    ])
+    h.fechar()
+    assert (h.stats["gravados"], h.stats["falhas"]) == (2, 1)
+    assert [r["rota"][1] for r in consultar(caminho)] == ["0xb", "0xd"]
+
+def test_retencao_apaga_o_que_passou(tmp_path):
+    caminho = str(tmp_path / "hist.db")
+    agora = time.time()
+    h = HistoryStore(caminho, retencao_dias=1)
+    h.registrar([
+        _registro(0.1, ("0xA", "0xB"), 1000, 1001, agora - 2 * 86400, "SIMPLES"),
+        _registro(0.1, ("0xA", "0xC"), 1000, 1001, agora, "SIMPLES"),
+    ])
+    h.fechar()
+    assert h.stats["apagados"] == 1
+    assert [r["rota"][1] for r in consultar(caminho)] == ["0xc"]
@@ -0,0 +1,39 @@
+import pytest
+
+from interval_controller import AdaptiveInterval
+
+def _controle(**kw):
+    return AdaptiveInterval(base=10.0, min_s=2.0, max_s=60.0, log_thr=0.5, **kw)
+
+def test_erro_alto_e_estavel_nao_prende_o_intervalo_no_maximo():
+    ctl = _controle()
+    # 60% de respostas não-200 em todo ciclo (fallbacks de versão, agregador sem chave...)
+    for _ in range(30):
+        ctl.atualizar([], chamadas=100, erros=60, n429=0)
+    assert ctl.motivo == "calmo"
+    assert ctl.intervalo == pytest.approx(10.0, abs=0.1)
+    assert ctl.erro_base == pytest.approx(0.6)
+
+def test_subida_da_taxa_de_erro_alonga():
+    ctl = _controle(max_error_rate=0.2)
+    for _ in range(10):
+        ctl.atualizar([], chamadas=100, erros=30, n429=0)
+    ctl.atualizar([], chamadas=100, erros=45, n429=0)  # +15 pp: dentro da folga
+    assert ctl.motivo == "calmo"
+    antes = ctl.intervalo
+    ctl.atualizar([], chamadas=100, erros=60, n429=0)  # ~+28 pp sobre a base
+    assert ctl.motivo.startswith("throttling")
+    assert ctl.intervalo == pytest.approx(antes * 1.5)
+
+def test_429_alonga_e_volatilidade_encurta():
+    ctl = _controle()
+    ctl.atualizar([], chamadas=10, erros=1, n429=1)
+    assert ctl.intervalo == pytest.approx(15.0)
+    rota = (137, ("usdc", "weth"))
+    ctl.atualizar([(0.0, "", "SIMPLES", 137, 100, rota[1], [], 0.0)], chamadas=10, erros=0, n429=0)
+    ctl.atualizar([(0.3, "", "SIMPLES", 137, 100, rota[1], [], 0.0)], chamadas=10, erros=0, n429=0)
+    assert ctl.motivo.startswith("volátil") and ctl.ultima_mudanca == pytest.approx(0.3)
+    # um ciclo sem chamadas não mexe na linha de base
+    base = ctl.erro_base
+    ctl.atualizar([], chamadas=0, erros=0, n429=0)
+    assert ctl.erro_base == base
@@ -0,0 +1,21 @@
+import pytest
+
+from notify_sinks import Sink, parse_rotas
+
+DESTINOS = ["stdout", "telegram", "jsonl"]
+
+def test_parse_rotas_so_traz_os_tipos_citados():
+    assert parse_rotas("alert: telegram, stdout ;summary:jsonl", DESTINOS) == {"alert": ["telegram", "stdout"], "summary": ["jsonl"]}
+
+def test_parse_rotas_tipo_vazio_silencia():
+    assert parse_rotas("log:;alert:", DESTINOS) == {"log": [], "alert": []}
+
+def test_parse_rotas_avisa_tipos_e_destinos_desconhecidos(capsys):
+    rotas = parse_rotas("alerta:telegram;alert:telegram,slack,webhook;sem-regra", DESTINOS)
+    assert rotas == {"alert": ["telegram"]}
+    saida = capsys.readouterr().out
+    assert "'alerta'" in saida and "'slack'" in saida and "'webhook'" in saida
+
+def test_sink_exige_enviar_lote():
+    with pytest.raises(TypeError):
+        Sink()
@@ -0,0 +1,29 @@
+import asyncio
+
+import prefetch
+from quote_cache import QuoteCache
+
+def test_pernas_levam_amount_e_agregadores_da_fase_que_le():
+    planos = {137: [("USDC", ["WETH"], [("WETH", "DAI"), ("DAI", "WETH")], [1000], ["0x"])],
+              1: [("USDC", ["WETH"], [], [5, 7], None)]}
+    pernas = prefetch.planejar_pernas(planos, {(1, ("USDC", "WETH")): 2.0}, 10)
+    # a rota quente vem primeiro; a primeira perna mais compartilhada (USDC→WETH em 137) em seguida
+    assert pernas[0][:2] == (1, "USDC")
+    assert (137, "USDC", "WETH", 1000, ["0x"]) in pernas
+    assert (137, "USDC", "DAI", 1000, ["0x"]) in pernas
+    assert {p for p in pernas if p[0] == 1} == {(1, "USDC", "WETH", 5, None), (1, "USDC", "WETH", 7, None)}
+
+def test_prefetch_grava_na_chave_da_fase(monkeypatch):
+    pedidos = []
+
+    async def cotar(session, a, b, amount, chain_id, aggregator_list=None, **kw):
+        pedidos.append(aggregator_list)
+        return {"aggregator": "0x", "toAmount": amount * 2}
+
+    monkeypatch.setattr(prefetch, "get_best_quote_async", cotar)
+    cache = QuoteCache(ttl=60)
+    n = asyncio.run(prefetch.prefetch_na_janela(None, cache, [(137, "USDC", "WETH", 1000, ["0x"])], 0.05))
+    assert n == 1 and pedidos == [["0x"]]
+    assert cache.get(cache.key(137, "usdc", "weth", 1000, ["0x"])) == {"aggregator": "0x", "toAmount": 2000}
+    # a confirmação (todos os agregadores) não lê a perna da triagem
+    assert cache.get(cache.key(137, "usdc", "weth", 1000)) is None
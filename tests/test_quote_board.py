@@ -0,0 +1,66 @@
+import os
+import uuid
+from multiprocessing import shared_memory
+
+import pytest
+
+import quote_board
+from quote_board import QuoteBoard, QuoteBoardReader
+
+A = "0x" + "aa" * 20
+B = "0x" + "bb" * 20
+
+@pytest.fixture
+def quadro():
+    q = QuoteBoard(f"qb-teste-{os.getpid()}-{uuid.uuid4().hex[:8]}", n_slots=8)
+    leitor = QuoteBoardReader(q.nome)
+    yield q, leitor
+    leitor.fechar()
+    q.fechar()
+
+def test_escreve_e_le_a_ultima_cotacao(quadro):
+    q, leitor = quadro
+    assert leitor.ler(137, A, B) is None
+    q.publicar(137, A, B, 1000, 2000, "0x")
+    q.publicar(137, A.upper().replace("0X", "0x"), B, 1000, 2100, "KyberSwap")
+    r = leitor.ler(137, A, B)
+    assert (r["amount_out"], r["rate"], r["aggregator"]) == (2100.0, 2.1, "KyberSwap")
+    assert (r["from"], r["to"]) == (A, B)
+    assert leitor.ler(1, A, B) is None and leitor.ler(137, B, A) is None
+    assert leitor.escritas() == 2
+
+def test_leitor_recusa_slot_no_meio_da_escrita(quadro):
+    q, leitor = quadro
+    q.publicar(137, A, B, 1000, 2000, "0x")
+    off = quote_board._offset(q._slot_para(quote_board._hash_perna(137, A, B)))
+    seq = quote_board._SEQ.unpack_from(q.buf, off)[0]
+    assert seq % 2 == 0
+    quote_board._SEQ.pack_into(q.buf, off, seq + 1)  # escritor "parado" no meio
+    assert leitor.ler(137, A, B) is None
+    assert leitor.snapshot() == []
+    quote_board._SEQ.pack_into(q.buf, off, seq + 2)
+    assert leitor.ler(137, A, B)["amount_out"] == 2000.0
+
+def test_quadro_cheio_substitui_a_mais_antiga(quadro, monkeypatch):
+    q, leitor = quadro
+    agora = [1000.0]
+    monkeypatch.setattr(quote_board.time, "time", lambda: agora[0])
+    tokens = ["0x" + f"{i:02x}" * 20 for i in range(9)]
+    for t in tokens:
+        agora[0] += 1
+        q.publicar(137, A, t, 1, 1)
+    # 8 slots, sondagem cobre todos: a nona perna ocupou o lugar da primeira
+    assert leitor.ler(137, A, tokens[0]) is None
+    assert leitor.ler(137, A, tokens[8]) is not None
+    assert len(leitor.snapshot()) == 8
+    assert len(leitor.snapshot(max_age=2.5)) == 3
+
+def test_bloco_incompativel():
+    nome = f"qb-teste-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    shm = shared_memory.SharedMemory(name=nome, create=True, size=64)
+    try:
+        with pytest.raises(ValueError):
+            QuoteBoardReader(nome)
+    finally:
+        shm.close()
+        shm.unlink()
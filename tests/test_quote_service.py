@@ -0,0 +1,59 @@
+import asyncio
+
+import aiohttp
+from aiohttp.test_utils import TestServer
+
+import get_best_quote_async as g
+from quote_service import QuoteService
+
+CHAIN = 999
+
+def test_servico_devolve_o_resultado_de_cada_agregador(monkeypatch):
+    async def rapido(session, chain_id, a, b, amount):
+        return 200
+
+    async def fora(session, chain_id, a, b, amount):
+        g._contar("http_calls")
+        g._contar("http_errors")
+        g._contar("http_429")
+        return None
+
+    monkeypatch.setattr(g, "_quote_0x", rapido)
+    monkeypatch.setattr(g, "_quote_kyber", fora)
+    monkeypatch.setattr(g, "_AGG_STATS", {})
+    pedido = {"chain_id": CHAIN, "from": "0xa", "to": "0xb", "amount": "100", "aggregators": ["0x", "KyberSwap"], "attempts": 1}
+
+    async def cenario():
+        async with TestServer(QuoteService(ttl=60).app()) as srv:
+            async with aiohttp.ClientSession() as session:
+                respostas = []
+                for _ in range(2):
+                    async with session.post(srv.make_url("/quote"), json=pedido) as resp:
+                        respostas.append(await resp.json())
+        return respostas
+
+    primeira, do_cache = asyncio.run(cenario())
+    assert (primeira["aggregator"], primeira["toAmount"]) == ("0x", 200)
+    assert sorted((nome, ok) for nome, ok, _ in primeira["agregadores"]) == [("0x", True), ("KyberSwap", False)]
+    assert primeira["http"] == {"http_calls": 1, "http_errors": 1, "http_429": 1}
+    # veio do cache do serviço: nenhuma requisição nova a relatar
+    assert do_cache["toAmount"] == 200
+    assert do_cache["agregadores"] == [] and do_cache["http"]["http_calls"] == 0
+
+def test_cliente_registra_o_que_o_servico_observou(monkeypatch):
+    async def servico(session, method, url, name, **kwargs):
+        return {"aggregator": None, "toAmount": None,
+                "agregadores": [["0x", True, 0.2], ["KyberSwap", False, 0.01]],
+                "http": {"http_calls": 2, "http_errors": 1, "http_429": 1}}
+
+    monkeypatch.setattr(g, "_fetch_json", servico)
+    monkeypatch.setattr(g, "_AGG_STATS", {})
+    antes = g.http_stats()
+    q = asyncio.run(g._quote_via_service(None, "http://svc", "0xa", "0xb", 100, CHAIN, None, 1))
+    depois = g.http_stats()
+
+    assert q is None
+    assert g._AGG_STATS[(CHAIN, "0x")] == {"ok": 1, "fail": 0, "lat": 0.2}
+    assert g._AGG_STATS[(CHAIN, "KyberSwap")] == {"ok": 0, "fail": 1, "lat": None}
+    assert g.fastest_reliable_aggregator(CHAIN, ["KyberSwap", "0x"]) == "0x"
+    assert {k: depois[k] - antes[k] for k in depois} == {"http_calls": 2, "http_errors": 1, "http_429": 1}
@@ -0,0 +1,41 @@
+import random
+
+from sampling import AmostragemRotas, _estrato
+
+CHAVES = [(137, ("usdc", f"t{i}", f"t{j}")) for i in range(20) for j in range(20) if i != j]
+
+def test_toda_rota_sai_em_no_maximo_max_janelas():
+    amostra = AmostragemRotas(max_janelas=8, fracao=0.1, rng=random.Random(1))
+    vistas = set()
+    for _ in range(8):
+        escolhidas, _ = amostra.amostrar(137, CHAVES)
+        vistas |= escolhidas
+    assert vistas == set(CHAVES)
+
+def test_tamanho_da_janela_segue_a_fracao():
+    amostra = AmostragemRotas(max_janelas=10, fracao=0.25, rng=random.Random(2))
+    for _ in range(10):
+        escolhidas, n_estrato = amostra.amostrar(137, CHAVES)
+        assert len(escolhidas) == max(n_estrato, round(len(CHAVES) * 0.25))
+
+def test_grupos_tem_janelas_independentes():
+    amostra = AmostragemRotas(max_janelas=4, fracao=0.25, rng=random.Random(3))
+    estrato = lambda n: {k for k in CHAVES if _estrato(k, 4) == n}
+    amostra.amostrar(137, CHAVES)
+    _, n = amostra.amostrar(137, CHAVES)
+    assert n == len(estrato(1))
+    # a chain 1 começa na própria primeira janela, não na da 137
+    escolhidas, n = amostra.amostrar(1, CHAVES)
+    assert estrato(0) <= escolhidas and n == len(estrato(0))
+
+def test_net_positivo_e_sorteado_mais_vezes():
+    quentes = set(CHAVES[:20])
+    net = lambda k: 1.0 if k in quentes else -0.5
+    amostra = AmostragemRotas(max_janelas=50, fracao=0.1, rng=random.Random(4))
+    n_quentes = n_frias = 0
+    for _ in range(50):
+        escolhidas, _ = amostra.amostrar(137, CHAVES, net)
+        n_quentes += len(escolhidas & quentes)
+        n_frias += len(escolhidas - quentes)
+    # por rota: as quentes (peso 11) aparecem bem mais que as frias (peso 1)
+    assert n_quentes / len(quentes) > 3 * n_frias / (len(CHAVES) - len(quentes))
@@ -0,0 +1,32 @@
+from itertools import permutations
+
+from scan_plan import _canon_ciclo, build_scan_plan
+
+def _ciclos(plano):
+    simples = [frozenset((b.lower(), x.lower())) for b, ss, _ in plano for x in ss]
+    tri = [_canon_ciclo((b, x, y)) for b, _, ts in plano for x, y in ts]
+    return simples, tri
+
+def test_rotacao_canonica_preserva_o_sentido():
+    assert _canon_ciclo(("C", "a", "B")) == _canon_ciclo(("a", "B", "C")) == ("a", "b", "c")
+    assert _canon_ciclo(("a", "C", "B")) == ("a", "c", "b")
+
+def test_ciclo_fica_com_uma_base_so():
+    plano = build_scan_plan(["USDC", "WETH"], ["WETH", "DAI", "LINK"])
+    simples, tri = _ciclos(plano)
+    assert len(simples) == len(set(simples))
+    assert len(tri) == len(set(tri))
+    # 4 tokens distintos: 5 pares com alguma base (DAI/LINK não tem) e 4·3·2/3 = 8 triângulos
+    # dirigidos, todos passando por uma base, cada um uma vez
+    assert len(simples) == 5 and len(tri) == 8
+    # a segunda base só fica com o que não passa pela primeira
+    base, simples_weth, tri_weth = plano[1]
+    assert base == "WETH"
+    assert [x.lower() for x in simples_weth] == ["dai", "link"]
+    assert all("USDC" not in par for par in tri_weth)
+
+def test_sem_repetir_nem_perder_ciclos_com_uma_base():
+    tokens = ["A", "B", "C", "D"]
+    (base, simples, tri), = build_scan_plan(["A"], tokens)
+    assert simples == ["B", "C", "D"]
+    assert sorted(tri) == sorted(permutations(["B", "C", "D"], 2))
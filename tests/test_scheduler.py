@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+import scheduler
+from scheduler import AgendaPrioridade, RequestBudget
+
+class Relogio:
+    def __init__(self):
+        self.t = 1000.0
+        self.dormiu = []
+
+    def monotonic(self):
+        return self.t
+
+    async def sleep(self, s):
+        self.dormiu.append(s)
+        self.t += s
+
+@pytest.fixture
+def relogio(monkeypatch):
+    r = Relogio()
+    monkeypatch.setattr(scheduler.time, "monotonic", r.monotonic)
+    monkeypatch.setattr(scheduler.asyncio, "sleep", r.sleep)
+    return r
+
+def test_vencidos_saem_por_prioridade(relogio):
+    itens = ["frio", "morno", "quente"]
+    agenda = AgendaPrioridade(itens, alert_thr=1.0, min_period=0.0, max_period=60.0)
+    for item, net in (("frio", -2.0), ("morno", 0.5), ("quente", 0.95)):
+        agenda.resultado(item, net)
+
+    async def ordem():
+        return [await agenda.proxima() for _ in itens]
+
+    assert asyncio.run(ordem()) == ["quente", "morno", "frio"]
+    # quanto mais perto do alerta, menor o período de revarredura
+    assert agenda.periodo("quente") < agenda.periodo("morno") < agenda.periodo("frio") <= 60.0
+
+def test_orcamento_segura_quando_as_fichas_acabam(relogio):
+    budget = RequestBudget(60)  # 1 ficha/s, rajada de 10
+    asyncio.run(budget.consumir(10))
+    assert relogio.dormiu == []
+    asyncio.run(budget.consumir(3))
+    assert sum(relogio.dormiu) == pytest.approx(3.0)
+    # pedido maior que o balde espera só até encher
+    relogio.dormiu.clear()
+    asyncio.run(budget.consumir(50))
+    assert sum(relogio.dormiu) == pytest.approx(10.0)
+
+def test_custo_de_cada_item_sai_do_orcamento(relogio):
+    custos = {"caro": 8, "barato": 1}
+    agenda = AgendaPrioridade(["caro", "barato"], alert_thr=1.0, min_period=0.0, max_period=60.0,
+                              budget_por_minuto=60, custo_fn=custos.get)
+    agenda.resultado("barato", -5.0)
+
+    async def duas():
+        primeiro = await agenda.proxima()
+        agenda.resultado(primeiro, -5.0)
+        return [primeiro, await agenda.proxima()]
+
+    # "caro" (nunca avaliado, prioridade máxima) sai primeiro e gasta 8 das 10 fichas
+    assert asyncio.run(duas()) == ["caro", "barato"]
+    assert relogio.dormiu == []
+    assert agenda.budget.fichas == pytest.approx(1.0)
@@ -0,0 +1,71 @@
+import sharding
+from sharding import HashRing, ShardPool, chave_rota
+
+CHAVES = [chave_rota(137, ("0xUSDC", f"0x{i:04x}", f"0x{j:04x}")) for i in range(40) for j in range(25)]
+
+def test_anel_e_deterministico():
+    a, b = HashRing(8), HashRing(8)
+    assert [a.shard(k) for k in CHAVES] == [b.shard(k) for k in CHAVES]
+    assert chave_rota(137, ("0xAB", "0xCd")) == chave_rota(137, ("0xab", "0xcd"))
+
+def test_anel_distribui_entre_todos_os_shards():
+    anel = HashRing(4)
+    contagem = [0] * 4
+    for k in CHAVES:
+        contagem[anel.shard(k)] += 1
+    # 64 nós virtuais por shard: nenhum fica com menos da metade da fatia justa
+    assert min(contagem) > len(CHAVES) / 4 / 2
+
+def test_novo_shard_move_poucas_rotas():
+    antes, depois = HashRing(4), HashRing(5)
+    movidas = [k for k in CHAVES if antes.shard(k) != depois.shard(k)]
+    # só as que vão para o shard novo mudam de lugar (~1/5)
+    assert all(depois.shard(k) == 4 for k in movidas)
+    assert len(movidas) < 0.35 * len(CHAVES)
+
+class _Processo:
+    def __init__(self):
+        self.vivo, self.exitcode = True, None
+
+    def is_alive(self):
+        return self.vivo
+
+    def morrer(self, codigo=1):
+        self.vivo, self.exitcode = False, codigo
+
+def test_reinicio_com_backoff_e_desistencia(monkeypatch):
+    agora = [100.0]
+    monkeypatch.setattr(sharding.time, "monotonic", lambda: agora[0])
+    pool = ShardPool(None, 2, metodo="fork", backoff_base=1.0, backoff_max=4.0, max_reinicios=3, estavel=60.0)
+
+    def novo(indice):
+        pool.procs[indice] = _Processo()
+        pool._inicio[indice] = agora[0]
+
+    monkeypatch.setattr(pool, "_novo", novo)
+    pool.iniciar()
+
+    esperas = []
+    for _ in range(3):
+        pool.procs[0].morrer()
+        (i, codigo, espera), = pool.verificar()
+        esperas.append(espera)
+        assert pool.verificar() == [] and not pool.procs[0].is_alive()
+        agora[0] += espera
+        pool.verificar()
+        assert pool.procs[0].is_alive()
+    assert esperas == [1.0, 2.0, 4.0]
+    # quarta falha seguida: desiste do shard; o outro segue de pé
+    pool.procs[0].morrer(9)
+    assert pool.verificar() == [(0, 9, None)]
+    agora[0] += 1000
+    assert pool.verificar() == [] and pool.desistidos == {0} and pool.reinicios == 3
+
+    # shard que ficou de pé mais que `estavel` recomeça a contagem
+    pool.procs[1].morrer()
+    assert pool.verificar() == [(1, 1, 1.0)]
+    agora[0] += 1
+    pool.verificar()
+    agora[0] += 61
+    pool.procs[1].morrer()
+    assert pool.verificar() == [(1, 1, 1.0)]
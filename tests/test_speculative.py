@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+import arbitrage_rotas_3_swaps_async as tri
+import quote_cache
+
+CHAIN = 137
+TAXAS = {("a", "b"): 2.0, ("b", "c"): 3.0, ("c", "a"): 0.2}
+
+@pytest.fixture
+def cotacoes(monkeypatch):
+    pedidos = []
+
+    async def cotar(session, de, para, amount, chain_id, **kw):
+        pedidos.append((de, para, amount))
+        return {"aggregator": "0x", "toAmount": int(amount * TAXAS[(de, para)])}
+
+    monkeypatch.setattr(tri, "get_best_quote_async", cotar)
+    monkeypatch.setattr(quote_cache, "_RATES", {})
+    monkeypatch.setattr(tri, "_SPEC_STATS", {"rotas": 0, "recotadas": 0, "fallback": 0})
+    return pedidos
+
+def _especulativo(tol=0.5):
+    return asyncio.run(tri._cotar_triangulo_especulativo(None, "a", "b", "c", 1000, CHAIN, tol))
+
+def test_reescalar_ajusta_a_saida_na_proporcao_da_entrada():
+    q = {"aggregator": "0x", "toAmount": 600}
+    assert tri._reescalar(q, 202, 200) == {"aggregator": "0x", "toAmount": 606}
+    assert q["toAmount"] == 600
+
+def test_sem_taxa_em_cache_cai_no_sequencial(cotacoes):
+    pernas = _especulativo()
+    assert [q["toAmount"] for q in pernas] == [2000, 6000, 1200]
+    assert cotacoes == [("a", "b", 1000), ("b", "c", 2000), ("c", "a", 6000)]
+    assert tri._SPEC_STATS == {"rotas": 0, "recotadas": 0, "fallback": 1}
+
+def test_previsao_dentro_da_tolerancia_reescala_sem_recotar(cotacoes):
+    # taxa A→B em cache 0,2% abaixo da real: as pernas seguintes saem com entrada prevista menor
+    quote_cache.record_rate(CHAIN, "a", "b", 1000, 1996)
+    quote_cache.record_rate(CHAIN, "b", "c", 1000, 3000)
+    pernas = _especulativo()
+    assert [p[:2] for p in cotacoes] == [("a", "b"), ("b", "c"), ("c", "a")]
+    assert cotacoes[1][2] == 1996
+    assert pernas[1]["toAmount"] == int(5988 * 2000 / 1996)
+    assert tri._SPEC_STATS == {"rotas": 1, "recotadas": 0, "fallback": 0}
+
+def test_previsao_fora_da_tolerancia_recota_a_perna(cotacoes):
+    quote_cache.record_rate(CHAIN, "a", "b", 1000, 1900)  # 5% abaixo
+    quote_cache.record_rate(CHAIN, "b", "c", 1000, 3000)
+    pernas = _especulativo(tol=0.5)
+    assert [q["toAmount"] for q in pernas] == [2000, 6000, 1200]
+    # as duas pernas seguintes são recotadas com a entrada real
+    assert cotacoes[3:] == [("b", "c", 2000), ("c", "a", 6000)]
+    assert tri._SPEC_STATS["recotadas"] == 2
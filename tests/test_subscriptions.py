@@ -0,0 +1,44 @@
+import subscriptions
+from subscriptions import Assinatura, IndiceAssinaturas
+from tokens_config import TOKENS_BY_CHAIN
+
+T = TOKENS_BY_CHAIN[137]
+USDC, WETH, WBTC, DAI = T["USDC"], T["WETH"], T["WBTC"], T["DAI"]
+
+def _nomes(subs):
+    return [a.nome for a in subs]
+
+def test_casar_filtra_chain_tipo_tokens_e_tamanho():
+    idx = IndiceAssinaturas([
+        Assinatura("polygon-tri", chat_id="1", chains=[137], tipos=["TRI"]),
+        Assinatura("arbitrum", chat_id="2", chains=[42161]),
+        Assinatura("usdc-weth", chat_id="3", tokens=["USDC", "weth"]),
+        Assinatura("pequeno", chat_id="4", amount_max=120),
+        Assinatura("por-endereco", chat_id="5", tokens=[USDC, WBTC, DAI]),
+    ])
+    simples = (137, (USDC, WETH), 100 * 10**6)
+    assert _nomes(idx.casar(simples, 1.0, "SIMPLES")) == ["usdc-weth", "pequeno"]
+
+    tri = (137, (USDC, WBTC, DAI), 250 * 10**6)
+    assert sorted(_nomes(idx.casar(tri, 1.0, "TRI"))) == ["polygon-tri", "por-endereco"]
+
+    # chain sem assinatura própria: só as que valem para todas as chains
+    outra = (10, ("0xaaa", "0xbbb"), 10**6)
+    assert _nomes(idx.casar(outra, 1.0, "SIMPLES")) == ["pequeno"]
+
+def test_casar_respeita_min_net_e_para_cedo(monkeypatch):
+    idx = IndiceAssinaturas([
+        Assinatura("alta", chat_id="1", min_net=0.8, tokens=["USDC", "WETH"]),
+        Assinatura("baixa", chat_id="2", min_net=0.1, tokens=["USDC", "WETH"]),
+        Assinatura("media", chat_id="3", min_net=0.4, tokens=["USDC", "WETH"]),
+    ])
+    assert idx.min_net == 0.1
+    item = (137, (USDC, WETH), 10**8)
+    assert _nomes(idx.casar(item, 0.5, "SIMPLES")) == ["baixa", "media"]
+
+    # abaixo do menor min_net, nenhuma assinatura é examinada (nem os símbolos são resolvidos)
+    chamadas = []
+    original = subscriptions.token_symbol
+    monkeypatch.setattr(subscriptions, "token_symbol", lambda *a: chamadas.append(a) or original(*a))
+    assert idx.casar(item, 0.05, "SIMPLES") == []
+    assert chamadas == []
@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+import arbitrage_rotas_3_swaps_async as tri
+import quote_cache
+
+CHAIN = 137
+TAXAS = {("a", "b"): 2.0, ("b", "a"): 0.49, ("b", "c"): 3.0, ("c", "b"): 0.33, ("c", "a"): 0.2, ("a", "c"): 4.9}
+
+@pytest.fixture(autouse=True)
+def taxas(monkeypatch):
+    monkeypatch.setattr(quote_cache, "_RATES", {})
+    for (de, para), taxa in TAXAS.items():
+        quote_cache.record_rate(CHAIN, de, para, 10**6, int(10**6 * taxa))
+
+def test_reverso_estimado_pelo_quadro_de_spreads():
+    ida = TAXAS[("a", "b")] * TAXAS[("b", "c")] * TAXAS[("c", "a")]
+    volta = TAXAS[("a", "c")] * TAXAS[("c", "b")] * TAXAS[("b", "a")]
+    assert tri._estimar_reverso(CHAIN, "A", "B", "C", ida) == pytest.approx(volta)
+
+def test_sem_estimativa_com_taxa_ausente_ou_velha():
+    ida = 1.2
+    del quote_cache._RATES[(CHAIN, "c", "b")]
+    assert tri._estimar_reverso(CHAIN, "a", "b", "c", ida) is None
+    quote_cache.record_rate(CHAIN, "c", "b", 100, 33)
+    taxa, _ = quote_cache._RATES[(CHAIN, "b", "a")]
+    quote_cache._RATES[(CHAIN, "b", "a")] = (taxa, time.time() - 600)
+    assert tri._estimar_reverso(CHAIN, "a", "b", "c", ida) is not None
+    assert tri._estimar_reverso(CHAIN, "a", "b", "c", ida, max_age=300) is None
+    assert tri._estimar_reverso(CHAIN, "a", "b", "c", 0) is None
+
+def test_agrupa_as_duas_direcoes_do_triangulo():
+    pares = [("B", "C"), ("D", "B"), ("c", "b"), ("B", "D"), ("C", "D")]
+    assert tri._agrupar_simetricos(pares) == [[("B", "C"), ("c", "b")], [("D", "B"), ("B", "D")], [("C", "D")]]
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from tape import TapePlayer, TapeRecorder
+
+URL = "https://api.exemplo/quote"
+
+def _gravar_fita(caminho):
+    fita = TapeRecorder(str(caminho))
+    fita.ciclo = 1
+    fita.gravar("GET", URL, {"params": {"a": 1}}, 200, "application/json", '{"x": 1}', 0.01)
+    fita.gravar("GET", URL, {"params": {"a": 1}}, 200, "application/json", '{"x": 2}', 0.01)
+    fita.ciclo = 2
+    fita.gravar("GET", URL, {"params": {"a": 1}}, 200, "application/json", '{"x": 3}', 0.01)
+    fita.gravar("POST", URL, {"json": {"b": 2}}, None, None, None, 0.5, "TimeoutError: ")
+    fita.fechar()
+    return fita
+
+def test_fita_grava_e_reproduz_por_ciclo(tmp_path):
+    fita = _gravar_fita(tmp_path / "fita.db")
+    assert fita.stats == {"gravadas": 4, "descartadas": 0, "falhas": 0, "ativo": False}
+
+    player = TapePlayer(str(tmp_path / "fita.db"))
+    assert len(player) == 4 and player.ultimo_ciclo == 2
+
+    def pedir(ciclo):
+        player.ciclo = ciclo
+        return asyncio.run(player.reproduzir("GET", URL, {"params": {"a": 1}, "headers": {"k": "segredo"}}))[2]
+
+    # no ciclo 1, as respostas do ciclo 1 em ordem; esgotadas, a última se repete
+    assert [pedir(1) for _ in range(3)] == ['{"x": 1}', '{"x": 2}', '{"x": 2}']
+    assert pedir(2) == '{"x": 3}'
+    # ciclo sem gravação: ordem da fita inteira
+    assert pedir(7) == '{"x": 1}'
+    assert player.relogio is not None
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(player.reproduzir("POST", URL, {"json": {"b": 2}}))
+    with pytest.raises(LookupError):
+        asyncio.run(player.reproduzir("GET", URL, {"params": {"a": 9}}))
+    assert player.stats == {"servidas": 6, "faltando": 1}
+
+    player.reiniciar()
+    assert pedir(1) == '{"x": 1}'
+    player.fechar()
+
+def test_gravacao_com_thread_parada_descarta(tmp_path):
+    fita = _gravar_fita(tmp_path / "fita.db")
+    fita.gravar("GET", URL, {}, 200, "application/json", "{}", 0.01)
+    assert fita.stats["descartadas"] == 1
@@ -0,0 +1,50 @@
+import asyncio
+
+from telegram_notify import TelegramQueue
+
+def test_chat_em_retry_after_nao_segura_os_outros():
+    async def cenario():
+        fila = TelegramQueue(None, token="t", chat_id="A", min_interval=0.0)
+        enviadas = []
+
+        async def post(chat_id, texto):
+            if chat_id == "A":
+                return 30.0  # 429: retry_after de 30 s
+            enviadas.append((chat_id, texto))
+            return True
+
+        fila._post = post
+        fila.enviar("alerta", "alert", chat_id="A")
+        tarefa = asyncio.create_task(fila.run())
+        await asyncio.sleep(0.05)
+        # A está em retry_after; um heartbeat para B tem que sair mesmo assim
+        fila.enviar("heartbeat", "heartbeat", chat_id="B")
+        await asyncio.sleep(0.1)
+        tarefa.cancel()
+        return fila, enviadas
+
+    fila, enviadas = asyncio.run(cenario())
+    assert enviadas == [("B", "heartbeat")]
+    assert fila.stats["429"] == 1
+    # a mensagem de A continua na fila para depois do retry_after
+    assert [it[2] for it in fila._heap] == ["A"]
+
+def test_prioridade_entre_chats_liberados():
+    async def cenario():
+        fila = TelegramQueue(None, token="t", chat_id="A", min_interval=0.0)
+        enviadas = []
+
+        async def post(chat_id, texto):
+            enviadas.append(texto)
+            return True
+
+        fila._post = post
+        fila.enviar("hb", "heartbeat", chat_id="B")
+        fila.enviar("resumo", "summary", chat_id="A")
+        fila.enviar("alerta", "alert", chat_id="B")
+        tarefa = asyncio.create_task(fila.run())
+        await asyncio.sleep(0.05)
+        tarefa.cancel()
+        return enviadas
+
+    assert asyncio.run(cenario()) == ["alerta", "resumo", "hb"]
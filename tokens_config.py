@@ -99,10 +99,46 @@ def get_base_token_for_chain(chain_id: int):
         return v
     return BASE_TOKEN_BY_CHAIN.get(chain_id)
 
+def get_base_tokens_for_chain(chain_id: int):
+    """Tokens base da chain (BASE_TOKENS_<chain>: símbolos ou endereços, separados por vírgula).
+    Sem override, apenas o token base de get_base_token_for_chain().
+    """
+    v = os.getenv(f"BASE_TOKENS_{chain_id}", "")
+    m = TOKENS_BY_CHAIN.get(chain_id, {})
+    out = []
+    for x in v.split(","):
+        x = x.strip()
+        if not x:
+            continue
+        addr = x if (x.lower().startswith("0x") and len(x) == 42) else m.get(x.upper())
+        if addr and addr.lower() not in {a.lower() for a in out}:
+            out.append(addr)
+    if out:
+        return out
+    base = get_base_token_for_chain(chain_id)
+    return [base] if base else []
+
 def get_token_decimals(chain_id: int, addr: str) -> int:
     """Retorna os decimais do token (fallback 18)."""
     return DECIMALS_BY_CHAIN.get(chain_id, {}).get((addr or '').lower(), 18)
 
+# Nome legível de cada chain (mensagens e logs)
+CHAIN_NAMES = {
+    1: "Ethereum",
+    10: "Optimism",
+    56: "BNB Smart Chain",
+    100: "Gnosis",
+    137: "Polygon",
+    250: "Fantom",
+    42161: "Arbitrum",
+    43114: "Avalanche",
+    8453: "Base",
+}
+
+def chain_name(chain_id: int) -> str:
+    """Nome da chain, ou o próprio id se desconhecida."""
+    return CHAIN_NAMES.get(chain_id, str(chain_id))
+
 # Mapa inverso para rotular/simbolizar
 _INVERSE_BY_CHAIN = {
     cid: {addr.lower(): sym for sym, addr in mapping.items()}
@@ -0,0 +1,112 @@
+# triggers.py — revarredura disparada por movimento de preço
+# Sondas baratas (um agregador, sem retry, amount pequeno) acompanham o preço de cada token
+# contra a base primária da chain. Uma rota só volta para a fila quando algum dos seus tokens
+# andou mais que trigger_bps desde a última avaliação dela (ou quando passou max_period sem
+# ser avaliada, como rede de segurança).
+import asyncio
+import time
+
+from get_best_quote_async import get_best_quote_async, fastest_reliable_aggregator
+
+class PriceProbes:
+    """Preço (taxa base→token) de cada (chain, token), atualizado a cada `interval` segundos."""
+
+    def __init__(self, session, tokens_por_chain, amount_por_chain, interval=5.0):
+        # tokens_por_chain: {chain_id: (base, [tokens])}; amount_por_chain: {chain_id: amount da base}
+        self.session = session
+        self.tokens_por_chain = tokens_por_chain
+        self.amount_por_chain = amount_por_chain
+        self.interval = interval
+        self.precos = {}
+        self.sondagens = 0
+        # agregador fixo por chain: trocar de agregador entre rodadas já "move" o preço
+        self._agg = {}
+
+    async def _sondar(self, chain_id, base, token, agg):
+        amount = self.amount_por_chain[chain_id]
+        q = await get_best_quote_async(self.session, base, token, amount, chain_id, aggregator_list=[agg], attempts=1)
+        self.sondagens += 1
+        if q:
+            return q["toAmount"] / amount
+        return None
+
+    async def run(self, on_update):
+        """Loop das sondas; on_update(chain_id, token, preço) a cada preço novo."""
+        while True:
+            t0 = time.monotonic()
+            for chain_id, (base, tokens) in self.tokens_por_chain.items():
+                agg = self._agg.setdefault(chain_id, fastest_reliable_aggregator(chain_id))
+                precos = await asyncio.gather(*(self._sondar(chain_id, base, t, agg) for t in tokens), return_exceptions=True)
+                if not any(isinstance(p, float) for p in precos):
+                    # agregador fora do ar: escolhe outro na próxima rodada
+                    self._agg.pop(chain_id, None)
+                    continue
+                for token, p in zip(tokens, precos):
+                    if isinstance(p, float) and p > 0:
+                        self.precos[(chain_id, token.lower())] = p
+                        on_update(chain_id, token, p)
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - t0)))
+
+class AgendaEventos:
+    """Mesma interface de streaming.AgendaFixa. Itens são (chain_id, rota, amount)."""
+
+    def __init__(self, itens, probes: PriceProbes, trigger_bps=10.0, max_period=300.0):
+        self.probes = probes
+        self.trigger_bps = trigger_bps
+        self.max_period = max_period
+        self._por_token = {}
+        for item in itens:
+            chain_id, rota, _ = item
+            for t in rota:
+                self._por_token.setdefault((chain_id, t.lower()), []).append(item)
+        self._ref = {}       # item -> {token: preço quando foi avaliado}
+        self._ultima = {}    # item -> time.monotonic() do último disparo
+        self._pendentes = set()
+        self._fila = asyncio.Queue()
+        self.disparos = {"preco": 0, "inicial": 0, "expirado": 0}
+        for item in itens:
+            self._enfileirar(item, "inicial")
+
+    def _enfileirar(self, item, motivo):
+        if item in self._pendentes:
+            return
+        self._pendentes.add(item)
+        self.disparos[motivo] += 1
+        self._fila.put_nowait(item)
+
+    def preco_atualizado(self, chain_id, token, preco):
+        t = token.lower()
+        for item in self._por_token.get((chain_id, t), ()):
+            ref = self._ref.setdefault(item, {})
+            if t not in ref:
+                # rota disparada antes da primeira sonda deste token: o primeiro preço vira a referência
+                ref[t] = preco
+                continue
+            if abs(preco / ref[t] - 1.0) * 10000 >= self.trigger_bps:
+                self._enfileirar(item, "preco")
+
+    def _expirados(self):
+        agora = time.monotonic()
+        for item, t in list(self._ultima.items()):
+            if agora - t >= self.max_period:
+                self._enfileirar(item, "expirado")
+
+    async def proxima(self):
+        while True:
+            try:
+                item = await asyncio.wait_for(self._fila.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                self._expirados()
+                continue
+            self._pendentes.discard(item)
+            chain_id, rota, _ = item
+            # referência de preço = o que as sondas viam quando a rota foi disparada
+            self._ref[item] = {
+                t.lower(): self.probes.precos[(chain_id, t.lower())]
+                for t in rota if (chain_id, t.lower()) in self.probes.precos
+            }
+            self._ultima[item] = time.monotonic()
+            return item
+
+    def resultado(self, item, net):
+        pass